@@ -10,6 +10,8 @@ import os
 import tempfile
 import unittest
 
+from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.schema_utils import SchemaUtils
 from xrcg.generator.xregistry_loader import XRegistryLoader
 from xrcg.commands.validate_definitions import validate
 
@@ -133,6 +135,36 @@ class TestAliasResolution(unittest.TestCase):
         self.assertEqual(alias["messageid"], "OrderCreated")
         self.assertNotIn("meta", alias)
 
+    def test_aliased_inline_dataschema_has_alias_type(self):
+        """The inline dataschema of an aliased message resolves to the alias's own type."""
+        doc = {
+            "messagegroups": {
+                "A": {
+                    "messages": {
+                        "M": {
+                            "envelope": "CloudEvents/1.0",
+                            "dataschemaformat": "JsonSchema/draft-07",
+                            "dataschema": {
+                                "type": "object",
+                                "properties": {"value": {"type": "string"}},
+                            },
+                        }
+                    }
+                },
+                "B": {"messages": {"M2": {"xref": "/messagegroups/A/messages/M"}}},
+            }
+        }
+        result = self._load(doc)
+        ctx = GeneratorContext(self.temp_dir)
+        target = result["messagegroups"]["A"]["messages"]["M"]
+        alias = result["messagegroups"]["B"]["messages"]["M2"]
+
+        self.assertEqual(alias["dataschema"], target["dataschema"])
+        self.assertEqual(
+            SchemaUtils.schema_type(ctx, target["dataschema"], "Test", result, "jsonschema/draft-07"), "M")
+        self.assertEqual(
+            SchemaUtils.schema_type(ctx, alias["dataschema"], "Test", result, "jsonschema/draft-07"), "M2")
+
     def test_alias_document_validates(self):
         """A document whose only alias content is meta.xref validates cleanly."""
         doc = {
@@ -6,7 +6,7 @@ import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
-from xrcg.generator.xregistry_loader import XRegistryLoader
+from xrcg.generator.xregistry_loader import MessageResolver, XRegistryLoader
 
 
 class TestBasemessageResolution(unittest.TestCase):
@@ -1019,5 +1019,58 @@ class TestBasemessageSpecAttributeName(unittest.TestCase):
         self.assertNotIn("basemessageurl", derived)
 
 
+    def test_shared_base_chain_is_merged_once(self):
+        """A base shared by many messages is resolved once, not once per message."""
+        # Derived messages come before their bases, so no base is resolved in place first
+        messages = {}
+        for i in range(20):
+            messages[f"Leaf{i}"] = {
+                "messageid": f"Leaf{i}",
+                "basemessage": "/messagegroups/g/messages/M9/",
+            }
+        for i in range(9, 0, -1):
+            messages[f"M{i}"] = {
+                "messageid": f"M{i}",
+                "basemessage": f"#/messagegroups/g/messages/M{i - 1}",
+                "envelopemetadata": {f"level{i}": {"value": str(i)}},
+            }
+        messages["M0"] = {"messageid": "M0", "envelopemetadata": {"level0": {"value": "0"}}}
+        doc = {"specversion": "1.0-rc2", "messagegroups": {"g": {"messagegroupid": "g", "messages": messages}}}
+        with patch.object(MessageResolver, '_deep_merge', autospec=True,
+                          side_effect=MessageResolver._deep_merge) as deep_merge:
+            result = self._load(doc)
+        # One top-level merge per derived message: M1..M9 and the 20 leaves
+        self.assertEqual(sum(1 for c in deep_merge.call_args_list if c.args[2].get("messageid")), 29)
+        resolved = result["messagegroups"]["g"]["messages"]
+        for i in range(20):
+            leaf = resolved[f"Leaf{i}"]
+            self.assertEqual(leaf["messageid"], f"Leaf{i}")
+            self.assertEqual(sorted(leaf["envelopemetadata"]), sorted(f"level{j}" for j in range(10)))
+            self.assertNotIn("basemessage", leaf)
+
+    def test_circular_chain_fails_for_all_members(self):
+        """Messages whose chain runs into a cycle stay unresolved, however they are reached."""
+        doc = {
+            "specversion": "1.0-rc2",
+            "messagegroups": {
+                "g": {
+                    "messagegroupid": "g",
+                    "messages": {
+                        "A": {"messageid": "A", "basemessage": "/messagegroups/g/messages/B"},
+                        "B": {"messageid": "B", "basemessage": "/messagegroups/g/messages/C"},
+                        "C": {"messageid": "C", "basemessage": "/messagegroups/g/messages/B"},
+                        "D": {"messageid": "D", "basemessage": "/messagegroups/g/messages/A"},
+                    },
+                },
+            },
+        }
+        with self.assertLogs('xrcg.generator.xregistry_loader.MessageResolver', level='ERROR') as logs:
+            result = self._load(doc)
+        failed = [line for line in logs.output if "Failed to resolve basemessage" in line]
+        self.assertEqual(len(failed), 4)
+        for message_id in "ABCD":
+            self.assertIn("basemessage", result["messagegroups"]["g"]["messages"][message_id])
+
+
 if __name__ == '__main__':
     unittest.main()
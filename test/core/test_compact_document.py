@@ -0,0 +1,121 @@
+"""
+Unit tests for compacting resolved documents.
+
+Tests cover interning of attribute names and token-like values, values that
+are left alone, preservation of content and node identity, shared subtrees,
+and compaction by XRegistryLoader.
+"""
+
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from xrcg.generator.compact_document import MAX_INTERNED_LENGTH, compact_document
+from xrcg.generator.xregistry_loader import XRegistryLoader
+
+
+def _fresh(text):
+    """Return a string equal to text that is not the interned instance."""
+    return "".join(list(text))
+
+
+class TestCompactDocument(unittest.TestCase):
+    """Test compact_document."""
+
+    def setUp(self):
+        self.document = json.loads(json.dumps({
+            "messagegroups": {
+                "g": {
+                    "messages": {
+                        "m": {
+                            "basemessage": "/messagegroups/g/messages/base",
+                            "envelope": "CloudEvents/1.0",
+                            "description": "A message with a description",
+                            "dataschema": 'syntax = "proto3"; message M {}',
+                            "envelopemetadata": {"type": {"value": "com.example.m"}},
+                            "tags": ["a", {"b": "/schemagroups/s"}],
+                        },
+                    },
+                },
+            },
+        }))
+
+    def test_content_and_identity_are_preserved(self):
+        """Test that compaction changes no value and keeps every container."""
+        expected = copy.deepcopy(self.document)
+        message = self.document["messagegroups"]["g"]["messages"]["m"]
+        metadata = message["envelopemetadata"]
+        compact_document(self.document)
+        self.assertEqual(self.document, expected)
+        self.assertEqual(list(message), list(expected["messagegroups"]["g"]["messages"]["m"]))
+        self.assertIs(self.document["messagegroups"]["g"]["messages"]["m"], message)
+        self.assertIs(message["envelopemetadata"], metadata)
+
+    def test_names_and_tokens_are_interned(self):
+        """Test that attribute names, XIDs and short values are the interned instances."""
+        message = self.document["messagegroups"]["g"]["messages"]["m"]
+        message[_fresh("attribute")] = _fresh("/messagegroups/g/messages/other")
+        compact_document(self.document)
+        for key in message:
+            self.assertIs(key, sys.intern(key))
+        for value in (message["basemessage"], message["envelope"], message["attribute"],
+                      message["envelopemetadata"]["type"]["value"], message["tags"][0], message["tags"][1]["b"]):
+            self.assertIs(value, sys.intern(value))
+
+    def test_text_is_not_interned(self):
+        """Test that values with whitespace and long values keep their own instance."""
+        message = self.document["messagegroups"]["g"]["messages"]["m"]
+        long_value = _fresh("x" * (MAX_INTERNED_LENGTH + 1))
+        message["long"] = long_value
+        description = message["description"]
+        dataschema = message["dataschema"]
+        compact_document(self.document)
+        self.assertIs(message["description"], description)
+        self.assertIs(message["dataschema"], dataschema)
+        self.assertIs(message["long"], long_value)
+
+    def test_shared_subtrees(self):
+        """Test that shared and repeated containers are compacted once and stay shared."""
+        message = self.document["messagegroups"]["g"]["messages"]["m"]
+        self.document["endpoints"] = {"e": {"messages": {"m": message}}}
+        self.document["list"] = [message, message]
+        self.assertEqual(compact_document(self.document), len([
+            self.document, self.document["messagegroups"], self.document["messagegroups"]["g"],
+            self.document["messagegroups"]["g"]["messages"], message, message["envelopemetadata"],
+            message["envelopemetadata"]["type"], message["tags"], message["tags"][1],
+            self.document["endpoints"], self.document["endpoints"]["e"],
+            self.document["endpoints"]["e"]["messages"], self.document["list"]]))
+        self.assertIs(self.document["endpoints"]["e"]["messages"]["m"], message)
+
+
+class TestLoaderCompaction(unittest.TestCase):
+    """Test compaction of documents resolved by XRegistryLoader."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.definitions_file = os.path.join(self.temp_dir, "definitions.json")
+        with open(self.definitions_file, "w", encoding="utf-8") as f:
+            json.dump({"messagegroups": {"g": {"messages": {
+                "m": {"envelope": "CloudEvents/1.0", "dataschemaformat": "JsonSchema/draft-07"},
+                "n": {"xref": "/messagegroups/g/messages/m"},
+            }}}}, f)
+
+    def test_compact_documents(self):
+        """Test that a compacted load gives the same document as a plain one."""
+        _, plain = XRegistryLoader().load(self.definitions_file, {}, False, True)
+        loader = XRegistryLoader()
+        loader.compact_documents = True
+        _, compacted = loader.load(self.definitions_file, {}, False, True)
+        self.assertEqual(compacted, plain)
+        self.assertIn("compaction", loader.pass_timings.seconds)
+        self.assertIs(compacted["messagegroups"]["g"]["messages"]["m"]["dataschemaformat"],
+                      sys.intern("JsonSchema/draft-07"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the resolved document cache.
+
+Tests cover cache hits across loader instances and invalidation when input
+files, referenced resource files or filter arguments change.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from xrcg.common.document_cache import DocumentCache
+from xrcg.common.transport import HttpResponse
+from xrcg.generator.xregistry_loader import XRegistryLoader
+
+
+class TestDocumentCache(unittest.TestCase):
+    """Test the document cache used by XRegistryLoader.load and load_stacked."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.cache = DocumentCache(Path(self.temp_dir) / "cache")
+        self.schema_file = self._write("schema.json", {"type": "object"})
+        self.definitions_file = self._write("definitions.json", {
+            "schemagroups": {"g": {"schemas": {"s": {"versions": {"1": {
+                "format": "JsonSchema/draft-07", "schemaurl": self.schema_file}}}}}}
+        })
+
+    def _write(self, name, content, mtime=None):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def _load(self, *uris, **filters):
+        """Load with a fresh loader and return (result, number of parsed files)."""
+        loader = XRegistryLoader(document_cache=self.cache)
+        with patch.object(XRegistryLoader, "_parse_file", autospec=True,
+                          side_effect=XRegistryLoader._parse_file) as parse:
+            if len(uris) == 1:
+                result = loader.load(uris[0], {}, False, True, **filters)
+            else:
+                result = loader.load_stacked(list(uris), {}, False, True, **filters)
+        return result, parse.call_count
+
+    def test_second_load_is_served_from_cache(self):
+        """Test that a second loader reuses the resolved document."""
+        first, parsed = self._load(self.definitions_file)
+        self.assertEqual(parsed, 2)
+        second, parsed = self._load(self.definitions_file)
+        self.assertEqual(parsed, 0)
+        self.assertEqual(second, first)
+        self.assertEqual(second[1]["schemagroups"]["g"]["schemas"]["s"]["versions"]["1"]["schema"],
+                         {"type": "object"})
+
+    def test_changed_definitions_file_is_reloaded(self):
+        """Test that a new modification time invalidates the entry."""
+        self._load(self.definitions_file)
+        os.utime(self.definitions_file, (1000000000, 1000000000))
+        _, parsed = self._load(self.definitions_file)
+        self.assertEqual(parsed, 2)
+
+    def test_changed_resource_file_is_reloaded(self):
+        """Test that a change to a referenced schema file invalidates the entry."""
+        self._load(self.definitions_file)
+        self._write("schema.json", {"type": "string", "title": "changed"}, mtime=1000000000)
+        (_, document), parsed = self._load(self.definitions_file)
+        self.assertEqual(parsed, 2)
+        self.assertEqual(document["schemagroups"]["g"]["schemas"]["s"]["versions"]["1"]["schema"]["type"],
+                         "string")
+
+    def test_filters_are_part_of_the_key(self):
+        """Test that different filter arguments are cached separately."""
+        self._load(self.definitions_file)
+        _, parsed = self._load(self.definitions_file, messagegroup_filter="other")
+        self.assertEqual(parsed, 2)
+
+    def test_stacked_documents_are_cached(self):
+        """Test that load_stacked uses the cache as well."""
+        overlay = self._write("overlay.json", {"messagegroups": {"m": {"messages": {}}}})
+        first, _ = self._load(self.definitions_file, overlay)
+        second, parsed = self._load(self.definitions_file, overlay)
+        self.assertEqual(parsed, 0)
+        self.assertEqual(second, first)
+
+    def test_remote_resources_are_not_cached(self):
+        """Test that documents resolved from HTTP resources are not stored."""
+        definitions_file = self._write("remote.json", {
+            "schemagroups": {"g": {"schemas": {"s": {"versions": {"1": {
+                "format": "JsonSchema/draft-07", "schemaurl": "https://example.com/schema.json"}}}}}}
+        })
+        loader = XRegistryLoader(document_cache=self.cache)
+        with patch.object(loader, "transport") as transport:
+            transport.get.return_value = HttpResponse(
+                url="https://example.com/schema.json", status=200, content=b'{"type": "object"}')
+            loader.load(definitions_file, {}, False, True)
+        self.assertFalse(list(self.cache.directory.glob("*.pickle")))
+
+    def test_key_requires_local_files(self):
+        """Test that URLs and missing files are not cacheable."""
+        self.assertIsNone(DocumentCache.key(["https://example.com/doc.json"], "model"))
+        self.assertIsNone(DocumentCache.key([os.path.join(self.temp_dir, "missing.json")], "model"))
+        self.assertNotEqual(DocumentCache.key([self.definitions_file], "model"),
+                            DocumentCache.key([self.definitions_file], "other model"))
+
+    def test_damaged_entry_is_ignored(self):
+        """Test that an unreadable entry is treated as a miss."""
+        key = DocumentCache.key([self.definitions_file], "model")
+        self.cache.directory.mkdir(parents=True)
+        (self.cache.directory / f"{key}.pickle").write_bytes(b"not a pickle")
+        self.assertIsNone(self.cache.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Unit tests for the document pass walker.
+
+Tests cover the visiting order of groups and resources, passes sharing a
+traversal, per-pass timings and the passes the loader runs on a loaded
+document.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from xrcg.generator.document_passes import DocumentPass, DocumentWalker, PassTimings
+from xrcg.generator.xregistry_loader import XRegistryLoader
+
+MODEL_GROUPS = {
+    "endpoints": {"resources": {"messages": {"singular": "message"}}},
+    "messagegroups": {"resources": {"messages": {"singular": "message"}}},
+    "schemagroups": {"resources": {"schemas": {"singular": "schema"}}},
+}
+
+
+class _RecordingPass(DocumentPass):
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+
+    def begin(self, document):
+        self.events.append((self.name, "begin"))
+
+    def visit_group(self, group_type, group_id, group):
+        self.events.append((self.name, group_type, group_id))
+
+    def visit_resource(self, location, resources, resource):
+        self.events.append((self.name, location.xid, resource.get("value")))
+
+    def end(self, document):
+        self.events.append((self.name, "end"))
+
+    def close(self):
+        self.events.append((self.name, "close"))
+
+
+class _ReplacingPass(DocumentPass):
+    name = "replace"
+
+    def visit_resource(self, location, resources, resource):
+        resources[location.resource_id] = {"value": "replaced"}
+
+
+class _FailingPass(DocumentPass):
+    name = "fail"
+
+    def visit_group(self, group_type, group_id, group):
+        raise ValueError("broken group")
+
+
+class TestDocumentWalker(unittest.TestCase):
+    """Test traversals with DocumentWalker."""
+
+    def setUp(self):
+        self.document = {
+            "schemagroups": {"s": {"schemas": {"a": {"value": 1}}}},
+            "messagegroups": {"g": {"messages": {"m": {"value": 2}, "n": "not a resource"}}},
+            "unknown": {"x": {"messages": {"m": {"value": 3}}}},
+        }
+        self.timings = PassTimings()
+        self.walker = DocumentWalker(MODEL_GROUPS, self.timings)
+
+    def test_visiting_order(self):
+        """Test that groups follow the model order and all passes see a node before the next one."""
+        events = []
+        self.walker.walk(self.document, [_RecordingPass("a", events), _RecordingPass("b", events)])
+        self.assertEqual(events, [
+            ("a", "begin"), ("b", "begin"),
+            ("a", "messagegroups", "g"), ("b", "messagegroups", "g"),
+            ("a", "/messagegroups/g/messages/m", 2), ("b", "/messagegroups/g/messages/m", 2),
+            ("a", "schemagroups", "s"), ("b", "schemagroups", "s"),
+            ("a", "/schemagroups/s/schemas/a", 1), ("b", "/schemagroups/s/schemas/a", 1),
+            ("a", "end"), ("b", "end"),
+            ("a", "close"), ("b", "close"),
+        ])
+
+    def test_later_passes_see_replacements(self):
+        """Test that a resource replaced by one pass is what the next pass visits."""
+        events = []
+        self.walker.walk(self.document, [_ReplacingPass(), _RecordingPass("after", events)])
+        self.assertIn(("after", "/messagegroups/g/messages/m", "replaced"), events)
+        self.assertEqual(self.document["schemagroups"]["s"]["schemas"]["a"], {"value": "replaced"})
+
+    def test_failed_traversal_closes_passes(self):
+        """Test that close() runs and end() does not when a pass raises."""
+        events = []
+        with self.assertRaises(ValueError):
+            self.walker.walk(self.document, [_RecordingPass("a", events), _FailingPass()])
+        self.assertEqual(events[-1], ("a", "close"))
+        self.assertNotIn(("a", "end"), events)
+
+    def test_timings(self):
+        """Test that every pass reports its time and repeated passes accumulate."""
+        self.walker.walk(self.document, [_RecordingPass("a", []), _RecordingPass("b", [])])
+        self.walker.walk(self.document, [_RecordingPass("a", [])])
+        self.assertEqual(list(self.timings.seconds), ["a", "b"])
+        self.assertTrue(all(seconds >= 0 for seconds in self.timings.seconds.values()))
+        self.assertRegex(str(self.timings), r"^a \d+\.\d ms, b \d+\.\d ms$")
+
+
+class TestLoaderPasses(unittest.TestCase):
+    """Test the normalization passes run by XRegistryLoader.load."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        return path
+
+    def test_load_runs_three_traversals(self):
+        """Test that load() normalizes the document on three traversals and times each pass."""
+        schema_file = self._write("schema.json", {"type": "object"})
+        definitions_file = self._write("definitions.json", {
+            "schemagroups": {"s": {"schemas": {"data": {"versions": {"1": {
+                "format": "JsonSchema/draft-07", "schemaurl": schema_file}}}}}},
+            "messagegroups": {"g": {"messages": {
+                "base": {"envelope": "CloudEvents/1.0", "dataschemauri": "/schemagroups/s/schemas/data"},
+                "alias": {"xref": "/messagegroups/g/messages/base"},
+                "derived": {"basemessage": "/messagegroups/g/messages/alias", "description": "derived"},
+            }}},
+        })
+        loader = XRegistryLoader()
+        with patch.object(DocumentWalker, "walk", autospec=True, side_effect=DocumentWalker.walk) as walk:
+            _, document = loader.load(definitions_file, {}, False, True)
+        self.assertEqual([[p.name for p in call.args[2]] for call in walk.call_args_list],
+                         [["collection-urls", "resources"], ["aliases"], ["basemessages", "schema-references"]])
+        self.assertEqual(list(loader.pass_timings.seconds),
+                         ["collection-urls", "resources", "aliases", "basemessages", "schema-references"])
+
+        messages = document["messagegroups"]["g"]["messages"]
+        self.assertEqual(messages["derived"]["dataschemauri"], "#/schemagroups/s/schemas/data")
+        self.assertEqual(messages["derived"]["description"], "derived")
+        self.assertNotIn("basemessage", messages["derived"])
+        self.assertEqual(messages["alias"]["messageid"], "alias")
+        self.assertEqual(document["schemagroups"]["s"]["schemas"]["data"]["versions"]["1"]["schema"],
+                         {"type": "object"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Unit tests for the persistent HTTP cache.
+
+Tests run against a local HTTP/1.1 server that supports ETag and
+Last-Modified revalidation and counts the full responses it sends.
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from xrcg.common.http_cache import CachingTransport, HttpCache
+from xrcg.common.transport import TransportError
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.last_headers = dict(self.headers)
+        etag = f'"{server.epoch}"'
+        if self.path == "/etag" and self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"path": self.path, "epoch": server.epoch}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("xRegistry-epoch", str(server.epoch))
+        if self.path == "/etag":
+            self.send_header("ETag", etag)
+        if self.path == "/nostore":
+            self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCachingTransport(unittest.TestCase):
+    """Test revalidation, TTL and offline behavior of the caching transport."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = 0
+        self.server.not_modified = 0
+        self.server.epoch = 1
+        self.server.last_headers = {}
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = HttpCache(Path(self.cache_dir))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _transport(self, **kwargs):
+        transport = CachingTransport(self.cache, timeout=5, **kwargs)
+        self.addCleanup(transport.close)
+        return transport
+
+    def test_revalidates_with_etag(self):
+        """Test that a stored response is revalidated and served on 304."""
+        transport = self._transport()
+        first = transport.get(f"{self.base}/etag")
+        second = transport.get(f"{self.base}/etag")
+
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertEqual(self.server.last_headers.get("If-None-Match"), '"1"')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.headers["content-type"], "application/json")
+
+    def test_changed_resource_is_refetched(self):
+        """Test that a new epoch replaces the stored response."""
+        transport = self._transport()
+        transport.get(f"{self.base}/etag")
+        self.server.epoch = 2
+        response = transport.get(f"{self.base}/etag")
+
+        self.assertEqual(json.loads(response.content)["epoch"], 2)
+        entry = self.cache.lookup(HttpCache.key(f"{self.base}/etag"))
+        self.assertEqual(entry["epoch"], "2")
+
+    def test_ttl_serves_without_request(self):
+        """Test that fresh entries are served without contacting the server."""
+        transport = self._transport(ttl=3600)
+        transport.get(f"{self.base}/doc")
+        transport.get(f"{self.base}/doc")
+        self.assertEqual(self.server.requests, 1)
+
+    def test_max_age_overrides_ttl(self):
+        """Test that a per-request max_age takes precedence over the TTL."""
+        transport = self._transport(ttl=3600)
+        transport.get(f"{self.base}/doc")
+        transport.get(f"{self.base}/doc", max_age=0)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_offline_serves_from_cache(self):
+        """Test that offline mode uses a cache populated by an earlier run."""
+        self._transport().get(f"{self.base}/doc")
+        offline = self._transport(offline=True)
+
+        response = offline.get(f"{self.base}/doc")
+        self.assertEqual(json.loads(response.content)["path"], "/doc")
+        self.assertEqual(self.server.requests, 1)
+        with self.assertRaises(TransportError):
+            offline.get(f"{self.base}/other")
+
+    def test_headers_are_part_of_the_key(self):
+        """Test that responses for different request headers are cached separately."""
+        transport = self._transport(ttl=3600)
+        transport.get(f"{self.base}/doc", {"Authorization": "Bearer a"})
+        transport.get(f"{self.base}/doc", {"Authorization": "Bearer b"})
+        self.assertEqual(self.server.requests, 2)
+        self.assertNotEqual(HttpCache.key("u", {"Authorization": "a"}),
+                            HttpCache.key("u", {"Authorization": "b"}))
+
+    def test_identical_bodies_are_stored_once(self):
+        """Test that the body store is content-addressed."""
+        self.server.epoch = 7
+        transport = self._transport()
+        transport.get(f"{self.base}/doc?a=1")
+        transport.get(f"{self.base}/doc?a=1", {"Accept": "application/json"})
+        objects = list((Path(self.cache_dir) / "objects").iterdir())
+        self.assertEqual(len(objects), 1)
+
+    def test_no_store_is_not_cached(self):
+        """Test that Cache-Control: no-store responses are not written."""
+        self._transport().get(f"{self.base}/nostore")
+        self.assertIsNone(self.cache.lookup(HttpCache.key(f"{self.base}/nostore")))
+
+    def test_unreachable_server_serves_stale_copy(self):
+        """Test that a cached copy is used when revalidation cannot connect."""
+        url = "http://127.0.0.1:1/doc"
+        with self._transport(offline=True) as transport:
+            with self.assertRaises(TransportError):
+                transport.get(url)
+        source = self._transport().get(f"{self.base}/doc")
+        self.cache.store(HttpCache.key(url), source)
+
+        response = self._transport().get(url)
+        self.assertEqual(response.content, source.content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Unit tests for the JSON codec.
+
+Every test runs against each installed backend; results must match the
+standard library.
+"""
+
+import glob
+import json
+import os
+import unittest
+
+from xrcg.common import json_codec
+
+
+XREG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "xreg")
+
+
+def _installed_backends():
+    backends = []
+    for name in json_codec.BACKENDS:
+        try:
+            json_codec._Backend(name)
+            backends.append(name)
+        except ImportError:
+            pass
+    return backends
+
+
+class TestJsonCodec(unittest.TestCase):
+    """Test decoding, encoding and hashing with all installed backends."""
+
+    def setUp(self):
+        self.previous = json_codec.backend_name()
+        self.addCleanup(json_codec.set_backend, self.previous)
+
+    def _each_backend(self):
+        for name in _installed_backends():
+            json_codec.set_backend(name)
+            yield name
+
+    def test_loads_matches_stdlib(self):
+        """Test that xRegistry documents decode like the standard library."""
+        files = sorted(glob.glob(os.path.join(XREG_DIR, "*.xreg.json")))
+        self.assertTrue(files)
+        for _ in self._each_backend():
+            for file in files:
+                with open(file, "rb") as f:
+                    data = f.read()
+                expected = json.loads(data)
+                self.assertEqual(json_codec.loads(data), expected)
+                self.assertEqual(json_codec.loads(memoryview(data)), expected)
+                self.assertEqual(json_codec.loads(data.decode("utf-8")), expected)
+
+    def test_loads_accepts_stdlib_extensions(self):
+        """Test that documents only the standard library accepts still decode."""
+        for _ in self._each_backend():
+            self.assertEqual(json_codec.loads(b'[Infinity]'), [float("inf")])
+            self.assertTrue(json_codec.loads('[NaN]')[0] != json_codec.loads('[NaN]')[0])
+
+    def test_loads_raises_json_decode_error(self):
+        """Test that invalid JSON raises json.JSONDecodeError."""
+        for _ in self._each_backend():
+            with self.assertRaises(json.JSONDecodeError):
+                json_codec.loads("key: value")
+            with self.assertRaises(json.JSONDecodeError):
+                json_codec.loads(b"")
+
+    def test_dumps_round_trip(self):
+        """Test that encoded values decode to the original."""
+        value = {"b": [1, 2.5, None, True], "a": {"ü": "é"}, "c": ""}
+        for _ in self._each_backend():
+            text = json_codec.dumps(value)
+            self.assertIsInstance(text, str)
+            self.assertEqual(json.loads(text), value)
+            self.assertEqual(json.loads(json_codec.dumps(value, indent=2)), value)
+            self.assertEqual(json.loads(json_codec.dumps(value, indent=4)), value)
+            self.assertEqual(json_codec.dumps({"b": 1, "a": 2}, sort_keys=True), '{"a":2,"b":1}')
+
+    def test_dumps_falls_back_for_unsupported_values(self):
+        """Test that values a fast backend cannot encode use the standard library."""
+        for _ in self._each_backend():
+            self.assertEqual(json_codec.dumps([2 ** 70]), "[1180591620717411303424]")
+
+    def test_canonical_hash(self):
+        """Test that the hash ignores key order and distinguishes content."""
+        for _ in self._each_backend():
+            first = json_codec.canonical_hash({"a": 1, "b": [1, 2]})
+            self.assertEqual(first, json_codec.canonical_hash({"b": [1, 2], "a": 1}))
+            self.assertNotEqual(first, json_codec.canonical_hash({"a": 1, "b": [2, 1]}))
+            self.assertEqual(len(first), 64)
+
+    def test_unknown_backend(self):
+        """Test that unknown backend names are rejected."""
+        with self.assertRaises(ValueError):
+            json_codec.set_backend("simdjson")
+        self.assertEqual(json_codec.backend_name(), self.previous)
+
+
+if __name__ == '__main__':
+    unittest.main()
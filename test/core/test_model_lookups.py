@@ -0,0 +1,75 @@
+"""
+Unit tests for the precomputed model lookups.
+
+Tests cover the tables derived from model groups, both forms of resource
+definitions, immutability, sharing between Model instances and the
+walkers and stacks built from the lookups.
+"""
+
+import dataclasses
+import unittest
+
+from xrcg.common.model import Model, ModelLookups
+from xrcg.generator.document_passes import DocumentWalker
+from xrcg.generator.stacked_document import StackedDocument
+
+MODEL_GROUPS = {
+    "messagegroups": {"singular": "messagegroup", "plural": "messagegroups",
+                      "resources": {"messages": {"singular": "message", "plural": "messages"}}},
+    "schemagroups": {"singular": "schemagroup", "plural": "schemagroups",
+                     "resources": [{"singular": "schema", "plural": "schemas"}, {"singular": "ignored"}]},
+    "broken": "not a group",
+}
+
+
+class TestModelLookups(unittest.TestCase):
+    """Test ModelLookups.from_groups and Model.lookups."""
+
+    def setUp(self):
+        self.lookups = ModelLookups.from_groups(MODEL_GROUPS)
+
+    def test_tables(self):
+        """Test the group, collection and attribute name tables."""
+        lookups = self.lookups
+        self.assertEqual(lookups.group_types, ("messagegroups", "schemagroups", "broken"))
+        self.assertIn("broken", lookups.group_type_set)
+        self.assertEqual(lookups.group_patterns, ("/messagegroups/", "/schemagroups/", "/broken/"))
+        self.assertEqual(dict(lookups.group_singulars), {"messagegroups": "messagegroup", "schemagroups": "schemagroup"})
+        self.assertEqual(lookups.group_plurals["schemagroup"], "schemagroups")
+        self.assertEqual(dict(lookups.resource_collections), {
+            "messagegroups": (("messages", "message"),),
+            "schemagroups": (("schemas", "schema"),),
+        })
+        self.assertEqual(lookups.resource_collection_sets["schemagroups"], frozenset({"schemas"}))
+        self.assertEqual(lookups.collection_url_fields["messagegroups"], (("messages", "messagesurl"),))
+        self.assertEqual(dict(lookups.resource_singulars), {"messages": "message", "schemas": "schema"})
+        self.assertEqual(lookups.resource_plurals["schema"], "schemas")
+        self.assertEqual((lookups.url_field("schema"), lookups.base64_field("schema")), ("schemaurl", "schemabase64"))
+        self.assertEqual((lookups.url_field("resource"), lookups.base64_field("resource")), ("resourceurl", "resourcebase64"))
+
+    def test_frozen(self):
+        """Test that neither the lookups nor their tables can be changed."""
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            self.lookups.group_types = ()
+        with self.assertRaises(TypeError):
+            self.lookups.resource_collections["endpoints"] = ()
+
+    def test_shared_between_models(self):
+        """Test that models with the same groups share one instance and match the model."""
+        model = Model()
+        self.assertIs(model.lookups, Model().lookups)
+        self.assertEqual(set(model.lookups.group_types), set(model.groups))
+        self.assertIn(("messages", "message"), model.lookups.resource_collections["messagegroups"])
+
+    def test_walker_and_stack_accept_lookups(self):
+        """Test that lookups and the groups they come from give the same traversal and merge."""
+        document = {"schemagroups": {"s": {"schemas": {"a": {"v": 1}}}}}
+        overlay = {"schemagroups": {"s": {"schemas": {"b": {"v": 2}}}}}
+        for model_groups in (MODEL_GROUPS, self.lookups):
+            self.assertEqual(dict(DocumentWalker(model_groups)._collections), dict(self.lookups.resource_collections))
+            merged = StackedDocument(model_groups, [("base", document), ("overlay", overlay)]).merge()
+            self.assertEqual(sorted(merged["schemagroups"]["s"]["schemas"]), ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
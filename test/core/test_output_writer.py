@@ -0,0 +1,169 @@
+"""
+Unit tests for writing generated files only when their content changed.
+
+Tests cover new, identical and changed files, deleted outputs, files
+rewritten by other generators, and regenerating an unchanged definitions
+file with the command line, also incrementally.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import xrcg
+from xrcg.generator.output_writer import (OutputSnapshot, OutputStats, encode_text, remove_output,
+                                          write_if_changed)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    """Test write_if_changed and remove_output."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.path = os.path.join(self.temp_dir, "out.txt")
+        self.stats = OutputStats()
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_new_file(self):
+        """Test that a missing file is written as text mode would write it."""
+        self.assertTrue(write_if_changed(self.path, "a\nb", self.stats))
+        self.assertEqual(self._read(), encode_text("a\nb"))
+        self.assertEqual(self.stats.files, {self.path: "written"})
+
+    def test_identical_file_is_not_touched(self):
+        """Test that a file with the same content keeps its modification time."""
+        write_if_changed(self.path, "content\n")
+        os.utime(self.path, (1_000_000, 1_000_000))
+        self.assertFalse(write_if_changed(self.path, "content\n", self.stats))
+        self.assertEqual(os.stat(self.path).st_mtime, 1_000_000)
+        self.assertEqual(self.stats.files, {self.path: "unchanged"})
+
+    def test_changed_file(self):
+        """Test that content of the same size and of another size is written, and counted once."""
+        write_if_changed(self.path, "content")
+        self.assertTrue(write_if_changed(self.path, "CONTENT", self.stats))
+        self.assertTrue(write_if_changed(self.path, "longer content", self.stats))
+        self.assertFalse(write_if_changed(self.path, "longer content", self.stats))
+        self.assertEqual(self._read(), encode_text("longer content"))
+        self.assertEqual(str(self.stats), "1 written, 0 unchanged, 0 deleted")
+
+    def test_remove_output(self):
+        """Test that only existing files count as deleted."""
+        write_if_changed(self.path, "content")
+        self.assertTrue(remove_output(self.path, self.stats))
+        self.assertFalse(remove_output(self.path, self.stats))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(str(self.stats), "0 written, 0 unchanged, 1 deleted")
+
+
+class TestOutputSnapshot(unittest.TestCase):
+    """Test OutputSnapshot.restore_unchanged."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_restore_unchanged(self):
+        """Test that rewrites with the same content get their times back and other files count as written."""
+        same = self._write("same.txt", "same")
+        changed = self._write("changed.txt", "old")
+        kept = self._write("kept.txt", "kept")
+        for path in (same, changed, kept):
+            os.utime(path, (1_000_000, 1_000_000))
+        snapshot = OutputSnapshot(self.temp_dir)
+        self._write("same.txt", "same")
+        self._write("changed.txt", "new")
+        added = self._write("added.txt", "added")
+        stats = OutputStats()
+        snapshot.restore_unchanged(stats)
+        self.assertEqual(os.stat(same).st_mtime, 1_000_000)
+        self.assertNotEqual(os.stat(changed).st_mtime, 1_000_000)
+        self.assertEqual(stats.files, {same: "unchanged", changed: "written", added: "written"})
+
+
+    def test_dependency_directories_are_skipped(self):
+        """Test that files in dependency, build and hidden directories are not read or recorded."""
+        for directory in ("node_modules", "obj", ".git", "src"):
+            os.makedirs(os.path.join(self.temp_dir, directory))
+        source = self._write(os.path.join("src", "a.py"), "a")
+        self._write(os.path.join("node_modules", "b.js"), "b")
+        self._write(os.path.join(".git", "HEAD"), "c")
+        snapshot = OutputSnapshot(self.temp_dir)
+        self.assertEqual(list(snapshot.files), [source])
+        self._write(os.path.join("obj", "d.dll"), "d")
+        stats = OutputStats()
+        snapshot.restore_unchanged(stats)
+        self.assertEqual(stats.files, {})
+
+
+class TestRegenerate(unittest.TestCase):
+    """Test generating twice into the same output directory."""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+
+    def _generate(self, *options):
+        """Run generate; return the lines reporting its statistics and the modification times of the output files."""
+        argv = ["xrcg", "--no-cache", "--stats", "generate", "--language", "asyncapi", "--style", "producer",
+                "--projectname", "test", "--output", self.output_dir,
+                "--definitions", os.path.join(PROJECT_ROOT, "test", "asyncapi", "producer", "asyncapi_producer.xreg.json"),
+                *options]
+        stdout = io.StringIO()
+        with patch.object(sys, "argv", argv), contextlib.redirect_stdout(stdout):
+            self.assertEqual(xrcg.cli(), 0)
+        mtimes = {}
+        for root, _, files in os.walk(self.output_dir):
+            for name in files:
+                mtimes[os.path.join(root, name)] = os.stat(os.path.join(root, name)).st_mtime_ns
+        reports = [line for line in stdout.getvalue().splitlines() if line.startswith(("Render units:", "Output files:"))]
+        return reports, mtimes
+
+    def test_unchanged_definitions_write_nothing(self):
+        """Test that regenerating unchanged definitions leaves every file untouched."""
+        first, mtimes = self._generate()
+        self.assertRegex(first[-1], r"^Output files: [1-9]\d* written, 0 unchanged, 0 deleted$")
+        second, second_mtimes = self._generate()
+        self.assertEqual(second[-1], f"Output files: 0 written, {len(mtimes)} unchanged, 0 deleted")
+        self.assertEqual(second_mtimes, mtimes)
+
+    def test_no_stats_by_default(self):
+        """Test that the output file and render unit counts are only printed with --stats."""
+        argv = ["xrcg", "--no-cache", "generate", "--language", "asyncapi", "--style", "producer",
+                "--projectname", "test", "--output", self.output_dir, "--incremental",
+                "--definitions", os.path.join(PROJECT_ROOT, "test", "asyncapi", "producer", "asyncapi_producer.xreg.json")]
+        stdout = io.StringIO()
+        with patch.object(sys, "argv", argv), contextlib.redirect_stdout(stdout):
+            self.assertEqual(xrcg.cli(), 0)
+        self.assertEqual(stdout.getvalue(), "")
+
+    def test_incremental(self):
+        """Test that regenerating unchanged definitions incrementally renders nothing."""
+        first, mtimes = self._generate("--incremental")
+        self.assertEqual(first[0], "Render units: 1 rendered, 0 reused")
+        second, second_mtimes = self._generate("--incremental")
+        # The manifest is not counted as an output file
+        self.assertEqual(second, ["Render units: 0 rendered, 1 reused",
+                                  f"Output files: 0 written, {len(mtimes) - 1} unchanged, 0 deleted"])
+        self.assertEqual(second_mtimes, mtimes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Unit tests for rendering templates in worker processes.
+
+Tests cover the merge of the context changes of rendered chunks, the output,
+stacks and handled resources of parallel rendering compared to rendering in
+one process, and template errors in workers.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.output_writer import OutputStats
+from xrcg.generator.parallel_render import RenderEffects, RenderPool
+from xrcg.generator.schema_utils import SchemaUtils
+from xrcg.generator.template_renderer import TemplateRenderer
+
+DOCUMENT = {
+    "endpoints": {},
+    "messagegroups": {f"group{i}": {"messagegroupid": f"group{i}", "messages": {}} for i in range(6)},
+}
+
+TEMPLATES = {
+    "{classname}.jinja": (
+        "{%- for id in root.messagegroups %}{{ id | push('groups') }}{{ ('// ' + id) | pushfile(id + '.txt') }}"
+        "{{ id | save('last') }}{% endfor %}{% set _ = ('#/' + class_name) | mark_handled %}"
+        "{{ class_name }} of {{ project_name }}"),
+    "{projectname}.jinja": "{{ ('document ' + project_name) | push('groups') }}{{ root.messagegroups | length }} groups",
+    "_post.jinja": "{{ ('post ' + project_name) | push('groups') }}",
+}
+
+
+class TestRenderEffects(unittest.TestCase):
+    """Test RenderEffects.apply."""
+
+    def test_apply_in_order(self):
+        """Test that pushed values are appended and saved values replaced in the order applied."""
+        ctx = GeneratorContext("out")
+        handled = {"#/s0"}
+        ctx.stacks.push("a", "names")
+        previous = SchemaUtils.schema_references_collected
+        SchemaUtils.schema_references_collected = set()
+        self.addCleanup(setattr, SchemaUtils, "schema_references_collected", previous)
+        RenderEffects({"names": ["b"], "files": [("out/x", "x")]}, {"last": "b"}, {"#/s1"}, "out/b",
+                      OutputStats({"out/b": "written", "out/c": "unchanged"}), {"#/s1"}).apply(ctx, handled)
+        RenderEffects({"names": ["c"]}, {"last": "c"}, {"#/s2"}, None,
+                      OutputStats({"out/b": "unchanged", "out/c": "deleted"})).apply(ctx, handled)
+        self.assertEqual(ctx.stacks.stack("names"), ["a", "b", "c"])
+        self.assertEqual(ctx.stacks.stack("files"), [("out/x", "x")])
+        self.assertEqual(ctx.stacks.get("last"), "c")
+        self.assertEqual(SchemaUtils.schema_references_collected, {"#/s1", "#/s2"})
+        self.assertEqual(handled, {"#/s0", "#/s1"})
+        self.assertEqual(ctx.current_dir, "out/b")
+        self.assertEqual(ctx.output_stats.files, {os.path.abspath("out/b"): "written", os.path.abspath("out/c"): "deleted"})
+
+
+class TestParallelRendering(unittest.TestCase):
+    """Test TemplateRenderer.render_code_templates with a RenderPool."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.template_dir = os.path.join(self.temp_dir, "templates")
+        os.makedirs(self.template_dir)
+        for name, text in TEMPLATES.items():
+            self._write_template(name, text)
+
+    def _write_template(self, name, text):
+        with open(os.path.join(self.template_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _render(self, jobs):
+        """Render the templates; return the output files, the stacks and values of the context, the output counts
+        and the resources marked as handled."""
+        output_dir = os.path.join(self.temp_dir, f"out{jobs}")
+        ctx = GeneratorContext(output_dir)
+        ctx.set_current_dir(output_dir)
+        renderer = TemplateRenderer(ctx, "Test", "py", "test", output_dir, "", {}, [], {}, False, True)
+        env = renderer.setup_jinja_env([self.template_dir])
+        if jobs > 1:
+            renderer._render_pool = RenderPool(jobs, ctx, DOCUMENT)
+        try:
+            for post_process in (False, True):
+                renderer.render_code_templates("Test", "Test", "TestData", "test", output_dir, DOCUMENT,
+                                               [self.template_dir], env, post_process, {})
+        finally:
+            if renderer._render_pool is not None:
+                renderer._render_pool.close()
+        files = {}
+        for root, _, names in os.walk(output_dir):
+            for name in names:
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    files[os.path.relpath(os.path.join(root, name), output_dir)] = f.read()
+        stacks = {name: [(os.path.relpath(v[0], output_dir), v[1]) if name == "files" else v for v in values]
+                  for name, values in ctx.stacks.context_stacks.items()}
+        outputs = {os.path.relpath(path, output_dir): state for path, state in ctx.output_stats.files.items()}
+        return files, stacks, ctx.stacks.context_dict, outputs, renderer.handled_resources
+
+    def test_same_as_serial(self):
+        """Test that workers produce the files, stacks and values of rendering in one process."""
+        serial = self._render(1)
+        self.assertEqual(len(serial[0]), len(DOCUMENT["messagegroups"]) + 2)
+        self.assertEqual(serial[1]["groups"][-1], "post Test")
+        self.assertIn("#/group0", serial[4])
+        self.assertEqual(self._render(3), serial)
+
+    def test_template_error_in_worker(self):
+        """Test that a template failing in a worker fails the rendering."""
+        self._write_template("{classname}.jinja", "{{ undefined_function() }}")
+        with self.assertRaises(SystemExit):
+            self._render(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Unit tests for registry root discovery and the registry root cache.
+
+Tests cover prefix lookups, TTL expiry and persistence of the cache, and the
+concurrent /capabilities probe ladder of the loader.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from xrcg.common.registry_roots import RegistryRootCache
+from xrcg.common.transport import HttpResponse, TransportError
+from xrcg.generator.xregistry_loader import XRegistryLoader
+
+
+class TestRegistryRootCache(unittest.TestCase):
+    """Test the registry root cache."""
+
+    def test_exact_url_lookup(self):
+        """Test that a stored URL returns its root."""
+        cache = RegistryRootCache()
+        cache.put("https://host/reg/messagegroups/a", "https://host/reg")
+        self.assertEqual(cache.get("https://host/reg/messagegroups/a"), "https://host/reg")
+
+    def test_discovered_root_answers_urls_below_it(self):
+        """Test that discovered roots answer other URLs below them."""
+        cache = RegistryRootCache()
+        cache.put("https://host/reg/messagegroups/a", "https://host/reg")
+        self.assertEqual(cache.get("https://host/reg/schemagroups/b"), "https://host/reg")
+        self.assertIsNone(cache.get("https://host/registry2/schemagroups/b"))
+        self.assertIsNone(cache.get("https://other/reg/schemagroups/b"))
+
+    def test_fallback_root_only_answers_exact_url(self):
+        """Test that fallback guesses are not reused for other URLs."""
+        cache = RegistryRootCache()
+        cache.put("https://host/a/b", "https://host", discovered=False)
+        self.assertEqual(cache.get("https://host/a/b"), "https://host")
+        self.assertIsNone(cache.get("https://host/a/c"))
+
+    def test_expired_entries_are_ignored(self):
+        """Test that entries older than the TTL are not returned."""
+        cache = RegistryRootCache(ttl=60)
+        cache.put("https://host/reg/x", "https://host/reg")
+        cache._entries["https://host/reg/x"]["stored"] = time.time() - 120
+        self.assertIsNone(cache.get("https://host/reg/x"))
+        self.assertIsNone(cache.get("https://host/reg/y"))
+
+    def test_persistent_cache_survives_instances(self):
+        """Test that a persistent cache is shared through its file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "roots.json"
+            RegistryRootCache(path).put("https://host/reg/x", "https://host/reg")
+            self.assertEqual(RegistryRootCache(path).get("https://host/reg/y"), "https://host/reg")
+
+    def test_fallback_root_is_not_persisted(self):
+        """Test that a fallback guess is not read back by a new instance."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "roots.json"
+            cache = RegistryRootCache(path)
+            cache.put("https://host/reg/x", "https://host/reg")
+            cache.put("https://host/a/b", "https://host", discovered=False)
+            self.assertEqual(cache.get("https://host/a/b"), "https://host")
+            cache.put("https://host/reg/y", "https://host/reg")
+
+            reloaded = RegistryRootCache(path)
+            self.assertIsNone(reloaded.get("https://host/a/b"))
+            self.assertEqual(reloaded.get("https://host/reg/x"), "https://host/reg")
+
+    def test_damaged_file_is_ignored(self):
+        """Test that an unreadable cache file starts an empty cache."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "roots.json"
+            path.write_text("not json", encoding="utf-8")
+            cache = RegistryRootCache(path)
+            self.assertIsNone(cache.get("https://host/reg/x"))
+            cache.put("https://host/reg/x", "https://host/reg")
+            self.assertTrue(os.path.getsize(path) > 0)
+
+
+class TestDiscoverRegistryRoot(unittest.TestCase):
+    """Test the /capabilities probe ladder of the loader."""
+
+    def _loader(self, available, delays=None, cache=None):
+        """Create a loader whose transport serves /capabilities below the given roots."""
+        delays = delays or {}
+        probes = []
+        lock = threading.Lock()
+
+        def _get(url, headers=None, timeout=None, max_age=None):
+            with lock:
+                probes.append(url)
+            time.sleep(delays.get(url, 0))
+            if url.rsplit("/capabilities", 1)[0] in available:
+                return HttpResponse(url=url, status=200, content=b"{}")
+            raise TransportError(url, "Not Found", 404)
+
+        transport = Mock()
+        transport.get.side_effect = _get
+        with patch('xrcg.generator.xregistry_loader.Model'):
+            loader = XRegistryLoader(transport=transport,
+                                     registry_roots=cache or RegistryRootCache())
+        return loader, probes
+
+    def test_shallowest_root_wins(self):
+        """Test that the shallowest responding candidate wins even if a deeper one answers first."""
+        loader, _ = self._loader(
+            {"https://host/a", "https://host/a/b"},
+            delays={"https://host/a/capabilities": 0.2})
+        self.assertEqual(loader.discover_registry_root("https://host/a/b/c"), "https://host/a")
+
+    def test_host_root(self):
+        """Test that the host root is found."""
+        loader, _ = self._loader({"https://host"})
+        self.assertEqual(loader.discover_registry_root("https://host/messagegroups/x"), "https://host")
+
+    def test_fallback_to_base(self):
+        """Test that the base URL is used if no candidate responds."""
+        loader, _ = self._loader(set())
+        self.assertEqual(loader.discover_registry_root("https://host/a/b"), "https://host")
+
+    def test_non_http_url(self):
+        """Test that file paths are not probed."""
+        loader, probes = self._loader(set())
+        self.assertIsNone(loader.discover_registry_root("/local/file.json"))
+        self.assertEqual(probes, [])
+
+    def test_roots_are_shared_between_loaders(self):
+        """Test that a second loader reuses the root discovered by the first."""
+        cache = RegistryRootCache()
+        first, _ = self._loader({"https://host/reg"}, cache=cache)
+        first.discover_registry_root("https://host/reg/messagegroups/x")
+        second, probes = self._loader({"https://host/reg"}, cache=cache)
+
+        self.assertEqual(second.discover_registry_root("https://host/reg/schemagroups/y"), "https://host/reg")
+        self.assertEqual(probes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Unit tests for incremental regeneration with the dependency manifest.
+
+Tests cover the template and document inputs of render units, reusing and
+recording units, and rendering the code templates of a document again after
+one message group, a template or an output file changed.
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+import jinja2
+
+from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.output_writer import OutputStats
+from xrcg.generator.parallel_render import RenderEffects
+from xrcg.generator.render_manifest import MANIFEST_FILE, RenderManifest, normalize
+from xrcg.generator.template_renderer import TemplateRenderer
+
+DOCUMENT = {
+    "endpoints": {"endpoint": {"endpointid": "endpoint"}},
+    "messagegroups": {f"group{i}": {"messagegroupid": f"group{i}", "messages": {}} for i in range(3)},
+}
+
+TEMPLATES = {
+    "{classname}.jinja": ("{% include 'header.jinja.include' %}{{ class_name }}{{ ('class ' + class_name) | push('names') }}"
+                          "{% set _ = ('#/' + class_name) | mark_handled %}"),
+    "{projectname}.jinja": "{{ root.messagegroups | length }} groups{{ (project_name + '.cfg') | pushfile('cfg.txt') }}",
+    "header.jinja.include": "// header\n",
+}
+
+
+class TestRenderManifest(unittest.TestCase):
+    """Test the inputs, reuse and recording of units."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.manifest = RenderManifest(self.temp_dir)
+
+    def test_template_inputs(self):
+        """Test that included templates are inputs, and all templates for includes resolved while rendering."""
+        env = jinja2.Environment(loader=jinja2.DictLoader({
+            "main.jinja": "{% include 'a.jinja' %}", "a.jinja": "a", "b.jinja": "b",
+            "dynamic.jinja": "{% include name %}"}))
+        self.assertEqual(list(self.manifest.template_inputs(env, "main.jinja")), ["a.jinja", "main.jinja"])
+        self.assertEqual(list(self.manifest.template_inputs(env, "dynamic.jinja")),
+                         ["a.jinja", "b.jinja", "dynamic.jinja", "main.jinja"])
+
+    def test_document_inputs(self):
+        """Test that a message group depends on itself, the endpoints and the schema groups."""
+        document = copy.deepcopy(DOCUMENT)
+        self.assertEqual(list(self.manifest.document_inputs(document)), ["/"])
+        inputs = self.manifest.document_inputs(document, "group1")
+        self.assertEqual(list(inputs), ["/messagegroups/group1", "/endpoints/endpoint", "/schemagroups"])
+        changed = copy.deepcopy(DOCUMENT)
+        changed["messagegroups"]["group2"]["description"] = "changed"
+        self.assertEqual(self.manifest.document_inputs(changed, "group1"), inputs)
+        self.assertNotEqual(self.manifest.document_inputs(changed, "group2"),
+                            self.manifest.document_inputs(document, "group2"))
+
+    def _record(self, values):
+        """Record a unit that wrote a file; return its key, inputs and output path."""
+        path = os.path.join(self.temp_dir, "out.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("output")
+        stats = OutputStats()
+        stats.record(path, "written")
+        key, inputs = self.manifest.key("t.jinja", path), normalize({"args": {"x": 1}})
+        self.manifest.record(key, inputs, RenderEffects(
+            {"names": ["a"], "files": [("cfg", "content")]}, values, {"#/s"}, self.temp_dir, stats, {"#/h"}))
+        return key, inputs, path
+
+    def test_reuse(self):
+        """Test that a unit with the recorded inputs and outputs is reused with its context changes."""
+        key, inputs, path = self._record({"last": "a"})
+        self.manifest.save()
+        manifest = RenderManifest.load(self.temp_dir)
+        self.assertIsNone(manifest.reuse(key, normalize({"args": {"x": 2}})))
+        effects = manifest.reuse(key, inputs)
+        self.assertEqual(effects, RenderEffects({"names": ["a"], "files": [("cfg", "content")]}, {"last": "a"},
+                                                {"#/s"}, self.temp_dir, OutputStats({path: "unchanged"}), {"#/h"}))
+        self.assertEqual(str(manifest), "0 rendered, 1 reused")
+
+    def test_changed_output_is_not_reused(self):
+        """Test that a unit whose output file changed or is gone is rendered again."""
+        key, inputs, path = self._record({})
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("edited")
+        self.assertIsNone(self.manifest.reuse(key, inputs))
+        os.remove(path)
+        self.assertIsNone(self.manifest.reuse(key, inputs))
+
+    def test_values_json_cannot_hold_are_not_recorded(self):
+        """Test that a unit that saved a value JSON cannot hold is not recorded."""
+        key, _, _ = self._record({"last": ("a", "b")})
+        self.assertNotIn(key, self.manifest.units)
+
+
+class TestIncrementalRendering(unittest.TestCase):
+    """Test TemplateRenderer.render_code_templates with a RenderManifest."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.template_dir = os.path.join(self.temp_dir, "templates")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.template_dir)
+        for name, text in TEMPLATES.items():
+            self._write_template(name, text)
+
+    def _write_template(self, name, text):
+        with open(os.path.join(self.template_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _render(self, document):
+        """Render the templates into the output directory; return the manifest and the renderer."""
+        ctx = GeneratorContext(self.output_dir)
+        ctx.set_current_dir(self.output_dir)
+        ctx.manifest = RenderManifest.load(self.output_dir)
+        renderer = TemplateRenderer(ctx, "Test", "py", "test", self.output_dir, "", {}, [], {}, False, True)
+        # A new environment, so that changed templates are loaded again
+        env = renderer._create_jinja_env([self.template_dir], None)
+        renderer._bind_jinja_env(env)
+        renderer.render_code_templates("Test", "Test", "TestData", "test", self.output_dir, document,
+                                       [self.template_dir], env, False, {})
+        ctx.manifest.save()
+        return ctx.manifest, renderer
+
+    def test_unchanged_document_is_not_rendered(self):
+        """Test that the second run reuses every unit and leaves the context as rendering does."""
+        manifest, renderer = self._render(DOCUMENT)
+        self.assertEqual(str(manifest), "4 rendered, 0 reused")
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, MANIFEST_FILE)))
+        self.assertEqual(renderer.handled_resources, {"#/group0", "#/group1", "#/group2"})
+        manifest, second = self._render(copy.deepcopy(DOCUMENT))
+        self.assertEqual(str(manifest), "0 rendered, 4 reused")
+        self.assertEqual(second.ctx.stacks.context_stacks, renderer.ctx.stacks.context_stacks)
+        self.assertEqual(second.handled_resources, renderer.handled_resources)
+        self.assertEqual(str(second.ctx.output_stats), "0 written, 4 unchanged, 0 deleted")
+
+    def test_changed_group(self):
+        """Test that a changed message group renders its own unit and the units of the whole document."""
+        self._render(DOCUMENT)
+        document = copy.deepcopy(DOCUMENT)
+        document["messagegroups"]["group1"]["description"] = "changed"
+        manifest, _ = self._render(document)
+        self.assertEqual(str(manifest), "2 rendered, 2 reused")
+        self.assertEqual(sorted(manifest.units), sorted(RenderManifest.load(self.output_dir).previous))
+
+    def test_changed_include(self):
+        """Test that a changed include renders the templates including it."""
+        self._render(DOCUMENT)
+        self._write_template("header.jinja.include", "// new header\n")
+        manifest, _ = self._render(DOCUMENT)
+        self.assertEqual(str(manifest), "3 rendered, 1 reused")
+        with open(os.path.join(self.output_dir, "group0"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "// new headergroup0")
+
+
+if __name__ == '__main__':
+    unittest.main()
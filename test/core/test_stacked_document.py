@@ -0,0 +1,126 @@
+"""
+Unit tests for stacked document merging.
+
+Tests cover shadowing at collection, group and resource level, sharing of
+untouched subtrees, deep stacks, and the layer each resource is reported to
+come from.
+"""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from xrcg.generator.stacked_document import StackedDocument
+from xrcg.generator.xregistry_loader import XRegistryLoader
+
+MODEL_GROUPS = {
+    "messagegroups": {"resources": {"messages": {"singular": "message"}}},
+    "schemagroups": {"resources": {"schemas": {"singular": "schema"}}},
+}
+
+
+class TestStackedDocument(unittest.TestCase):
+    """Test merging layers with StackedDocument."""
+
+    def setUp(self):
+        self.base = {
+            "specversion": "0.5",
+            "messagegroups": {
+                "g": {"description": "base", "messages": {"a": {"v": 1}, "b": {"v": 1}}},
+                "h": {"messages": {"c": {"v": 1}}},
+            },
+            "schemagroups": {"s": {"schemas": {"x": {"v": 1}}}},
+        }
+        self.overlay = {
+            "specversion": "1.0",
+            "messagegroups": {
+                "g": {"description": "overlay", "messages": {"b": {"v": 2}, "d": {"v": 2}}},
+                "i": {"messages": {"e": {"v": 2}}},
+            },
+            "schemagroups": "replaced",
+        }
+
+    def test_merge(self):
+        """Test shadowing by ID at every level and replacement of everything else."""
+        layers = [("base.json", self.base), ("overlay.json", self.overlay)]
+        originals = copy.deepcopy(layers)
+        merged = StackedDocument(MODEL_GROUPS, layers).merge()
+        self.assertEqual(merged, {
+            "specversion": "1.0",
+            "messagegroups": {
+                "g": {"description": "overlay", "messages": {"a": {"v": 1}, "b": {"v": 2}, "d": {"v": 2}}},
+                "h": {"messages": {"c": {"v": 1}}},
+                "i": {"messages": {"e": {"v": 2}}},
+            },
+            "schemagroups": "replaced",
+        })
+        self.assertEqual(layers, originals)
+        # Untouched subtrees are shared with their layer
+        self.assertIs(merged["messagegroups"]["h"], self.base["messagegroups"]["h"])
+        self.assertIs(merged["messagegroups"]["g"]["messages"]["a"], self.base["messagegroups"]["g"]["messages"]["a"])
+
+    def test_single_layer_is_returned_as_is(self):
+        """Test that a stack of one document is that document."""
+        self.assertIs(StackedDocument(MODEL_GROUPS, [("base.json", self.base)]).merge(), self.base)
+
+    def test_deep_stack(self):
+        """Test that every layer shadows the ones below it and none of them is modified."""
+        layers = [(f"layer{n}.json", {"messagegroups": {"g": {"messages": {f"m{n}": {"v": n}, "shared": {"v": n}}}}})
+                  for n in range(12)]
+        originals = copy.deepcopy(layers)
+        stack = StackedDocument(MODEL_GROUPS, layers)
+        messages = stack.merge()["messagegroups"]["g"]["messages"]
+        self.assertEqual(messages["shared"], {"v": 11})
+        self.assertEqual(sorted(messages), sorted([f"m{n}" for n in range(12)] + ["shared"]))
+        self.assertEqual(layers, originals)
+        self.assertEqual(stack.origins()["/messagegroups/g/messages/shared"], "layer11.json")
+        self.assertEqual(stack.origins()["/messagegroups/g/messages/m3"], "layer3.json")
+
+    def test_origins(self):
+        """Test the reported layer of every resource."""
+        stack = StackedDocument(MODEL_GROUPS, [("base.json", self.base), ("overlay.json", self.overlay)])
+        self.assertEqual(stack.origins(), {
+            "/messagegroups/g/messages/a": "base.json",
+            "/messagegroups/g/messages/b": "overlay.json",
+            "/messagegroups/g/messages/d": "overlay.json",
+            "/messagegroups/h/messages/c": "base.json",
+            "/messagegroups/i/messages/e": "overlay.json",
+        })
+        self.assertIn("/messagegroups/g/messages/b <- overlay.json", stack.describe_origins())
+
+
+class TestLoadStackedOrigins(unittest.TestCase):
+    """Test the origins recorded by XRegistryLoader.load_stacked."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        return path
+
+    def test_trace_stack(self):
+        """Test that load_stacked records the origins only when tracing."""
+        base = self._write("base.json", {"messagegroups": {"g": {"messages": {"a": {}, "b": {}}}}})
+        overlay = self._write("overlay.json", {"messagegroups": {"g": {"messages": {"b": {}}}}})
+        loader = XRegistryLoader()
+        loader.load_stacked([base, overlay])
+        self.assertEqual(loader.stack_origins, {})
+
+        loader.trace_stack = True
+        _, document = loader.load_stacked([base, overlay])
+        self.assertEqual(loader.stack_origins, {
+            "/messagegroups/g/messages/a": base,
+            "/messagegroups/g/messages/b": overlay,
+        })
+        self.assertEqual(sorted(document["messagegroups"]["g"]["messages"]), ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Unit tests for the template bytecode cache and the shared Jinja environments.
+
+Tests cover reuse of compiled templates across environments, recompilation
+of changed templates, the precompiled fallback, keys of built-in templates,
+caches that cannot be written, and the Jinja environments shared by
+template renderers.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import jinja2
+
+from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.template_cache import (TEMPLATES_ROOT, TemplateBytecodeCache, precompile,
+                                           template_environment)
+from xrcg.generator.template_renderer import TemplateRenderer
+
+
+class TestTemplateBytecodeCache(unittest.TestCase):
+    """Test TemplateBytecodeCache with template_environment."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.template_dir = os.path.join(self.temp_dir, "templates")
+        os.makedirs(self.template_dir)
+        self.cache_dir = Path(self.temp_dir) / "cache"
+        self.precompiled_dir = Path(self.temp_dir) / "precompiled"
+        self._write("hello.jinja", "Hello {{ name }}")
+
+    def _write(self, name, text):
+        with open(os.path.join(self.template_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _render(self, cache, name="hello.jinja"):
+        """Render a template in a new environment; return the output and the number of compilations."""
+        env = template_environment([self.template_dir], cache)
+        with patch.object(jinja2.Environment, "compile", autospec=True,
+                          side_effect=jinja2.Environment.compile) as compile_mock:
+            output = env.get_template(name).render(name="xrcg")
+        return output, compile_mock.call_count
+
+    def test_compiled_template_is_reused(self):
+        """Test that a second environment loads the template without compiling it."""
+        cache = TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)
+        self.assertEqual(self._render(cache), ("Hello xrcg", 1))
+        self.assertEqual(self._render(TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)), ("Hello xrcg", 0))
+        self.assertEqual(len(list(self.cache_dir.glob("*.cache"))), 1)
+        self.assertEqual(list(self.cache_dir.glob("*.tmp")), [])
+
+    def test_changed_template_is_recompiled(self):
+        """Test that an entry whose source checksum does not match is replaced."""
+        cache = TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)
+        self._render(cache)
+        self._write("hello.jinja", "Goodbye {{ name }}")
+        self.assertEqual(self._render(cache), ("Goodbye xrcg", 1))
+        self.assertEqual(self._render(cache), ("Goodbye xrcg", 0))
+
+    def test_precompiled_fallback(self):
+        """Test that precompiled entries are read but new entries go to the cache directory."""
+        self._render(TemplateBytecodeCache(self.precompiled_dir, self.precompiled_dir))
+        precompiled = sorted(self.precompiled_dir.iterdir())
+        cache = TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)
+        self.assertEqual(self._render(cache), ("Hello xrcg", 0))
+        self._write("other.jinja", "Other {{ name }}")
+        self.assertEqual(self._render(cache, "other.jinja"), ("Other xrcg", 1))
+        self.assertEqual(sorted(self.precompiled_dir.iterdir()), precompiled)
+        self.assertEqual(len(list(self.cache_dir.glob("*.cache"))), 1)
+
+    def test_builtin_keys_do_not_depend_on_location(self):
+        """Test that built-in templates are keyed by their path in the template tree."""
+        cache = TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)
+        builtin = os.path.join(TEMPLATES_ROOT, "py", "_common", "util.jinja.include")
+        self.assertEqual(cache.get_cache_key("util.jinja.include", builtin),
+                         cache.get_cache_key("_common/util.jinja.include", builtin))
+        other = os.path.join(self.template_dir, "hello.jinja")
+        self.assertNotEqual(cache.get_cache_key("hello.jinja", other),
+                            cache.get_cache_key("hello.jinja", os.path.join(self.temp_dir, "hello.jinja")))
+
+    def test_unwritable_cache_does_not_fail(self):
+        """Test that templates still render when the cache directory cannot be created."""
+        blocker = Path(self.temp_dir) / "file"
+        blocker.write_text("not a directory")
+        cache = TemplateBytecodeCache(blocker / "cache", self.precompiled_dir)
+        with self.assertLogs("xrcg.generator.template_cache", "WARNING"):
+            self.assertEqual(self._render(cache), ("Hello xrcg", 1))
+
+    def test_precompile(self):
+        """Test that precompile compiles the templates of every template root."""
+        root = os.path.join(self.temp_dir, "root")
+        for relpath, text in (("py/_common/macros.jinja.include", "{% macro m() %}m{% endmacro %}"),
+                              ("py/plain/{projectname}.jinja", "{% import 'macros.jinja.include' as x %}{{ x.m() }}"),
+                              ("py/_schemas/schema.jinja", "{{ missing | unknown_filter }}"),
+                              ("py/plain/_templateinfo.json", "{}")):
+            path = os.path.join(root, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        cache = TemplateBytecodeCache(self.cache_dir, self.precompiled_dir)
+        with self.assertLogs("xrcg.generator.template_cache", "WARNING"):
+            count = precompile(lambda dirs: template_environment(dirs, cache), root)
+        self.assertEqual(count, 2)
+        self.assertEqual(len(list(self.cache_dir.glob("*.cache"))), 2)
+
+
+class TestSharedEnvironments(unittest.TestCase):
+    """Test the Jinja environments TemplateRenderer shares within the process."""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.template_dir, ignore_errors=True)
+        with open(os.path.join(self.template_dir, "push.jinja"), "w", encoding="utf-8") as f:
+            f.write("{{ name | push('names') }}")
+
+    def _renderer(self):
+        ctx = GeneratorContext(self.template_dir)
+        return ctx, TemplateRenderer(ctx, "", "py", "", self.template_dir, "", {}, [], {}, True, True)
+
+    def test_environment_is_shared_and_rebound(self):
+        """Test that renderers share one environment whose stack filters act on the current renderer."""
+        first_ctx, first = self._renderer()
+        second_ctx, second = self._renderer()
+        env = first.setup_jinja_env([self.template_dir])
+        template = env.get_template("push.jinja")
+        template.render(name="a")
+        self.assertIs(second.setup_jinja_env([self.template_dir]), env)
+        with patch.object(jinja2.Environment, "compile", autospec=True,
+                          side_effect=jinja2.Environment.compile) as compile_mock:
+            self.assertIs(env.get_template("push.jinja"), template)
+            template.render(name="b")
+        self.assertEqual(compile_mock.call_count, 0)
+        self.assertEqual(first_ctx.stacks.stack("names"), ["a"])
+        self.assertEqual(second_ctx.stacks.stack("names"), ["b"])
+
+    def test_environment_per_directories(self):
+        """Test that other template directories get their own environment."""
+        _, renderer = self._renderer()
+        self.assertIsNot(renderer.setup_jinja_env([self.template_dir]),
+                         renderer.setup_jinja_env([self.template_dir, TEMPLATES_ROOT]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+"""
+Unit tests for the pooled HTTP transport.
+
+Tests run against a local HTTP/1.1 server and cover connection reuse,
+content decoding, header forwarding and error reporting, as well as the
+per-run request memo and the request counts the command line reports.
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import xrcg
+from xrcg.common.transport import (
+    CoalescingTransport,
+    HttpResponse,
+    HttpTransport,
+    TransportError,
+    get_transport,
+    set_transport,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.server.last_headers = dict(self.headers)
+        if self.path == "/missing":
+            body = b"not found"
+            self.send_response(404, "Not Found")
+        elif self.path == "/gzip":
+            body = gzip.compress(json.dumps({"compressed": True}).encode("utf-8"))
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            body = json.dumps({"path": self.path}).encode("utf-8")
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpTransport(unittest.TestCase):
+    """Test the pooled transport against a local server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.server.connections = set()
+        cls.server.last_headers = {}
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections.clear()
+        self.transport = HttpTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_get_returns_content(self):
+        """Test that a GET returns status, headers and body."""
+        response = self.transport.get(f"{self.base}/doc")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(response.text), {"path": "/doc"})
+        self.assertEqual(response.headers["content-type"], "application/json")
+
+    def test_connections_are_reused(self):
+        """Test that sequential requests share one keep-alive connection."""
+        for i in range(10):
+            self.transport.get(f"{self.base}/doc{i}")
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_gzip_is_decoded(self):
+        """Test that gzip-encoded responses are transparently decoded."""
+        response = self.transport.get(f"{self.base}/gzip")
+        self.assertEqual(json.loads(response.content), {"compressed": True})
+        self.assertIn("gzip", self.server.last_headers.get("Accept-Encoding", ""))
+
+    def test_headers_are_forwarded(self):
+        """Test that request headers reach the server."""
+        self.transport.get(f"{self.base}/doc", {"Authorization": "Bearer token"})
+        self.assertEqual(self.server.last_headers.get("Authorization"), "Bearer token")
+
+    def test_http_error_raises(self):
+        """Test that error statuses raise TransportError with the status."""
+        with self.assertRaises(TransportError) as cm:
+            self.transport.get(f"{self.base}/missing")
+        self.assertEqual(cm.exception.status, 404)
+        self.assertEqual(cm.exception.reason, "Not Found")
+
+    def test_connection_error_raises(self):
+        """Test that connection failures raise TransportError without status."""
+        with self.assertRaises(TransportError) as cm:
+            self.transport.get("http://127.0.0.1:1/unreachable")
+        self.assertIsNone(cm.exception.status)
+
+
+class TestCoalescingTransport(unittest.TestCase):
+    """Test the per-run request memo."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.inner = Mock()
+        self.inner.get.side_effect = self._get
+        self.memo = CoalescingTransport(self.inner)
+
+    def _get(self, url, headers=None, timeout=None, max_age=None):
+        self.calls.append(url)
+        self.release.wait(5)
+        if url.endswith("/missing"):
+            raise TransportError(url, "Not Found", 404)
+        if url.endswith("/down"):
+            raise TransportError(url, "Connection refused")
+        return HttpResponse(url=url, status=200, content=url.encode("utf-8"))
+
+    def test_repeats_are_served_from_memory(self):
+        """Test that a URL is fetched once and counted as hits afterwards."""
+        self.release.set()
+        first = self.memo.get("https://host/a")
+        second = self.memo.get("https://host/a")
+        self.memo.get("https://host/b")
+
+        self.assertIs(second, first)
+        self.assertEqual(self.calls, ["https://host/a", "https://host/b"])
+        self.assertEqual((self.memo.stats.misses, self.memo.stats.hits), (2, 1))
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Test that requests for a URL in flight wait for it instead of fetching again."""
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(self.memo.get, "https://host/a") for _ in range(4)]
+            while self.memo.stats.misses + self.memo.stats.coalesced < 4:
+                time.sleep(0.01)
+            self.release.set()
+            responses = [future.result() for future in futures]
+
+        self.assertEqual(self.calls, ["https://host/a"])
+        self.assertEqual(self.memo.stats.coalesced, 3)
+        self.assertEqual(self.memo.stats.avoided, 3)
+        self.assertTrue(all(response is responses[0] for response in responses))
+
+    def test_headers_are_part_of_the_key(self):
+        """Test that requests with different headers are fetched separately."""
+        self.release.set()
+        self.memo.get("https://host/a", {"Authorization": "a"})
+        self.memo.get("https://host/a", {"authorization": "a"})
+        self.memo.get("https://host/a", {"Authorization": "b"})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_http_errors_are_remembered(self):
+        """Test that an error status is raised again without a new request."""
+        self.release.set()
+        for _ in range(2):
+            with self.assertRaises(TransportError) as cm:
+                self.memo.get("https://host/missing")
+            self.assertEqual(cm.exception.status, 404)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_connection_errors_are_retried(self):
+        """Test that connection failures are not remembered."""
+        self.release.set()
+        for _ in range(2):
+            with self.assertRaises(TransportError):
+                self.memo.get("https://host/down")
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestDefaultTransport(unittest.TestCase):
+    """Test the process-wide default transport."""
+
+    def test_default_transport_is_shared(self):
+        """Test that get_transport returns the same instance until replaced."""
+        self.assertIs(get_transport(), get_transport())
+
+    def test_set_transport_replaces_default(self):
+        """Test that set_transport swaps and returns the previous default."""
+        replacement = HttpTransport(timeout=1)
+        previous = set_transport(replacement)
+        try:
+            self.assertIs(get_transport(), replacement)
+        finally:
+            set_transport(previous)
+            replacement.close()
+
+
+
+class TestRequestStats(unittest.TestCase):
+    """Test the HTTP request counts printed by the command line."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.server.connections = set()
+        cls.server.last_headers = {}
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _validate(self, *options):
+        """Validate a remote document; return the printed lines."""
+        self.addCleanup(set_transport, get_transport())
+        argv = ["xrcg", "--no-cache", *options, "validate", "--definitions", f"{self.base}/doc"]
+        stdout = io.StringIO()
+        with patch.object(sys, "argv", argv), contextlib.redirect_stdout(stdout):
+            self.assertEqual(xrcg.cli(), 0)
+        return stdout.getvalue().splitlines()
+
+    def test_stats_are_printed(self):
+        """Test that --stats ends the output with the request counts."""
+        self.assertEqual(self._validate("--stats")[-1],
+                         "HTTP requests: 1 sent, 0 served from memory, 0 coalesced with a request in flight")
+
+    def test_no_stats_by_default(self):
+        """Test that the request counts are only printed with --stats."""
+        self.assertFalse([line for line in self._validate() if line.startswith("HTTP requests:")])
+
+
+if __name__ == '__main__':
+    unittest.main()
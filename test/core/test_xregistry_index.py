@@ -0,0 +1,154 @@
+"""
+Unit tests for the xRegistry document index.
+
+Tests cover XID, pointer and self URL lookups, parent chains, agreement with
+jsonpointer, node to pointer lookups, and lookups after the document was
+mutated.
+"""
+
+import unittest
+
+import jsonpointer
+
+from xrcg.generator.schema_utils import SchemaUtils
+from xrcg.generator.xregistry_index import XRegistryIndex
+
+
+def _document():
+    return {
+        "messagegroups": {
+            "g": {
+                "messagegroupid": "g",
+                "messages": {
+                    "m": {
+                        "messageid": "m",
+                        "self": "https://example.com/registry/messagegroups/g/messages/m",
+                        "envelopemetadata": {"type": {"value": "com.example.m"}},
+                    },
+                },
+            },
+        },
+        "schemagroups": {
+            "s": {
+                "schemas": {
+                    "a/b": {
+                        "versions": {
+                            "1": {
+                                "format": "JsonSchema/draft-07",
+                                "schema": {"definitions": {"X": {"type": "object"}}, "required": ["x", "y"]},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    }
+
+
+class TestXRegistryIndex(unittest.TestCase):
+    """Test lookups through XRegistryIndex."""
+
+    def setUp(self):
+        self.document = _document()
+        self.index = XRegistryIndex(self.document)
+        self.message = self.document["messagegroups"]["g"]["messages"]["m"]
+
+    def test_reference_forms(self):
+        """Test that XIDs, both pointer forms and self URLs find the same node."""
+        for ref in ("/messagegroups/g/messages/m", "/messagegroups/g/messages/m/",
+                    "#/messagegroups/g/messages/m", "#messagegroups/g/messages/m",
+                    "https://example.com/registry/messagegroups/g/messages/m/"):
+            self.assertIs(self.index.resolve(ref), self.message, ref)
+        self.assertIsNone(self.index.resolve("/messagegroups/g/messages/other"))
+        self.assertIsNone(self.index.resolve("https://example.com/registry/messagegroups/g/messages/other"))
+
+    def test_resolve_pointer_matches_jsonpointer(self):
+        """Test that pointers resolve exactly like jsonpointer, including errors."""
+        pointers = ["", "/messagegroups", "/messagegroups/g/messages/m/envelopemetadata/type/value",
+                    "/schemagroups/s/schemas/a~1b/versions/1/schema/definitions/X",
+                    "/schemagroups/s/schemas/a~1b/versions/1/schema/required/1"]
+        for pointer in pointers:
+            self.assertIs(self.index.resolve_pointer(pointer), jsonpointer.resolve_pointer(self.document, pointer))
+        for pointer in ("messagegroups", "/missing", "/schemagroups/s/schemas/a~1b/versions/1/schema/required/01",
+                        "/messagegroups/g/messageid/x"):
+            with self.assertRaises(jsonpointer.JsonPointerException):
+                jsonpointer.resolve_pointer(self.document, pointer)
+            with self.assertRaises(jsonpointer.JsonPointerException):
+                self.index.resolve_pointer(pointer)
+
+    def test_parents(self):
+        """Test that parent chains start at the root and end at the direct parent."""
+        parents = self.index.parents("#/messagegroups/g/messages/m")
+        self.assertEqual(len(parents), 4)
+        self.assertIs(parents[0], self.document)
+        self.assertIs(parents[-1], self.document["messagegroups"]["g"]["messages"])
+        self.assertEqual(self.index.parents("#"), [])
+        self.assertIsNone(self.index.parents("/messagegroups/missing/messages/m"))
+
+    def test_replaced_nodes_are_found(self):
+        """Test that lookups see nodes replaced after the index was built."""
+        self.index.resolve("/messagegroups/g/messages/m")
+        replacement = {"messageid": "m", "self": self.message["self"]}
+        self.document["messagegroups"]["g"]["messages"]["m"] = replacement
+        self.assertIs(self.index.resolve("/messagegroups/g/messages/m"), replacement)
+        self.assertIs(self.index.resolve(self.message["self"]), replacement)
+        self.document["messagegroups"] = {}
+        self.assertIsNone(self.index.resolve("/messagegroups/g/messages/m"))
+        self.assertIsNone(self.index.resolve(self.message["self"]))
+
+    def test_added_resources_are_found(self):
+        """Test that resources added after the index was built are found by XID and URL."""
+        added = {"messageid": "n", "self": "https://example.com/registry/messagegroups/g/messages/n"}
+        self.document["messagegroups"]["g"]["messages"]["n"] = added
+        self.assertIs(self.index.resolve("/messagegroups/g/messages/n"), added)
+        self.assertIs(self.index.resolve(added["self"]), added)
+
+    def test_pointer_of(self):
+        """Test that nodes map to the pointer of their first occurrence."""
+        schema = self.document["schemagroups"]["s"]["schemas"]["a/b"]["versions"]["1"]["schema"]
+        self.assertEqual(self.index.pointer_of(self.document), "")
+        self.assertEqual(self.index.pointer_of(schema["definitions"]["X"]),
+                         "/schemagroups/s/schemas/a~1b/versions/1/schema/definitions/X")
+        self.assertEqual(self.index.pointer_of(schema["required"][1]),
+                         "/schemagroups/s/schemas/a~1b/versions/1/schema/required/1")
+        self.assertIsNone(self.index.pointer_of({"type": "object"}))
+        # Shared subtrees resolve to their first occurrence
+        self.document["endpoints"] = {"e": {"messages": {"m": self.message}}}
+        self.assertEqual(self.index.pointer_of(self.message["envelopemetadata"]),
+                         "/messagegroups/g/messages/m/envelopemetadata")
+
+    def test_pointer_of_moved_node(self):
+        """Test that a node moved after the map was built gets its new pointer."""
+        self.assertEqual(self.index.pointer_of(self.message), "/messagegroups/g/messages/m")
+        del self.document["messagegroups"]["g"]["messages"]["m"]
+        self.document["messagegroups"]["g"]["messages"]["renamed"] = self.message
+        self.assertEqual(self.index.pointer_of(self.message), "/messagegroups/g/messages/renamed")
+
+    def test_get_json_pointer(self):
+        """Test SchemaUtils.get_json_pointer for registered and unregistered documents."""
+        proto = 'syntax = "proto3"; message M {}'
+        self.message["dataschema"] = proto
+        scope = {"messagegroups": {"g": self.document["messagegroups"]["g"]}}
+        self.assertEqual(SchemaUtils.get_json_pointer(scope, proto), "/messagegroups/g/messages/m/dataschema")
+        XRegistryIndex.for_document(self.document)
+        self.addCleanup(XRegistryIndex.release, self.document)
+        self.assertEqual(SchemaUtils.get_json_pointer(self.document, proto), "/messagegroups/g/messages/m/dataschema")
+        with self.assertRaises(RuntimeError):
+            SchemaUtils.get_json_pointer(self.document, "not in the document")
+
+    def test_registered_index_is_shared(self):
+        """Test that for_document returns one index per document until it is released."""
+        index = XRegistryIndex.for_document(self.document)
+        self.addCleanup(XRegistryIndex.release, self.document)
+        self.assertIs(XRegistryIndex.for_document(self.document), index)
+        self.assertIs(XRegistryIndex.registered(self.document), index)
+        self.assertIs(XRegistryIndex.resolve_pointer_in(self.document, "/messagegroups/g"),
+                      self.document["messagegroups"]["g"])
+        XRegistryIndex.release(self.document)
+        self.assertIsNone(XRegistryIndex.registered(self.document))
+        self.assertIs(XRegistryIndex.resolve_pointer_in(self.document, "/messagegroups/g"),
+                      self.document["messagegroups"]["g"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,10 +8,14 @@ edge cases and error conditions.
 
 import json
 import os
+import shutil
 import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch, mock_open
 import base64
+import yaml
 from typing import Dict, Any
 
 from xrcg.generator.xregistry_loader import (
@@ -21,6 +25,7 @@ from xrcg.generator.xregistry_loader import (
     XRegistryLoader
 )
 from xrcg.common.model import Model
+from xrcg.common.transport import HttpResponse, TransportError
 
 
 class TestXRegistryUrlParser(unittest.TestCase):
@@ -184,6 +189,65 @@ class TestDependencyResolver(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn("schemagroups", result)
 
+    def _composed_document(self):
+        return {
+            "messagegroups": {
+                "mg": {
+                    "messagegroupid": "mg",
+                    "baseuri": "https://example.com/messagegroups/base/messages/b",
+                    "messages": {
+                        "m1": {"dataschemauri": "https://example.com/schemagroups/sg/schemas/s1"},
+                        "m2": {"versions": {"1": {"dataschemauri": "/schemagroups/sg/schemas/s2"}}},
+                    },
+                },
+            },
+            "schemagroups": {"sg": {"schemas": {"s1": {"schemaurl": "https://example.com/schemagroups/sg/schemas/s1"}}}},
+        }
+    
+    def test_collect_references_matches_full_scan(self):
+        """Test that collect_references returns what scanning each group type returns."""
+        def full_scan(doc):
+            refs = []
+            for group_type in self.mock_model.groups:
+                refs.extend(self.resolver.find_xid_references({group_type: doc[group_type]}, group_type))
+            return refs
+        
+        doc = self._composed_document()
+        self.assertEqual(self.resolver.collect_references(doc), full_scan(doc))
+        doc["messagegroups"]["mg"]["messages"]["m2"]["versions"]["2"] = {
+            "dataschemauri": "https://example.com/schemagroups/sg/schemas/s3"}
+        doc["schemagroups"]["sg"]["schemas"]["s1"] = {}
+        refs = self.resolver.collect_references(doc)
+        self.assertEqual(refs, full_scan(doc))
+        self.assertIn("https://example.com/schemagroups/sg/schemas/s3", refs)
+    
+    def test_collect_references_scans_changed_parts_only(self):
+        """Test that unchanged resources are not scanned again."""
+        doc = self._composed_document()
+        self.resolver.collect_references(doc)
+        doc["messagegroups"]["mg"]["messages"]["m3"] = {
+            "dataschemauri": "https://example.com/schemagroups/sg/schemas/s4"}
+        with patch.object(self.resolver, "find_xid_references",
+                          wraps=self.resolver.find_xid_references) as scan:
+            refs = self.resolver.collect_references(doc)
+        scanned_keys = {key for call in scan.call_args_list if isinstance(call.args[0], dict)
+                        for key in call.args[0]}
+        self.assertIn("m3", scanned_keys)
+        self.assertFalse(scanned_keys & {"m1", "m2", "s1", "messagegroupid", "baseuri"})
+        self.assertIn("https://example.com/schemagroups/sg/schemas/s4", refs)
+    
+    def test_dependency_graph(self):
+        """Test that the graph records who references whom."""
+        doc = self._composed_document()
+        self.resolver.collect_references(doc)
+        graph = self.resolver.graph
+        self.assertEqual(graph.references("/messagegroups/mg"),
+                         ["https://example.com/messagegroups/base/messages/b"])
+        self.assertEqual(graph.references("/messagegroups/mg/messages/m2"), ["/schemagroups/sg/schemas/s2"])
+        self.assertEqual(sorted(graph.dependents("https://example.com/schemagroups/sg/schemas/s1")),
+                         ["/messagegroups/mg/messages/m1", "/schemagroups/sg/schemas/s1"])
+        self.assertEqual(len(list(graph.edges())), 4)
+
 
 class TestResourceResolver(unittest.TestCase):
     """Test resource resolution functionality."""
@@ -324,6 +388,63 @@ class TestResourceResolver(unittest.TestCase):
         self.assertNotIn("schema", entity)
 
 
+class TestParallelResourceResolution(unittest.TestCase):
+    """Test the concurrent fetch phase of resolve_all_resources."""
+    
+    def _loader(self, fetch_concurrency=8):
+        with patch('xrcg.generator.xregistry_loader.Model'):
+            loader = XRegistryLoader(fetch_concurrency=fetch_concurrency)
+        loader.model.groups = {"schemagroups": {"resources": {"schemas": {"singular": "schema"}}}}
+        in_flight = [0, 0]
+        lock = threading.Lock()
+        
+        def _fake_fetch(url, headers):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return url, {"title": url.rsplit("/", 1)[-1]}
+        
+        loader._load_from_url = Mock(side_effect=_fake_fetch)
+        return loader, in_flight
+    
+    def _document(self):
+        versions = {str(i): {"schemaurl": f"https://example.com/s{i % 4}"} for i in range(8)}
+        versions["inline"] = {"schema": {"title": "inline"}}
+        versions["legacy"] = {"resourceurl": "https://example.com/legacy"}
+        return {"schemagroups": {"g": {"schemas": {"s": {"versions": versions}}}}}
+    
+    def test_urls_are_fetched_concurrently_once(self):
+        """Test that distinct URLs are fetched in parallel and each only once."""
+        loader, in_flight = self._loader()
+        document = self._document()
+        
+        loader.resource_resolver.resolve_all_resources(document, {})
+        
+        versions = document["schemagroups"]["g"]["schemas"]["s"]["versions"]
+        self.assertEqual(loader._load_from_url.call_count, 5)
+        self.assertGreater(in_flight[1], 1)
+        self.assertEqual(versions["5"]["schema"], {"title": "s1"})
+        self.assertEqual(versions["legacy"]["schema"], {"title": "legacy"})
+        self.assertEqual(versions["inline"]["schema"], {"title": "inline"})
+        # Entities sharing a URL do not share the payload object
+        self.assertIsNot(versions["1"]["schema"], versions["5"]["schema"])
+    
+    def test_concurrent_result_matches_sequential(self):
+        """Test that the resolved document does not depend on the fetch concurrency."""
+        sequential_loader, in_flight = self._loader(fetch_concurrency=1)
+        sequential = self._document()
+        sequential_loader.resource_resolver.resolve_all_resources(sequential, {})
+        concurrent_loader, _ = self._loader()
+        concurrent = self._document()
+        concurrent_loader.resource_resolver.resolve_all_resources(concurrent, {})
+        
+        self.assertEqual(in_flight[1], 1)
+        self.assertEqual(json.dumps(concurrent), json.dumps(sequential))
+
+
 class TestXRegistryLoader(unittest.TestCase):
     """Test main loader functionality."""
     
@@ -390,47 +511,51 @@ class TestXRegistryLoader(unittest.TestCase):
         self.assertEqual(result_uri, "/nonexistent/file.json")
         self.assertIsNone(result_data)
     
-    @patch('urllib.request.urlopen')
-    def test_load_from_url(self, mock_urlopen):
+    def test_load_from_url(self):
         """Test loading from HTTP URL."""
-        from unittest.mock import MagicMock
         test_data = {"test": "data"}
         test_json = json.dumps(test_data)
         
-        # Mock HTTP response - use MagicMock to support context manager protocol
-        mock_response = MagicMock()
-        mock_response.read.return_value = test_json.encode('utf-8')
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+        mock_transport = Mock()
+        mock_transport.get.return_value = HttpResponse(
+            url="https://example.com/test.json", status=200,
+            content=test_json.encode('utf-8'))
+        self.loader.transport = mock_transport
         
         result_uri, result_data = self.loader._load_from_url("https://example.com/test.json", {})
         
         self.assertEqual(result_uri, "https://example.com/test.json")
         self.assertEqual(result_data, test_data)
     
-    @patch('urllib.request.urlopen')
-    def test_load_from_url_with_headers(self, mock_urlopen):
+    def test_load_from_url_with_headers(self):
         """Test loading from HTTP URL with custom headers."""
-        from unittest.mock import MagicMock
         test_data = {"test": "data"}
         test_json = json.dumps(test_data)
         
-        # Mock HTTP response - use MagicMock to support context manager protocol
-        mock_response = MagicMock()
-        mock_response.read.return_value = test_json.encode('utf-8')
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+        mock_transport = Mock()
+        mock_transport.get.return_value = HttpResponse(
+            url="https://example.com/test.json", status=200,
+            content=test_json.encode('utf-8'))
+        self.loader.transport = mock_transport
         
         headers = {"Authorization": "Bearer token", "Content-Type": "application/json"}
         
-        with patch('urllib.request.Request') as mock_request:
-            result_uri, result_data = self.loader._load_from_url("https://example.com/test.json", headers)
-            
-            # Verify headers were added to request
-            mock_request_instance = mock_request.return_value
-            self.assertEqual(mock_request_instance.add_header.call_count, 2)
+        self.loader._load_from_url("https://example.com/test.json", headers)
+        
+        # Verify headers were passed to the transport
+        mock_transport.get.assert_called_once_with("https://example.com/test.json", headers)
+    
+    def test_load_from_url_http_error(self):
+        """Test that HTTP errors yield no document."""
+        mock_transport = Mock()
+        mock_transport.get.side_effect = TransportError(
+            "https://example.com/missing.json", "Not Found", 404)
+        self.loader.transport = mock_transport
+        
+        result_uri, result_data = self.loader._load_from_url("https://example.com/missing.json", {})
+        
+        self.assertEqual(result_uri, "https://example.com/missing.json")
+        self.assertIsNone(result_data)
     
     def test_parse_json_content(self):
         """Test parsing JSON content."""
@@ -465,6 +590,45 @@ class TestXRegistryLoader(unittest.TestCase):
         
         self.assertIsNone(result)
     
+    def _write_temp(self, suffix, data):
+        with tempfile.NamedTemporaryFile(mode='wb', suffix=suffix, delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+    
+    def test_parse_file_by_extension(self):
+        """Test that JSON and YAML files are parsed by their extension."""
+        json_path = self._write_temp(".json", b'{"a": [1, 2]}')
+        yaml_path = self._write_temp(".yaml", b"a:\n  - 1\n  - 2\n")
+        
+        self.assertEqual(self.loader._parse_file(json_path), {"a": [1, 2]})
+        self.assertEqual(self.loader._parse_file(yaml_path), {"a": [1, 2]})
+    
+    def test_parse_file_sniffs_unknown_extension(self):
+        """Test that files without a known extension are sniffed."""
+        json_path = self._write_temp(".xreg", b'\n  {"a": 1}')
+        yaml_path = self._write_temp(".xreg", b"a: 1\n")
+        
+        with patch.object(yaml, 'safe_load', wraps=yaml.safe_load) as safe_load:
+            self.assertEqual(self.loader._parse_file(json_path), {"a": 1})
+            safe_load.assert_not_called()
+        self.assertEqual(self.loader._parse_file(yaml_path), {"a": 1})
+    
+    def test_parse_file_with_bom(self):
+        """Test that a UTF-8 byte order mark is skipped."""
+        path = self._write_temp(".json", b'\xef\xbb\xbf{"a": "\xc3\xa4"}')
+        self.assertEqual(self.loader._parse_file(path), {"a": "\u00e4"})
+    
+    def test_parse_file_yaml_with_json_extension(self):
+        """Test that a .json file holding YAML still loads."""
+        path = self._write_temp(".json", b"a: 1\n")
+        self.assertEqual(self.loader._parse_file(path), {"a": 1})
+    
+    def test_parse_empty_file(self):
+        """Test that an empty file yields no document."""
+        path = self._write_temp(".json", b"")
+        self.assertIsNone(self.loader._parse_file(path))
+    
     def test_messagegroup_filter(self):
         """Test message group filtering."""
         test_data = {
@@ -714,6 +878,82 @@ class TestIntegration(unittest.TestCase):
             self.assertEqual(order_version["schema"]["type"], "object")
 
 
+class TestConcurrentDependencyResolution(unittest.TestCase):
+    """Test that concurrent dependency waves compose the same document."""
+    
+    REGISTRY = "https://registry.example.com"
+    
+    def setUp(self):
+        """Set up a fake remote registry."""
+        r = self.REGISTRY
+        self.documents = {
+            f"{r}/messagegroups/orders": {
+                "messages": {
+                    f"m{i}": {"dataschemauri": f"{r}/schemagroups/sg{i % 3}/schemas/s{i}"}
+                    for i in range(12)
+                }
+            },
+        }
+        for i in range(12):
+            self.documents[f"{r}/schemagroups/sg{i % 3}/schemas/s{i}"] = {
+                "versions": {"1": {
+                    "schema": {"type": "object", "title": f"s{i}"},
+                    # nested reference followed by resolve_reference
+                    "basedataschemauri": f"{r}/schemagroups/common/schemas/base{i % 2}"
+                }}
+            }
+        for i in range(3):
+            self.documents[f"{r}/schemagroups/sg{i}"] = {"description": f"group {i}"}
+        for i in range(2):
+            self.documents[f"{r}/schemagroups/common/schemas/base{i}"] = {
+                "versions": {"1": {"schema": {"type": "string"}}}
+            }
+        self.documents[f"{r}/schemagroups/common"] = {"description": "common"}
+    
+    def _load(self, fetch_concurrency):
+        with patch('xrcg.generator.xregistry_loader.Model'):
+            loader = XRegistryLoader(fetch_concurrency=fetch_concurrency)
+        loader.model.groups = {
+            "schemagroups": {"resources": {"schemas": {"singular": "schema"}}},
+            "messagegroups": {"resources": {"messages": {"singular": "message"}}}
+        }
+        loader.discover_registry_root = Mock(return_value=self.REGISTRY)
+        fetched = []
+        
+        def _fake_fetch(url, headers):
+            fetched.append(url)
+            document = self.documents.get(url)
+            return url, json.loads(json.dumps(document)) if document is not None else None
+        
+        loader._load_from_url = Mock(side_effect=_fake_fetch)
+        _, document = loader.load_with_dependencies(f"{self.REGISTRY}/messagegroups/orders")
+        return document, fetched
+    
+    def test_concurrent_waves_compose_identical_document(self):
+        """Test that parallel fetching yields a byte-identical document."""
+        sequential, sequential_fetches = self._load(1)
+        concurrent, concurrent_fetches = self._load(8)
+        
+        self.assertIn("sg0", sequential["schemagroups"])
+        self.assertEqual(json.dumps(concurrent), json.dumps(sequential))
+        self.assertEqual(sorted(concurrent_fetches), sorted(sequential_fetches))
+    
+    def test_prefetch_skips_resolved_and_duplicate_urls(self):
+        """Test that prefetch fetches every pending URL once."""
+        with patch('xrcg.generator.xregistry_loader.Model'):
+            loader = XRegistryLoader(fetch_concurrency=4)
+        loader.model.groups = {}
+        url = f"{self.REGISTRY}/schemagroups/common/schemas/base0"
+        loader.dependency_resolver.resolved_resources[f"{self.REGISTRY}/schemagroups/sg0"] = {}
+        loader._load_from_url = Mock(side_effect=lambda u, h: (u, {"versions": {}}))
+        
+        loader.prefetch([url, url, f"{self.REGISTRY}/schemagroups/sg0", "local/file.json"], {})
+        
+        loader._load_from_url.assert_called_once_with(url, {})
+        self.assertEqual(loader._load_core(url, {}), (url, {"versions": {}}))
+        self.assertNotIn(url, loader._prefetched)
+
+
 class TestDocumentStacking(unittest.TestCase):
     """Test document stacking and merging functionality."""
     
@@ -962,5 +1202,92 @@ class TestDocumentStacking(unittest.TestCase):
         self.assertEqual(result_data["specversion"], "0.6")
 
 
+
+class TestFilterFirstLoading(unittest.TestCase):
+    """Test that filters limit which parts of a document are resolved."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+    
+    def _write(self, name: str, content: Any) -> str:
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        return path
+    
+    def _load_both_ways(self, path: str, **filters):
+        """Return the filter-first result and the result of resolving everything before filtering."""
+        _, filtered = XRegistryLoader().load(path, {}, False, True, **filters)
+        with patch.object(XRegistryLoader, "_resolve_filtered", return_value=None):
+            _, unfiltered = XRegistryLoader().load(path, {}, False, True, **filters)
+        return filtered, unfiltered
+    
+    def test_same_result_as_filtering_last(self):
+        """Test that filter-first loading matches filtering the fully resolved document."""
+        cases = [
+            ("test/xreg/test-filters.xreg.json", {"endpoint_filter": "Production"}),
+            ("test/xreg/test-filters.xreg.json", {"endpoint_filter": "Test", "messagegroup_filter": "Telemetry"}),
+            ("test/xreg/test-filters.xreg.json", {"messagegroup_filter": "Diagnostics"}),
+            ("test/xreg/contoso-erp.xreg.json", {"endpoint_filter": "Inventory"}),
+            ("test/xreg/inkjet-protocol-variants.xreg.json", {"messagegroup_filter": "Kafka"}),
+            ("test/xreg/inkjet-kafka-basemessageuri.xreg.json", {"messagegroup_filter": "Kafka"}),
+        ]
+        for path, filters in cases:
+            with self.subTest(path=path, **filters):
+                filtered, unfiltered = self._load_both_ways(path, **filters)
+                self.assertIsNotNone(filtered)
+                self.assertEqual(filtered, unfiltered)
+    
+    def test_unselected_groups_are_not_resolved(self):
+        """Test that only selected groups and their dependencies are resolved."""
+        schema = {"type": "object"}
+        definitions = {
+            "schemagroups": {
+                name: {"schemas": {"data": {"versions": {"1": {
+                    "format": "JsonSchema/draft-07", "schemaurl": self._write(f"{name}.json", schema)}}}}}
+                for name in ("selected", "inherited", "other")
+            },
+            "messagegroups": {
+                "app": {"messages": {"derived": {"basemessage": "/messagegroups/base/messages/m"}}},
+                "base": {"messages": {"m": {"dataschemauri": "/schemagroups/inherited/schemas/data"}}},
+                "unrelated": {"messages": {
+                    "m": {"dataschemauri": "/schemagroups/other/schemas/data"},
+                    "alias": {"xref": "/messagegroups/missing/messages/m"},
+                }},
+            },
+        }
+        definitions["messagegroups"]["app"]["messages"]["own"] = {
+            "dataschemauri": "/schemagroups/selected/schemas/data"}
+        path = self._write("definitions.json", definitions)
+        
+        loader = XRegistryLoader()
+        with patch.object(XRegistryLoader, "_load_core", autospec=True,
+                          side_effect=XRegistryLoader._load_core) as load_core:
+            _, document = loader.load(path, {}, False, True, messagegroup_filter="app")
+        fetched = [os.path.basename(call.args[1]) for call in load_core.call_args_list]
+        self.assertEqual(sorted(fetched), ["definitions.json", "inherited.json", "selected.json"])
+        
+        self.assertEqual(list(document["messagegroups"]), ["app"])
+        self.assertEqual(sorted(document["schemagroups"]), ["inherited", "selected"])
+        messages = document["messagegroups"]["app"]["messages"]
+        self.assertEqual(messages["derived"]["dataschemauri"], "#/schemagroups/inherited/schemas/data")
+        self.assertEqual(document["schemagroups"]["inherited"]["schemas"]["data"]["versions"]["1"]["schema"], schema)
+        self.assertEqual(self._load_both_ways(path, messagegroup_filter="app")[1], document)
+    
+    def test_url_references_resolve_everything(self):
+        """Test that a basemessage given as URL falls back to resolving the whole document."""
+        path = self._write("definitions.json", {"messagegroups": {
+            "app": {"messages": {"m": {"basemessage": "https://example.com/messagegroups/x/messages/m"}}},
+            "other": {"messages": {}},
+        }})
+        loader = XRegistryLoader()
+        with patch.object(loader.resource_resolver, "resolve_all_resources",
+                          wraps=loader.resource_resolver.resolve_all_resources) as resolve:
+            _, document = loader.load(path, {}, False, True, messagegroup_filter="app")
+        self.assertEqual(list(document["messagegroups"]), ["app"])
+        self.assertEqual(list(resolve.call_args.args[0]["messagegroups"]), ["app", "other"])
+
+
 if __name__ == '__main__':
     unittest.main()
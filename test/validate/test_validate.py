@@ -24,3 +24,20 @@ def test_validate():
         sys.argv = ['xrcg', 'validate',  
                     '--definitions', os.path.join(input_dir, disco_file)]
         assert xrcg.cli() == 0
+
+
+def test_generate_loads_definitions_once(tmp_path):
+    # generate validates the loaded document in place instead of loading the file twice
+    from unittest.mock import patch
+    from xrcg.generator.xregistry_loader import XRegistryLoader
+
+    definitions_file = os.path.join(project_root, 'test', 'asyncapi', 'producer', 'asyncapi_producer.xreg.json')
+    with patch.object(XRegistryLoader, 'load', autospec=True, side_effect=XRegistryLoader.load) as load:
+        sys.argv = ['xrcg', 'generate',
+                    '--language', 'asyncapi', '--style', 'producer', '--projectname', 'test',
+                    '--definitions', definitions_file,
+                    '--output', str(tmp_path)]
+        assert xrcg.cli() == 0
+    loaded = [call.args[1] for call in load.call_args_list]
+    assert loaded.count(definitions_file) == 1
+    assert any(tmp_path.iterdir())
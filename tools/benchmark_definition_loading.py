@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark loading definition files and scanning them for references.
+
+Loads every test/xreg/*.xreg.json file with XRegistryLoader, and collects the
+references of each loaded document with a new DependencyResolver (so that no
+scan results are reused), and prints the best time of a round for both.
+
+Usage: python tools/benchmark_definition_loading.py [--rounds N] [files ...]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from xrcg.generator.xregistry_loader import DependencyResolver, XRegistryLoader  # noqa: E402
+
+
+def best_of(rounds, run):
+    """Return the best time of running a round in seconds, after one warm-up round."""
+    run()
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=15, help='timed rounds')
+    parser.add_argument('files', nargs='*', help='definition files (default: test/xreg/*.xreg.json)')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'test', 'xreg', '*.xreg.json')))
+    if not files:
+        sys.exit('No input files found')
+    # Remote references of the inputs may not be reachable; that is not what is measured
+    logging.disable(logging.ERROR)
+
+    loader = XRegistryLoader()
+    documents = [loader.load(file, {}, False, True)[1] for file in files]
+
+    def load_round():
+        for file in files:
+            loader.load(file, {}, False, True)
+
+    def scan_round():
+        for document in documents:
+            DependencyResolver(loader.model, loader).collect_references(document)
+
+    print(f"{len(files)} files, best of {args.rounds} rounds")
+    print(f"load               {best_of(args.rounds, load_round) * 1000:8.2f} ms/round")
+    print(f"collect_references {best_of(args.rounds, scan_round) * 1000:8.2f} ms/round")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measure the memory held by resolved definitions with and without compaction.
+
+Loads and resolves every samples/message-definitions/*.xreg.json file with
+XRegistryLoader, keeps all documents alive, and reports the memory allocated
+for them as traced by tracemalloc, once as loaded and once after
+xrcg.generator.compact_document.compact_document.
+
+Usage: python tools/benchmark_document_memory.py [files ...]
+"""
+
+import argparse
+import gc
+import glob
+import logging
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from xrcg.generator.compact_document import compact_document  # noqa: E402
+from xrcg.generator.xregistry_loader import XRegistryLoader  # noqa: E402
+
+
+def load_all(files, compact):
+    """Return the documents and the bytes allocated while loading (and compacting) them."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        loader = XRegistryLoader()
+        baseline = tracemalloc.get_traced_memory()[0]
+        documents = [loader.load(file, {}, False, True)[1] for file in files]
+        if compact:
+            for document in documents:
+                compact_document(document)
+        del loader
+        gc.collect()
+        return documents, tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*', help='definition files (default: samples/message-definitions/*.xreg.json)')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'samples',
+                                                        'message-definitions', '*.xreg.json')))
+    if not files:
+        sys.exit('No input files found')
+    # Remote references of the samples may not be reachable; that is not what is measured
+    logging.disable(logging.ERROR)
+    # Warm up imports and module-level caches outside the measurement
+    load_all(files[:1], True)
+
+    plain, plain_bytes = load_all(files, False)
+    del plain
+    compacted, compacted_bytes = load_all(files, True)
+    del compacted
+    print(f"{len(files)} files")
+    print(f"plain     {plain_bytes / 1024:8.0f} KiB")
+    print(f"compacted {compacted_bytes / 1024:8.0f} KiB  {100 * (1 - compacted_bytes / plain_bytes):.0f}% less")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the JSON backends of xrcg.common.json_codec.
+
+Decodes every test/xreg/*.xreg.json file, re-encodes it with sorted keys and
+hashes it canonically (the operations the loader and the template renderer
+perform) with each installed backend, and prints the time per round and the
+speedup over the standard library.
+
+Usage: python tools/benchmark_json_codec.py [--rounds N] [files ...]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from xrcg.common import json_codec  # noqa: E402
+
+
+def run_round(payloads):
+    """Decode, encode and hash each payload once."""
+    for payload in payloads:
+        document = json_codec.loads(payload)
+        json_codec.dumps(document, sort_keys=True)
+        json_codec.canonical_hash(document)
+
+
+def benchmark(payloads, rounds):
+    """Return the best time of a round in seconds for each installed backend."""
+    results = {}
+    previous = json_codec.backend_name()
+    try:
+        for name in json_codec.BACKENDS:
+            try:
+                json_codec.set_backend(name)
+            except ImportError:
+                continue
+            run_round(payloads)
+            best = float('inf')
+            for _ in range(rounds):
+                start = time.perf_counter()
+                run_round(payloads)
+                best = min(best, time.perf_counter() - start)
+            results[name] = best
+    finally:
+        json_codec.set_backend(previous)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50, help='timed rounds per backend')
+    parser.add_argument('files', nargs='*', help='JSON files (default: test/xreg/*.xreg.json)')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'test', 'xreg', '*.xreg.json')))
+    if not files:
+        sys.exit('No input files found')
+    payloads = []
+    for file in files:
+        with open(file, 'rb') as f:
+            payloads.append(f.read())
+    size = sum(len(p) for p in payloads)
+    print(f"{len(payloads)} files, {size / 1024:.0f} KiB, best of {args.rounds} rounds")
+
+    results = benchmark(payloads, args.rounds)
+    baseline = results.get('json')
+    for name, seconds in results.items():
+        speedup = f"{baseline / seconds:.1f}x" if baseline else "-"
+        print(f"{name:8} {seconds * 1000:8.2f} ms/round  {speedup}")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Precompile the built-in Jinja templates for shipping with the package.
+
+Compiles every template below xrcg/templates with the environment the
+renderer uses and stores the result in xrcg/_template_bytecode/<Python and
+Jinja version>, where xrcg.generator.template_cache.TemplateBytecodeCache
+finds it when the user's template cache has no entry yet. Run it before building the package, with
+the Python and Jinja versions the package is meant for; other versions
+compile the templates on first use as usual.
+
+Usage: python tools/precompile_templates.py [--output DIR]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from xrcg.generator.generator_context import GeneratorContext  # noqa: E402
+from xrcg.generator.template_cache import (  # noqa: E402
+    PRECOMPILED_ROOT, TemplateBytecodeCache, precompile, runtime_tag, set_template_bytecode_cache)
+from xrcg.generator.template_renderer import TemplateRenderer  # noqa: E402
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help=f'directory for the compiled templates (default: {PRECOMPILED_ROOT}/<Python and Jinja version>)')
+    args = parser.parse_args()
+
+    output = Path(args.output) if args.output else PRECOMPILED_ROOT / runtime_tag()
+    # Start from scratch so entries of removed templates are not shipped
+    shutil.rmtree(output, ignore_errors=True)
+    set_template_bytecode_cache(TemplateBytecodeCache(output, output))
+
+    renderer = TemplateRenderer(GeneratorContext(), "", "", "", "", "", {}, [], {}, True, True)
+    start = time.perf_counter()
+    count = precompile(renderer.setup_jinja_env)
+    print(f"Compiled {count} templates into {output} in {time.perf_counter() - start:.1f} s")
@@ -17,6 +17,11 @@ logger = logging.getLogger(__name__)
 from .commands.validate_definitions import validate_definition
 from .commands.generate_code import generate_code
 from .commands.list_templates import list_templates
+from .common.config import config_manager
+from .common.http_cache import CachingTransport
+from .common.registry_roots import RegistryRootCache, set_registry_root_cache
+from .common.transport import CoalescingTransport, HttpTransport, set_transport
+from .generator.template_cache import TemplateBytecodeCache, set_template_bytecode_cache
 #from .commands.manifest import ManifestSubcommands
 
 def main():
@@ -38,6 +43,32 @@ def main():
         help="Path to custom model.json file or HTTP(S) URL. Can also use XREGISTRY_MODEL_PATH environment variable.",
         default=None
     )
+    
+    # Add global HTTP cache arguments
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve remote definitions and models from the HTTP cache only, without network access."
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        dest="cache_ttl",
+        type=int,
+        default=0,
+        help="Seconds a cached HTTP response is used without revalidating it with the registry (default: 0, always revalidate)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        help="Do not use the persistent HTTP, registry root and template caches."
+    )
+    parser.add_argument(
+        "--stats",
+        dest="stats",
+        action="store_true",
+        help="Print statistics of the run at the end, such as the HTTP requests sent and avoided."
+    )
 
     # the script accepts a set of commands, each with its own set of arguments
     # the first argument is the command name:
@@ -73,10 +104,17 @@ def main():
     generate_parser.add_argument("--template-args", nargs="*", dest="template_args", required=False, help="Extra template arguments to pass to the code generator in the form 'key=value")
     generate_parser.add_argument("--messagegroup", dest="messagegroup", required=False, help="Limit the generation to a specific message group")
     generate_parser.add_argument("--endpoint", dest="endpoint", required=False, help="Limit the generation to a specific endpoint")
+    generate_parser.add_argument("--fetch-concurrency", dest="fetch_concurrency", type=int, required=False, help="Maximum number of parallel HTTP fetches while resolving remote dependencies (optional, defaults to 8; 1 fetches sequentially)")
+    generate_parser.add_argument("--parse-cache", dest="parse_cache", action="store_true", required=False, help="Cache the resolved definitions of local files on disk and reuse them while the files, the model and the filters are unchanged (optional, defaults to false)")
+    generate_parser.add_argument("--trace-stack", dest="trace_stack", action="store_true", required=False, help="Print the definitions file each message, schema and other resource was taken from when several files are stacked (optional, defaults to false)")
+    generate_parser.add_argument("--compact-definitions", dest="compact_definitions", action="store_true", required=False, help="Intern the attribute names, XIDs and other repeated strings of the loaded definitions to reduce memory use with large catalogs (optional, defaults to false)")
+    generate_parser.add_argument("--jobs", dest="jobs", type=int, required=False, help="Number of worker processes rendering the code templates in parallel (optional, defaults to 1; the output is the same)")
+    generate_parser.add_argument("--incremental", dest="incremental", action="store_true", required=False, help="Record what each generated file depends on in a manifest in the output directory and only render again the files whose templates, arguments or definitions changed since the last incremental run (optional, defaults to false)")
 
     # specify the arguments for the validate command
     validate_parser.add_argument("--definitions", "-d", "-f", dest="definitions_files", nargs="+", required=True, help="One or more files or URLs containing the definitions. Files are loaded in order and stacked, with later files shadowing earlier ones.")
     validate_parser.add_argument("--requestheaders", nargs="*", dest="headers", required=False,help="Extra HTTP headers in the format 'key=value'")
+    validate_parser.add_argument("--trace-stack", dest="trace_stack", action="store_true", required=False, help="Print the definitions file each message, schema and other resource was taken from when several files are stacked (optional, defaults to false)")
 
     # specify the arguments for the list command
     list_parser.add_argument("--templates", nargs="*", dest="template_dirs", required=False, help="Paths of extra directories containing custom templates")
@@ -87,9 +125,26 @@ def main():
     if not 'func' in args:
         parser.print_help()
         return 1
+    if args.offline and args.no_cache:
+        print("Error: --offline requires the HTTP cache and cannot be combined with --no-cache")
+        return 1
+    if args.no_cache:
+        transport = HttpTransport()
+    else:
+        transport = CachingTransport(ttl=args.cache_ttl, offline=args.offline)
+        set_registry_root_cache(RegistryRootCache(config_manager.cache_dir / "registry-roots.json"))
+        set_template_bytecode_cache(TemplateBytecodeCache())
+    # Fetch each URL at most once per invocation
+    request_memo = CoalescingTransport(transport)
+    set_transport(request_memo)
     try:
         args.func(args)
         return 0
     except ValueError as e:
         print(f"Error: {e.args[0]}")
         return 1
+    finally:
+        if args.stats:
+            stats = request_memo.stats
+            print(f"HTTP requests: {stats.misses} sent, {stats.hits} served from memory, "
+                  f"{stats.coalesced} coalesced with a request in flight")
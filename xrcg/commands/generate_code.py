@@ -5,10 +5,13 @@
 from typing import Any, Dict, List, Union
 from xrcg.cli import logger
 from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.output_writer import write_if_changed
+from xrcg.generator.render_manifest import RenderManifest
 from xrcg.generator.schema_utils import SchemaUtils
 from xrcg.generator.template_renderer import TemplateRenderer
 from xrcg.common.config import config_manager
-from .validate_definitions import validate
+from xrcg.common.document_cache import DocumentCache
+from .validate_definitions import load_definitions, print_stack_origins, validate, validate_document
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, None]
 
@@ -48,6 +51,13 @@ def generate_code(args: Any) -> int:
     if not output_dir:
         raise ValueError("Output directory is required. Provide via --output or set defaults.output_dir in config.")
     
+    fetch_concurrency = getattr(args, 'fetch_concurrency', None)
+    if fetch_concurrency is not None and fetch_concurrency < 1:
+        raise ValueError("Fetch concurrency must be at least 1.")
+    jobs = getattr(args, 'jobs', None)
+    if jobs is not None and jobs < 1:
+        raise ValueError("Jobs must be at least 1.")
+    
     suppress_schema_output = args.no_schema
     suppress_code_output = args.no_code
     messagegroup_filter = args.messagegroup
@@ -62,6 +72,16 @@ def generate_code(args: Any) -> int:
             template_args[key] = value
 
     generator_context = GeneratorContext(output_dir, messagegroup_filter, endpoint_filter, getattr(args, 'model', None))
+    if fetch_concurrency is not None:
+        generator_context.loader.fetch_concurrency = fetch_concurrency
+    if getattr(args, 'parse_cache', False):
+        generator_context.loader.document_cache = DocumentCache()
+    generator_context.loader.trace_stack = getattr(args, 'trace_stack', False)
+    generator_context.loader.compact_documents = getattr(args, 'compact_definitions', False)
+    if jobs is not None:
+        generator_context.jobs = jobs
+    if getattr(args, 'incremental', False):
+        generator_context.manifest = RenderManifest.load(output_dir)
 
     SchemaUtils.schema_files_collected = set()
     generator_context.loader.reset_schemas_handled()
@@ -72,7 +92,21 @@ def generate_code(args: Any) -> int:
         # Validate definitions files if they are not URLs
         definitions_files = args.definitions_files if isinstance(args.definitions_files, list) else [args.definitions_files]
         non_url_files = [f for f in definitions_files if not f.startswith("http")]
-        if non_url_files:
+        loaded_document = None
+        if non_url_files and len(non_url_files) == len(definitions_files):
+            # Local files only: load and resolve once, validate the result in place
+            # and hand the filtered document to the renderer
+            definitions_file, docroot = load_definitions(generator_context.loader, definitions_files, headers)
+            if not docroot:
+                print(f"Error: could not load definitions file(s) {' + '.join(definitions_files)}")
+                return 1
+            if generator_context.loader.trace_stack:
+                print_stack_origins(generator_context.loader)
+            if validate_document(docroot, definitions_file, " + ".join(definitions_files)) != 0:
+                return 1
+            loaded_document = (definitions_file, generator_context.loader.apply_filters(
+                docroot, messagegroup_filter, endpoint_filter))
+        elif non_url_files:
             if validate(non_url_files, headers, False) != 0:
                 return 1
         
@@ -86,7 +120,7 @@ def generate_code(args: Any) -> int:
         renderer = TemplateRenderer(generator_context,
             project_name, language, style, output_dir,
             primary_definitions_file, headers, args.template_dirs, template_args,
-            suppress_code_output, suppress_schema_output
+            suppress_code_output, suppress_schema_output, loaded_document
         )
         renderer.generate()
 
@@ -100,8 +134,13 @@ def generate_code(args: Any) -> int:
 
         if generator_context.stacks.stack("files"):
             for file, content in generator_context.stacks.stack("files"):
-                with open(file, "w", encoding='utf-8') as f:
-                    f.write(content)
+                write_if_changed(file, content, generator_context.output_stats)
+        if generator_context.manifest is not None:
+            generator_context.manifest.save()
+        if getattr(args, 'stats', False):
+            if generator_context.manifest is not None:
+                print(f"Render units: {generator_context.manifest}")
+            print(f"Output files: {generator_context.output_stats}")
     except SystemExit:
         return 1
     except Exception as err:
@@ -23,16 +23,17 @@ def validate_definition(args) -> int:
         headers = {}
 
     # Call the validate() function with the parsed arguments
-    return validate(definitions_files, headers, True)
+    return validate(definitions_files, headers, True, getattr(args, 'trace_stack', False))
 
 
-def validate(definitions_uris, headers, verbose=False):
+def validate(definitions_uris, headers, verbose=False, trace_stack=False):
     """Validate the definitions file(s) using the JSON schema in schemas/xregistry_messaging_catalog.json
     
     Args:
         definitions_uris: A single URI string or a list of URI strings to load and stack
         headers: HTTP headers for authentication
         verbose: Whether to print verbose output
+        trace_stack: Whether to print the file each resource of stacked definitions came from
     
     Returns:
         0 on success, 1 on validation error, 2 on load error
@@ -43,18 +44,54 @@ def validate(definitions_uris, headers, verbose=False):
     
     # load the definitions file(s)
     loader = XRegistryLoader()
+    loader.trace_stack = trace_stack
+    definitions_file, docroot = load_definitions(loader, definitions_uris, headers)
+    if not docroot:
+        print(f"Error: could not load definitions file(s) {' + '.join(definitions_uris)}")
+        return 2
+    if trace_stack:
+        print_stack_origins(loader)
+    
+    return validate_document(docroot, definitions_file, " + ".join(definitions_uris), verbose)
+
+
+def load_definitions(loader, definitions_uris, headers):
+    """Load, stack and resolve the definitions file(s) once, without filters.
+    
+    The resulting document can be validated with validate_document() and then
+    filtered and rendered without loading the files again.
     
+    Args:
+        loader: The XRegistryLoader to use
+        definitions_uris: A list of URI strings to load and stack
+        headers: HTTP headers for authentication
+    
+    Returns:
+        Tuple of (definitions_file, document); the document is None on load error
+    """
     if len(definitions_uris) == 1:
-        definitions_file, docroot = loader.load(definitions_uris[0], headers, False, True)
-        display_name = definitions_uris[0]
-    else:
-        definitions_file, docroot = loader.load_stacked(definitions_uris, headers, False, True)
-        display_name = " + ".join(definitions_uris)
+        return loader.load(definitions_uris[0], headers, False, True)
+    return loader.load_stacked(definitions_uris, headers, False, True)
+
+
+def print_stack_origins(loader):
+    """Print the file each resource of the last stacked load came from."""
+    for xid, uri in loader.stack_origins.items():
+        print(f"{xid} <- {uri}")
+
+
+def validate_document(docroot, definitions_file, display_name, verbose=False):
+    """Validate a loaded definitions document using the JSON schema in schemas/document-schema.json
     
-    if not docroot:
-        print(f"Error: could not load definitions file(s) {display_name}")
-        return 2
+    Args:
+        docroot: The loaded and resolved document
+        definitions_file: The resolved URI of the document, used in error output
+        display_name: The name of the definitions file(s), used in verbose output
+        verbose: Whether to print verbose output
     
+    Returns:
+        0 on success, 1 on validation error, 2 if the schema cannot be loaded
+    """
     try:
         basepath = os.path.realpath(
             os.path.join(os.path.dirname(__file__), ".."))
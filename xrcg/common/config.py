@@ -117,6 +117,11 @@ class ConfigManager:
         """Get the configuration file path."""
         return self._config_file
     
+    @property
+    def cache_dir(self) -> Path:
+        """Get the directory for persistent caches (e.g. HTTP responses)."""
+        return self._config_dir / "cache"
+    
     def ensure_config_dir(self) -> None:
         """Ensure the configuration directory exists."""
         try:
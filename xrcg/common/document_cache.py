@@ -0,0 +1,122 @@
+"""
+document_cache.py – opt-in on-disk cache of fully resolved definition documents.
+
+Loading local definition files means parsing them and then resolving
+resources, aliases, basemessages and schema references. Build setups that
+run ``xrcg generate`` many times against the same files (once per language
+and style) can skip all of that by enabling this cache (``--parse-cache``).
+
+Entries live below ``<config dir>/cache/documents`` as pickles of the
+loader result. The key covers the absolute path, modification time and size
+of every input file, the model fingerprint, the filter arguments and the
+xrcg and Python versions. Each entry also records the local files read while
+resolving (e.g. ``schemaurl`` targets) and is discarded if any of them
+changed. Documents whose resolution fetched anything over HTTP are not
+cached; the HTTP cache covers those.
+
+Only the user's own cache directory is read, since unpickling runs code.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import config_manager
+
+
+logger = logging.getLogger(__name__)
+
+#: Bump to invalidate all entries when the resolved document layout changes
+CACHE_FORMAT = 1
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _xrcg_version() -> str:
+    try:
+        from .._version import __version__
+        return __version__
+    except ImportError:
+        return "unknown"
+
+
+class DocumentCache:
+    """Pickled loader results keyed by their input files, model and filters."""
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = Path(directory) if directory else config_manager.cache_dir / "documents"
+
+    @staticmethod
+    def key(paths: List[str], model_fingerprint: str,
+            messagegroup_filter: str = "", endpoint_filter: str = "") -> Optional[str]:
+        """Return the cache key for loading local files, or None if a path is not a readable local file."""
+        digest = hashlib.sha256(
+            f"{CACHE_FORMAT}\n{_xrcg_version()}\n{sys.version_info[:2]}\n{model_fingerprint}\n"
+            f"{messagegroup_filter}\n{endpoint_filter}".encode("utf-8"))
+        for path in paths:
+            if path.startswith(("http://", "https://")):
+                return None
+            if path.startswith("file://"):
+                path = path[7:]
+            signature = _file_signature(path)
+            if signature is None:
+                return None
+            digest.update(f"\n{os.path.abspath(path)}:{signature[0]}:{signature[1]}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing, damaged or a dependency changed."""
+        try:
+            with open(self.directory / f"{key}.pickle", "rb") as f:
+                entry = pickle.load(f)
+            sources: Dict[str, Tuple[int, int]] = entry["sources"]
+            value = entry["value"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug(f"Ignoring unreadable document cache entry {key}: {e}")
+            return None
+        for path, signature in sources.items():
+            if _file_signature(path) != tuple(signature):
+                logger.debug(f"Document cache entry {key} is stale: {path} changed")
+                return None
+        return value
+
+    def put(self, key: str, value: Any, sources: Iterable[str] = ()) -> None:
+        """Store a value together with the signatures of the local files it was resolved from."""
+        signatures = {}
+        for path in sources:
+            signature = _file_signature(path)
+            if signature is None:
+                return
+            signatures[os.path.abspath(path)] = signature
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self.directory / f".{key}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    pickle.dump({"sources": signatures, "value": value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self.directory / f"{key}.pickle")
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"Failed to write document cache entry {key}: {e}")
+
+    def clear(self) -> None:
+        """Remove all cached documents."""
+        if self.directory.exists():
+            for file in self.directory.iterdir():
+                file.unlink()
@@ -0,0 +1,192 @@
+"""
+http_cache.py – persistent, revalidating on-disk cache for the HTTP transport.
+
+Remote definitions, resources, schemas and models are stored below
+``<config dir>/cache/http`` (see :attr:`ConfigManager.cache_dir`):
+
+*   ``entries/<key>.json`` – metadata per request, keyed by the SHA-256 of the
+    URL and the request headers (header values are never written to disk).
+*   ``objects/<sha256>``   – response bodies, content-addressed so identical
+    documents served under different URLs are stored once.
+
+Entries younger than the TTL are served without contacting the registry.
+Older entries are revalidated with ``If-None-Match`` / ``If-Modified-Since``
+using the ``ETag`` / ``Last-Modified`` values the registry returned; a
+``304 Not Modified`` answer serves the stored body. The registry ``epoch``
+(``xRegistry-epoch`` header) is recorded with each entry. In offline mode
+only the cache is consulted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from requests.structures import CaseInsensitiveDict
+
+from .config import config_manager
+from .transport import HttpResponse, HttpTransport, Timeout, TransportError
+
+
+logger = logging.getLogger(__name__)
+
+#: Response headers kept with a cache entry
+_STORED_HEADERS = ("content-type", "etag", "last-modified", "xregistry-epoch")
+
+
+class HttpCache:
+    """Content-addressed store of HTTP responses."""
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = Path(directory) if directory else config_manager.cache_dir / "http"
+        self._entries = self.directory / "entries"
+        self._objects = self.directory / "objects"
+
+    @staticmethod
+    def key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        """Return the cache key for a URL and its request headers."""
+        digest = hashlib.sha256(url.encode("utf-8"))
+        for name, value in sorted((k.lower(), v) for k, v in (headers or {}).items()):
+            digest.update(f"\n{name}:{value}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the metadata of an entry, or None if it is missing or damaged."""
+        try:
+            with open(self._entries / f"{key}.json", "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if not (self._objects / entry["body"]).exists():
+                return None
+            return entry
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def read_body(self, entry: Dict[str, Any]) -> bytes:
+        """Return the stored body of an entry."""
+        return (self._objects / entry["body"]).read_bytes()
+
+    def store(self, key: str, response: HttpResponse) -> Dict[str, Any]:
+        """Store a response and return its new metadata entry."""
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        headers = {name: response.headers[name] for name in _STORED_HEADERS
+                   if response.headers.get(name) is not None}
+        entry = {
+            "url": response.url,
+            "status": response.status,
+            "headers": headers,
+            "epoch": headers.get("xregistry-epoch"),
+            "body": body_hash,
+            "stored": time.time(),
+        }
+        try:
+            if not (self._objects / body_hash).exists():
+                self._write_atomic(self._objects / body_hash, response.content)
+            self._write_entry(key, entry)
+        except OSError as e:
+            logger.warning(f"Failed to write HTTP cache entry for {response.url}: {e}")
+        return entry
+
+    def touch(self, key: str, entry: Dict[str, Any]) -> None:
+        """Mark an entry as revalidated now."""
+        entry["stored"] = time.time()
+        try:
+            self._write_entry(key, entry)
+        except OSError as e:
+            logger.warning(f"Failed to update HTTP cache entry for {entry.get('url')}: {e}")
+
+    def clear(self) -> None:
+        """Remove all cached entries and bodies."""
+        for folder in (self._entries, self._objects):
+            if folder.exists():
+                for file in folder.iterdir():
+                    file.unlink()
+
+    def _write_entry(self, key: str, entry: Dict[str, Any]) -> None:
+        self._write_atomic(self._entries / f"{key}.json",
+                           json.dumps(entry).encode("utf-8"))
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        # Concurrent fetches may write the same file; replace it atomically
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+class CachingTransport(HttpTransport):
+    """HTTP transport that serves and revalidates responses from an :class:`HttpCache`."""
+
+    def __init__(self, cache: Optional[HttpCache] = None, ttl: int = 0,
+                 offline: bool = False, **kwargs: Any) -> None:
+        """
+        Args:
+            cache: The cache to use; defaults to the cache in the config directory.
+            ttl: Seconds a stored response is served without revalidation.
+                 0 revalidates on every request.
+            offline: Serve from the cache only and never contact the network.
+            kwargs: Passed on to :class:`HttpTransport`.
+        """
+        super().__init__(**kwargs)
+        self.cache = cache or HttpCache()
+        self.ttl = ttl
+        self.offline = offline
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[Timeout] = None,
+            max_age: Optional[int] = None) -> HttpResponse:
+        key = HttpCache.key(url, headers)
+        entry = self.cache.lookup(key)
+
+        if self.offline:
+            if entry is None:
+                raise TransportError(url, "Not available in the HTTP cache (offline mode)")
+            logger.debug(f"Offline, serving {url} from cache")
+            return self._cached_response(url, entry)
+
+        ttl = self.ttl if max_age is None else max_age
+        if entry is not None and time.time() - entry["stored"] < ttl:
+            logger.debug(f"Serving {url} from cache")
+            return self._cached_response(url, entry)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if "etag" in entry["headers"]:
+                request_headers["If-None-Match"] = entry["headers"]["etag"]
+            if "last-modified" in entry["headers"]:
+                request_headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+        try:
+            response = super().get(url, request_headers, timeout)
+        except TransportError as e:
+            if entry is None or e.status is not None:
+                raise
+            logger.warning(f"Failed to revalidate {url} ({e.reason}), serving cached copy")
+            return self._cached_response(url, entry)
+
+        if response.status == 304 and entry is not None:
+            logger.debug(f"{url} not modified, serving from cache")
+            self.cache.touch(key, entry)
+            return self._cached_response(url, entry)
+
+        if "no-store" not in response.headers.get("cache-control", ""):
+            new_entry = self.cache.store(key, response)
+            if entry is not None and entry.get("epoch") != new_entry.get("epoch"):
+                logger.debug(f"{url} changed from epoch {entry.get('epoch')} to {new_entry.get('epoch')}")
+        return response
+
+    def _cached_response(self, url: str, entry: Dict[str, Any]) -> HttpResponse:
+        return HttpResponse(url=entry.get("url", url), status=entry.get("status", 200),
+                            headers=CaseInsensitiveDict(entry["headers"]),
+                            content=self.cache.read_body(entry))
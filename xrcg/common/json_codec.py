@@ -0,0 +1,187 @@
+"""
+json_codec.py – JSON encoding and decoding with an optional fast backend.
+
+The loader and the template renderer decode and encode xRegistry documents
+and schemas through this module instead of calling :mod:`json` directly.
+If ``orjson`` or ``msgspec`` is installed (e.g. via the ``fast`` extra), it
+is used; otherwise the standard library is. The backend can be forced with
+the ``XRCG_JSON_BACKEND`` environment variable (``orjson``, ``msgspec`` or
+``json``) or :func:`set_backend`.
+
+Results do not depend on the backend:
+
+*   :func:`loads` retries documents a fast backend rejects (``NaN``,
+    ``Infinity``) with the standard library, and always raises
+    :class:`json.JSONDecodeError` for invalid input. The one difference
+    left is that the fast backends decode integers beyond 64 bits as
+    floats; xRegistry documents do not contain such numbers.
+*   :func:`dumps` returns ``str`` and falls back to the standard library for
+    options the fast backend does not support.
+
+:func:`canonical_hash` hashes the compact, key-sorted encoding of a value.
+It is stable across runs (unlike :func:`hash`) and meant for de-duplication
+and cache keys; the digest of a value may differ between backends for
+floats and non-ASCII text, so it should not be persisted as an identifier.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Optional, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+#: Input accepted by :func:`loads`
+JsonInput = Union[str, bytes, bytearray, memoryview]
+
+#: Backends in order of preference
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _stdlib_loads(data: JsonInput) -> Any:
+    if not isinstance(data, str):
+        data = str(data, "utf-8")
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool, indent: Optional[int]) -> str:
+    if indent is None:
+        return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(obj, sort_keys=sort_keys, indent=indent, ensure_ascii=False)
+
+
+def _load_backend(name: str) -> Tuple[Optional[Callable[[JsonInput], Any]],
+                                      Optional[Callable[[Any, bool, Optional[int]], Optional[bytes]]],
+                                      Tuple[type, ...], Tuple[type, ...]]:
+    """Return (loads, dumps, decode errors, encode errors) of a fast backend; raises ImportError if unavailable.
+
+    The ``dumps`` function returns None for options it cannot honor.
+    """
+    if name == "orjson":
+        import orjson
+
+        def _orjson_dumps(obj: Any, sort_keys: bool, indent: Optional[int]) -> Optional[bytes]:
+            option = orjson.OPT_NON_STR_KEYS
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent == 2:
+                option |= orjson.OPT_INDENT_2
+            elif indent is not None:
+                return None
+            return orjson.dumps(obj, option=option)
+
+        return orjson.loads, _orjson_dumps, (orjson.JSONDecodeError,), (orjson.JSONEncodeError,)
+
+    if name == "msgspec":
+        import msgspec
+
+        def _msgspec_dumps(obj: Any, sort_keys: bool, indent: Optional[int]) -> Optional[bytes]:
+            data = msgspec.json.encode(obj, order="sorted" if sort_keys else None)
+            return data if indent is None else msgspec.json.format(data, indent=indent)
+
+        return msgspec.json.decode, _msgspec_dumps, (msgspec.DecodeError,), (msgspec.EncodeError, TypeError)
+
+    if name == "json":
+        return None, None, (), ()
+
+    raise ValueError(f"Unknown JSON backend '{name}', expected one of {', '.join(BACKENDS)}")
+
+
+class _Backend:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.loads, self.dumps, self.decode_errors, self.encode_errors = _load_backend(name)
+
+
+_lock = threading.Lock()
+_backend: Optional[_Backend] = None
+
+
+def _select_backend() -> _Backend:
+    forced = os.environ.get("XRCG_JSON_BACKEND")
+    if forced:
+        return _Backend(forced)
+    for name in BACKENDS:
+        try:
+            return _Backend(name)
+        except ImportError:
+            continue
+    return _Backend("json")
+
+
+def _current() -> _Backend:
+    global _backend
+    backend = _backend
+    if backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _select_backend()
+                logger.debug(f"Using JSON backend {_backend.name}")
+            backend = _backend
+    return backend
+
+
+def backend_name() -> str:
+    """Return the name of the active backend: "orjson", "msgspec" or "json"."""
+    return _current().name
+
+
+def set_backend(name: Optional[str]) -> str:
+    """Switch the backend and return the name of the previous one.
+
+    Passing None selects the preferred installed backend again.
+
+    Raises:
+        ImportError: if the requested backend is not installed.
+        ValueError: if the name is unknown.
+    """
+    global _backend
+    previous = backend_name()
+    with _lock:
+        _backend = _Backend(name) if name else _select_backend()
+    return previous
+
+
+def loads(data: JsonInput) -> Any:
+    """Decode a JSON document from text or UTF-8 encoded bytes.
+
+    Raises:
+        json.JSONDecodeError: if the input is not valid JSON.
+        UnicodeDecodeError: if bytes are not valid UTF-8.
+    """
+    backend = _current()
+    if backend.loads is not None:
+        try:
+            return backend.loads(data)
+        except backend.decode_errors:
+            # Let the standard library decide; it accepts a few documents the
+            # fast backends reject and produces the canonical error message
+            pass
+    return _stdlib_loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False, indent: Optional[int] = None) -> str:
+    """Encode a value as JSON text.
+
+    Without ``indent`` the output is compact (no blanks after separators).
+    Non-ASCII characters are written as-is.
+    """
+    backend = _current()
+    if backend.dumps is not None:
+        try:
+            data = backend.dumps(obj, sort_keys, indent)
+        except backend.encode_errors:
+            # e.g. unsupported key types or integers beyond 64 bits
+            data = None
+        if data is not None:
+            return data.decode("utf-8")
+    return _stdlib_dumps(obj, sort_keys, indent)
+
+
+def canonical_hash(obj: Any) -> str:
+    """Return the SHA-256 hex digest of the compact, key-sorted JSON encoding of a value."""
+    return hashlib.sha256(dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()
@@ -11,27 +11,140 @@ model.py – small helper around the xRegistry extension-model (model.json).
 
 It exposes just enough convenience so that higher layers (CLI, SDK, …) can
 discover groups/resources/attributes without hard-coding anything.
+
+The loader asks the same questions about the model for every group and
+resource it visits (which collections does a group hold, what is the singular
+of a collection, which attribute carries a collection's URL). Those answers
+are precomputed once into a frozen :class:`ModelLookups`, available as
+:attr:`Model.lookups` and shared by all Model instances of the same model.
 """
 from __future__ import annotations
 
 import json
 import logging
 import os
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, MutableMapping, Optional
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, MutableMapping, Optional, Tuple
 from urllib.parse import urlparse
 
-import requests
+from . import json_codec
 from .config import config_manager
+from .transport import HttpTransport, TransportError, get_transport
+
+
+@dataclass(frozen=True)
+class ModelLookups:
+    """Lookup tables derived from the ``groups`` of a model.
+
+    Group types are the plural names of the model's groups (``messagegroups``),
+    resource collections the plural names of their resources (``messages``).
+    """
+
+    #: Group types in model order
+    group_types: Tuple[str, ...]
+    #: Group types as a set, for membership tests
+    group_type_set: FrozenSet[str]
+    #: ``/<group type>/``, the path segment that marks a reference into a group type
+    group_patterns: Tuple[str, ...]
+    #: Group type -> singular group name, and back
+    group_singulars: Mapping[str, str]
+    group_plurals: Mapping[str, str]
+    #: Group type -> ((resource collection, singular resource name or None), ...) in model order
+    resource_collections: Mapping[str, Tuple[Tuple[str, Optional[str]], ...]]
+    #: Group type -> set of its resource collections
+    resource_collection_sets: Mapping[str, FrozenSet[str]]
+    #: Group type -> ((resource collection, attribute holding the collection's URL), ...)
+    collection_url_fields: Mapping[str, Tuple[Tuple[str, str], ...]]
+    #: Resource collection -> singular resource name, and back
+    resource_singulars: Mapping[str, str]
+    resource_plurals: Mapping[str, str]
+    #: Singular resource name -> ``{singular}url`` and ``{singular}base64`` attribute names
+    url_fields: Mapping[str, str]
+    base64_fields: Mapping[str, str]
+
+    @classmethod
+    def from_groups(cls, groups: Mapping[str, Any]) -> "ModelLookups":
+        """Derive the lookups from the ``groups`` of a model.
+
+        Group definitions that are not objects are skipped. Resources may be
+        given as an object keyed by collection name or as a list of
+        definitions carrying a ``plural``.
+        """
+        group_singulars: Dict[str, str] = {}
+        collections: Dict[str, Tuple[Tuple[str, Optional[str]], ...]] = {}
+        for group_type, group_def in groups.items():
+            if not isinstance(group_def, dict):
+                continue
+            if isinstance(group_def.get("singular"), str):
+                group_singulars[group_type] = group_def["singular"]
+            resources = group_def.get("resources", {})
+            entries: List[Tuple[str, Optional[str]]] = []
+            if isinstance(resources, dict):
+                for plural, resource_def in resources.items():
+                    singular = resource_def.get("singular") if isinstance(resource_def, dict) else None
+                    entries.append((plural, singular))
+            elif isinstance(resources, list):
+                for resource_def in resources:
+                    if isinstance(resource_def, dict) and resource_def.get("plural"):
+                        entries.append((resource_def["plural"], resource_def.get("singular")))
+            collections[group_type] = tuple(entries)
+
+        resource_singulars = {plural: singular for entries in collections.values()
+                              for plural, singular in entries if singular}
+        return cls(
+            group_types=tuple(groups),
+            group_type_set=frozenset(groups),
+            group_patterns=tuple(f"/{group_type}/" for group_type in groups),
+            group_singulars=MappingProxyType(group_singulars),
+            group_plurals=MappingProxyType({singular: plural for plural, singular in group_singulars.items()}),
+            resource_collections=MappingProxyType(collections),
+            resource_collection_sets=MappingProxyType(
+                {group_type: frozenset(plural for plural, _ in entries) for group_type, entries in collections.items()}),
+            collection_url_fields=MappingProxyType(
+                {group_type: tuple((plural, f"{plural}url") for plural, _ in entries)
+                 for group_type, entries in collections.items()}),
+            resource_singulars=MappingProxyType(resource_singulars),
+            resource_plurals=MappingProxyType({singular: plural for plural, singular in resource_singulars.items()}),
+            url_fields=MappingProxyType({singular: f"{singular}url" for singular in resource_singulars.values()}),
+            base64_fields=MappingProxyType({singular: f"{singular}base64" for singular in resource_singulars.values()}),
+        )
+
+    @classmethod
+    def of(cls, model: Any) -> "ModelLookups":
+        """Return the lookups of a :class:`Model`.
+
+        For other objects with a ``groups`` attribute (partial models, test
+        doubles) the lookups are derived from ``groups`` on every call.
+        """
+        lookups = getattr(model, "lookups", None)
+        if isinstance(lookups, ModelLookups):
+            return lookups
+        return cls.from_groups(model.groups)
+
+    def url_field(self, singular: str) -> str:
+        """Return the attribute holding the URL of a resource's document, e.g. ``schemaurl``."""
+        return self.url_fields.get(singular) or f"{singular}url"
+
+    def base64_field(self, singular: str) -> str:
+        """Return the attribute holding a resource's document in base64, e.g. ``schemabase64``."""
+        return self.base64_fields.get(singular) or f"{singular}base64"
 
 
 class Model:
     """Loads, caches and exposes the extension-model."""
 
+    #: Lookups of every model loaded by this process, by hash of its groups
+    _lookups_by_groups: Dict[str, ModelLookups] = {}
+    _lookups_lock = threading.Lock()
+
     #: relative location of the embedded model (resolved at runtime)
     _EMBEDDED = Path(__file__).with_suffix("").parent / ".." / "schemas" / "model.json"
 
-    def __init__(self, registry_url: Optional[str] = None, model_path: Optional[str] = None) -> None:
+    def __init__(self, registry_url: Optional[str] = None, model_path: Optional[str] = None,
+                 transport: Optional[HttpTransport] = None) -> None:
         """
         Initialize Model with optional registry URL or custom model path.
         
@@ -42,10 +155,15 @@ class Model:
                        - HTTP(S) URL pointing directly to model.json
                        - Registry base URL (will append /model)
                        If None, checks XREGISTRY_MODEL_PATH environment variable
+            transport: HTTP transport used for remote models. Defaults to the
+                       shared pooled transport.
         """
+        self._transport = transport or get_transport()
         self._url = registry_url.rstrip("/") if registry_url else None
         self._model_path = model_path or os.getenv("XREGISTRY_MODEL_PATH")
         self._model: Dict[str, Any] = {}
+        self._fingerprint: Optional[str] = None
+        self._lookups: Optional[ModelLookups] = None
         self._load()
 
         # Build some helper look-ups, filtering out invalid group entries
@@ -64,6 +182,29 @@ class Model:
     def groups(self) -> Dict[str, Any]:
         return self._model.get("groups", {})
 
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the loaded model, for keying caches of documents resolved against it."""
+        if self._fingerprint is None:
+            self._fingerprint = json_codec.canonical_hash(self._model)
+        return self._fingerprint
+
+    @property
+    def lookups(self) -> ModelLookups:
+        """Precomputed lookups over the groups of the model.
+
+        Built on first use and shared with every other Model instance whose
+        groups are the same.
+        """
+        if self._lookups is None:
+            key = json_codec.canonical_hash(self.groups)
+            with Model._lookups_lock:
+                lookups = Model._lookups_by_groups.get(key)
+                if lookups is None:
+                    lookups = Model._lookups_by_groups[key] = ModelLookups.from_groups(self.groups)
+            self._lookups = lookups
+        return self._lookups
+
     def group(self, name: str) -> Dict[str, Any]:
         """Return group-definition by *singular* **or** *plural* form."""
         return self._group_by_singular.get(name) or self._group_by_plural[name]
@@ -93,9 +234,10 @@ class Model:
         # Priority 2: Legacy registry URL behavior
         if self._url:
             try:
-                resp = requests.get(f"{self._url}/model", timeout=4)
-                resp.raise_for_status()
-                self._model = resp.json()
+                resp = self._transport.get(
+                    f"{self._url}/model", timeout=4,
+                    max_age=config_manager.load_config().model.cache_timeout)
+                self._model = json.loads(resp.content)
                 return
             except Exception:
                 # Any failure → fall back to embedded copy
@@ -128,14 +270,15 @@ class Model:
                     url = path
                     logger.debug(f"Fetching model directly from: {url}")
                     
-                resp = requests.get(url, timeout=10)
-                resp.raise_for_status()
+                resp = self._transport.get(
+                    url, timeout=10,
+                    max_age=config_manager.load_config().model.cache_timeout)
                 
                 content_type = resp.headers.get('content-type', '').lower()
                 if 'application/json' not in content_type and 'text/json' not in content_type:
                     logger.warning(f"Unexpected content type: {content_type}")
                 
-                self._model = resp.json()
+                self._model = json.loads(resp.content)
                 logger.info(f"Successfully loaded model from: {url}")
                 return True
                 
@@ -150,7 +293,7 @@ class Model:
                 logger.info(f"Successfully loaded model from local file: {model_file}")
                 return True
                 
-        except (requests.RequestException, ValueError, FileNotFoundError, json.JSONDecodeError) as e:
+        except (TransportError, ValueError, FileNotFoundError, json.JSONDecodeError) as e:
             # Log error but don't raise - allow fallback to embedded model
             logger.warning(f"Failed to load model from {path}: {e}. Falling back to embedded model.")
             return False
@@ -0,0 +1,134 @@
+"""
+registry_roots.py – TTL-bounded cache of discovered xRegistry roots.
+
+``XRegistryLoader.discover_registry_root`` probes ``/capabilities`` along a
+URL path to find the registry root. The outcome is stored here so that every
+loader in the process (and, when the cache is persistent, every later run)
+reuses it instead of probing again.
+
+A discovered root also answers any other URL below it: the probe ladder for
+such a URL would fail at every shorter prefix and stop at the same root.
+Fallback results (no ``/capabilities`` found) only answer the exact URL,
+and only in the current process: the probes may have failed for a reason
+that does not last (a timeout, a connection error, missing credentials), so
+they are never persisted.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+#: Default lifetime of a cached registry root in seconds
+DEFAULT_ROOT_TTL = 24 * 3600
+
+
+class RegistryRootCache:
+    """Maps URLs to their registry root, optionally persisted as a JSON file."""
+
+    def __init__(self, path: Optional[Path] = None, ttl: int = DEFAULT_ROOT_TTL) -> None:
+        """
+        Args:
+            path: JSON file to persist the cache in; None keeps it in memory only.
+            ttl: Seconds after which a cached root is probed again.
+        """
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._read() if self.path else {}
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached registry root for a URL, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and now - entry["stored"] < self.ttl:
+                return entry["root"]
+            # The longest discovered root that contains the URL
+            best: Optional[str] = None
+            for entry in self._entries.values():
+                root = entry["root"]
+                if (entry["discovered"] and now - entry["stored"] < self.ttl
+                        and (url == root or url.startswith(root.rstrip("/") + "/"))
+                        and (best is None or len(root) > len(best))):
+                    best = root
+            return best
+
+    def put(self, url: str, root: str, discovered: bool = True) -> None:
+        """Remember the registry root of a URL.
+
+        Args:
+            url: The URL that was probed
+            root: The registry root
+            discovered: False if the root is only a fallback guess, which is
+                kept in memory only
+        """
+        with self._lock:
+            self._entries[url] = {"root": root, "discovered": discovered, "stored": time.time()}
+            if self.path and discovered:
+                self._write()
+
+    def clear(self) -> None:
+        """Forget all cached roots."""
+        with self._lock:
+            self._entries = {}
+            if self.path:
+                self._write()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {url: entry for url, entry in data.items()
+                    if isinstance(entry, dict) and {"root", "discovered", "stored"} <= entry.keys()
+                    and entry["discovered"]}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable registry root cache {self.path}: {e}")
+            return {}
+
+    def _write(self) -> None:
+        # Drop expired entries and replace the file atomically
+        now = time.time()
+        self._entries = {url: entry for url, entry in self._entries.items()
+                         if now - entry["stored"] < self.ttl}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({url: entry for url, entry in self._entries.items() if entry["discovered"]},
+                          f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write registry root cache {self.path}: {e}")
+
+
+_default_cache: Optional[RegistryRootCache] = None
+_default_lock = threading.Lock()
+
+
+def get_registry_root_cache() -> RegistryRootCache:
+    """Return the process-wide registry root cache, creating an in-memory one on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RegistryRootCache()
+        return _default_cache
+
+
+def set_registry_root_cache(cache: Optional[RegistryRootCache]) -> Optional[RegistryRootCache]:
+    """Replace the process-wide registry root cache and return the previous one."""
+    global _default_cache
+    with _default_lock:
+        previous = _default_cache
+        _default_cache = cache
+        return previous
@@ -0,0 +1,240 @@
+"""
+transport.py – pooled HTTP transport shared by the loader and the model.
+
+All HTTP(S) GETs issued while loading xRegistry documents (definitions,
+``*url`` resources and collections, ``/capabilities`` probes, the model)
+go through a single :class:`HttpTransport` so that one generate run reuses
+a handful of keep-alive connections instead of paying a TCP/TLS handshake
+per request.
+
+*   Connections are pooled per host (``requests`` / ``urllib3``).
+*   Responses are transparently decoded (gzip, deflate and - if the
+    ``brotli`` package is installed, e.g. via the ``http`` extra - br).
+*   Timeouts default to ``registry.timeout`` from the user configuration.
+
+The transport is pluggable: :func:`set_transport` replaces the process-wide
+default and every consumer also accepts an explicit instance. A
+:class:`CoalescingTransport` in front of it fetches every URL at most once
+per run, however often and from however many threads it is requested.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import config_manager
+
+
+logger = logging.getLogger(__name__)
+
+#: ``timeout`` may be a single number or a ``(connect, read)`` tuple.
+Timeout = Union[float, Tuple[float, float]]
+
+DEFAULT_POOL_CONNECTIONS = 16
+DEFAULT_POOL_MAXSIZE = 16
+
+
+class TransportError(Exception):
+    """Raised when a request fails or returns an error status."""
+
+    def __init__(self, url: str, reason: str, status: Optional[int] = None) -> None:
+        self.url = url
+        self.reason = reason
+        self.status = status
+        message = f"{status} {reason}" if status is not None else reason
+        super().__init__(message)
+
+
+@dataclass
+class HttpResponse:
+    """A fully read HTTP response."""
+    url: str
+    status: int
+    headers: Mapping[str, str] = field(default_factory=dict)
+    content: bytes = b""
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+
+class HttpTransport:
+    """Keep-alive HTTP transport with per-host connection pooling."""
+
+    def __init__(self, timeout: Optional[Timeout] = None,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> None:
+        """
+        Args:
+            timeout: Default timeout in seconds (or ``(connect, read)``).
+                     If None, ``registry.timeout`` from the configuration is used.
+            pool_connections: Number of per-host pools to keep.
+            pool_maxsize: Maximum number of kept-alive connections per host;
+                          should be at least the number of concurrent fetches.
+        """
+        if timeout is None:
+            timeout = config_manager.load_config().registry.timeout
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[Timeout] = None,
+            max_age: Optional[int] = None) -> HttpResponse:
+        """GET ``url`` and return the fully read response.
+
+        ``max_age`` is the number of seconds a cached copy may be served
+        without revalidation; it is only honored by caching transports.
+
+        Raises:
+            TransportError: on connection failures, timeouts and HTTP status >= 400.
+        """
+        try:
+            resp = self._session.get(url, headers=headers or {},
+                                     timeout=timeout if timeout is not None else self.timeout)
+        except requests.RequestException as e:
+            raise TransportError(url, str(e)) from e
+
+        if resp.status_code >= 400:
+            raise TransportError(url, resp.reason or "", resp.status_code)
+
+        return HttpResponse(url=resp.url, status=resp.status_code,
+                            headers=resp.headers, content=resp.content)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._session.close()
+
+    def __enter__(self) -> "HttpTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class RequestStats:
+    """Counters of a :class:`CoalescingTransport`."""
+    #: Requests passed on to the underlying transport
+    misses: int = 0
+    #: Requests answered from memory
+    hits: int = 0
+    #: Requests that waited for an identical request already in flight
+    coalesced: int = 0
+
+    @property
+    def avoided(self) -> int:
+        """Number of requests that did not reach the underlying transport."""
+        return self.hits + self.coalesced
+
+
+class _Pending:
+    """A request in flight or completed, shared by all callers of the same URL."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Optional[HttpResponse] = None
+        self.error: Optional[TransportError] = None
+
+
+class CoalescingTransport:
+    """Per-run request memo in front of another transport.
+
+    The first GET of a URL (with the same request headers) goes to the
+    wrapped transport; identical GETs issued while it is in flight wait for
+    it, and later ones are answered from memory. Responses and HTTP error
+    statuses are remembered for the lifetime of the memo, connection
+    failures are not. Intended for one run, e.g. one CLI invocation: use
+    :meth:`clear` or a new instance to see changes on the server.
+    """
+
+    def __init__(self, transport: HttpTransport) -> None:
+        self.transport = transport
+        self.stats = RequestStats()
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Pending] = {}
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[Timeout] = None,
+            max_age: Optional[int] = None) -> HttpResponse:
+        """GET ``url`` once per run; see :meth:`HttpTransport.get`."""
+        key = (url, tuple(sorted((k.lower(), v) for k, v in (headers or {}).items())))
+        with self._lock:
+            pending = self._requests.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._requests[key] = _Pending()
+                self.stats.misses += 1
+            elif pending.done.is_set():
+                self.stats.hits += 1
+            else:
+                self.stats.coalesced += 1
+
+        if owner:
+            try:
+                pending.response = self.transport.get(url, headers, timeout, max_age)
+            except TransportError as e:
+                pending.error = e
+            finally:
+                if pending.response is None and (pending.error is None or pending.error.status is None):
+                    # Let a later request try again after connection failures
+                    with self._lock:
+                        self._requests.pop(key, None)
+                pending.done.set()
+        else:
+            pending.done.wait()
+
+        if pending.response is not None:
+            return pending.response
+        if pending.error is not None:
+            raise TransportError(pending.error.url, pending.error.reason, pending.error.status)
+        raise TransportError(url, "Request failed")
+
+    def clear(self) -> None:
+        """Forget all remembered responses."""
+        with self._lock:
+            self._requests = {}
+
+    def close(self) -> None:
+        """Close the wrapped transport."""
+        self.transport.close()
+
+    def __enter__(self) -> "CoalescingTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide default transport, creating it on first use."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
+
+
+def set_transport(transport: Optional[HttpTransport]) -> Optional[HttpTransport]:
+    """Replace the process-wide default transport and return the previous one.
+
+    Passing None resets the default so that the next :func:`get_transport`
+    call creates a fresh transport.
+    """
+    global _default_transport
+    with _default_lock:
+        previous = _default_transport
+        _default_transport = transport
+        return previous
@@ -0,0 +1,72 @@
+"""
+compact_document.py – compact in-memory representation of resolved documents.
+
+A resolved definitions document is plain nested dicts and lists, and large
+catalogs repeat the same strings many thousands of times: attribute names of
+every message, version and schema, XIDs in ``xref``/``basemessage``/
+``dataschemauri`` references, and values such as ``CloudEvents/1.0``,
+``string`` or ``JsonSchema/draft-07``. A parser only shares the attribute
+names within one document, and every fetched resource, schema and stacked
+layer is a document of its own.
+
+:func:`compact_document` interns attribute names and short token-like string
+values (XIDs, URLs, formats, type names) with :func:`sys.intern` so that each
+distinct string is stored once per process. Dictionaries whose attribute names
+are replaced are rebuilt in place, which also drops the slack a dictionary
+keeps after growing.
+
+The document keeps its structure and types: containers are modified in place,
+so nodes keep their identity and the result is still accepted by everything
+that checks for ``dict`` and ``list``, serializes the document or resolves
+JSON pointers into it. Text with whitespace (descriptions, inline proto and
+XSD schemas) is left alone because templates locate such values in the
+document by identity.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from typing import Any, List
+
+#: Longest string value that is interned
+MAX_INTERNED_LENGTH = 128
+
+_TOKEN = re.compile(r"\S{1,%d}" % MAX_INTERNED_LENGTH)
+
+
+def compact_document(document: Any) -> int:
+    """Intern the attribute names and token-like string values of a document in place.
+
+    Containers shared between several places of the document are compacted
+    once. Returns the number of containers visited.
+    """
+    intern = sys.intern
+    is_token = _TOKEN.fullmatch
+    seen = set()
+    stack: List[Any] = [document]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, dict):
+            rebuild = False
+            for key, value in node.items():
+                if isinstance(key, str) and intern(key) is not key:
+                    rebuild = True
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+            if rebuild:
+                items = [(intern(key) if isinstance(key, str) else key, value) for key, value in node.items()]
+                node.clear()
+                node.update(items)
+            for key, value in node.items():
+                if type(value) is str and is_token(value):
+                    node[key] = intern(value)
+        elif isinstance(node, list):
+            for position, value in enumerate(node):
+                if type(value) is str and is_token(value):
+                    node[position] = intern(value)
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+    return len(seen)
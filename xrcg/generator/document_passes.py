@@ -0,0 +1,166 @@
+"""
+document_passes.py – shared traversal for the passes that normalize a loaded document.
+
+After a document is loaded, the loader fetches collection URLs, resolves
+resource payloads, resolves aliases and basemessages and rewrites schema
+references. Each of these steps is a :class:`DocumentPass`: it sees the groups
+and resources of the document through hooks instead of walking the document
+itself. :class:`DocumentWalker` runs any number of passes on one traversal of
+the model's group types, groups, resource collections and resources, calling
+every pass's hook for a node before moving on to the next node.
+
+Passes whose ordering constraints allow it share a traversal. The loader
+needs three:
+
+1.  collection URLs and resource payloads (aliases project the resolved
+    payloads of their targets),
+2.  aliases (a basemessage may be an alias),
+3.  basemessages and schema references (both only touch the message they
+    visit).
+
+The time spent in each pass is accumulated in a :class:`PassTimings`.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from xrcg.common.model import ModelLookups
+
+
+class ResourceLocation(NamedTuple):
+    """Position of a resource in a document."""
+
+    group_type: str
+    group_id: str
+    collection: str
+    singular: Optional[str]
+    resource_id: str
+
+    @property
+    def collection_xid(self) -> str:
+        """XID of the resource collection, e.g. ``/messagegroups/g/messages``."""
+        return f"/{self.group_type}/{self.group_id}/{self.collection}"
+
+    @property
+    def xid(self) -> str:
+        """XID of the resource, e.g. ``/messagegroups/g/messages/m``."""
+        return f"{self.collection_xid}/{self.resource_id}"
+
+
+class DocumentPass:
+    """A step of document normalization, driven by :class:`DocumentWalker`.
+
+    Subclasses override the hooks they need. All hooks of all passes for a
+    group run before the walker reads the group's resource collections, so a
+    group hook may add collections. A resource hook may replace its resource
+    in ``resources``; passes after it see the replacement.
+    """
+
+    #: Name under which the time spent in the pass is reported
+    name = "pass"
+
+    def begin(self, document: Dict[str, Any]) -> None:
+        """Called before the traversal."""
+
+    def visit_group(self, group_type: str, group_id: str, group: Dict[str, Any]) -> None:
+        """Called for every group, before its resources."""
+
+    def visit_resource(self, location: ResourceLocation, resources: Dict[str, Any],
+                       resource: Dict[str, Any]) -> None:
+        """Called for every resource; ``resources`` is the collection holding it."""
+
+    def end(self, document: Dict[str, Any]) -> None:
+        """Called after the traversal completed."""
+
+    def close(self) -> None:
+        """Called after the traversal, also if it failed; releases per-document state."""
+
+
+class PassTimings:
+    """Wall-clock time spent in each pass, in seconds, in the order the passes first ran."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time spent in a pass."""
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Time a block as part of a pass."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def clear(self) -> None:
+        """Forget all timings."""
+        self.seconds.clear()
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.seconds.items())
+
+
+class DocumentWalker:
+    """Runs passes over the groups and resources of documents described by a model."""
+
+    def __init__(self, model_groups: Union[Dict[str, Any], ModelLookups],
+                 timings: Optional[PassTimings] = None) -> None:
+        """``model_groups`` is the ``groups`` of a model or their precomputed lookups."""
+        self.timings = timings if timings is not None else PassTimings()
+        lookups = model_groups if isinstance(model_groups, ModelLookups) else ModelLookups.from_groups(model_groups)
+        # group type -> ((resource collection, singular), ...), in model order
+        self._collections: Mapping[str, Tuple[Tuple[str, Optional[str]], ...]] = lookups.resource_collections
+
+    def walk(self, document: Any, passes: Sequence[DocumentPass]) -> None:
+        """Run the passes on one traversal of the document."""
+        if not isinstance(document, dict) or not passes:
+            return
+        elapsed = [0.0] * len(passes)
+        clock = time.perf_counter
+        try:
+            for position, document_pass in enumerate(passes):
+                start = clock()
+                document_pass.begin(document)
+                elapsed[position] += clock() - start
+
+            for group_type, collections in self._collections.items():
+                groups = document.get(group_type)
+                if not isinstance(groups, dict):
+                    continue
+                for group_id, group in list(groups.items()):
+                    if not isinstance(group, dict):
+                        continue
+                    for position, document_pass in enumerate(passes):
+                        start = clock()
+                        document_pass.visit_group(group_type, group_id, group)
+                        elapsed[position] += clock() - start
+                    for collection, singular in collections:
+                        resources = group.get(collection)
+                        if not isinstance(resources, dict):
+                            continue
+                        for resource_id in list(resources):
+                            location = ResourceLocation(group_type, group_id, collection, singular, resource_id)
+                            for position, document_pass in enumerate(passes):
+                                # Read the resource again, an earlier pass may have replaced it
+                                resource = resources.get(resource_id)
+                                if not isinstance(resource, dict):
+                                    break
+                                start = clock()
+                                document_pass.visit_resource(location, resources, resource)
+                                elapsed[position] += clock() - start
+
+            for position, document_pass in enumerate(passes):
+                start = clock()
+                document_pass.end(document)
+                elapsed[position] += clock() - start
+        finally:
+            for position, document_pass in enumerate(passes):
+                start = clock()
+                document_pass.close()
+                elapsed[position] += clock() - start
+                self.timings.add(document_pass.name, elapsed[position])
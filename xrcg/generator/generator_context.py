@@ -1,8 +1,14 @@
 """Context for the code generator."""
 
+from typing import TYPE_CHECKING
+
 from xrcg.generator.context_stacks_manager import ContextStacksManager
+from xrcg.generator.output_writer import OutputStats
 from xrcg.generator.xregistry_loader import XRegistryLoader
 
+if TYPE_CHECKING:
+    from xrcg.generator.render_manifest import RenderManifest
+
 
 class GeneratorContext:
     """Context for the code generator."""
@@ -25,6 +31,12 @@ class GeneratorContext:
         self.project_name: str = project_name
         self.style: str = style
         self.output_directory: str = output_directory
+        self.model_path: str | None = model_path
+        # Worker processes for rendering templates; 1 renders in this process
+        self.jobs: int = 1
+        self.output_stats: OutputStats = OutputStats()
+        # Dependency manifest of the output directory with --incremental
+        self.manifest: 'RenderManifest | None' = None
         self.loader: XRegistryLoader = XRegistryLoader(model_path)
         self.stacks: ContextStacksManager = ContextStacksManager(self.current_dir)
     
@@ -0,0 +1,144 @@
+"""
+output_writer.py – write generated files only when their content changed.
+
+Regenerating into an existing output directory rewrote every file, so build
+tools (Maven, dotnet, tsc, cargo) saw all of them as modified and rebuilt
+whole projects. :func:`write_if_changed` compares the new content with the
+file on disk, size first and then byte by byte, and leaves an identical file
+untouched, modification time included. :class:`OutputStats` records which
+files a run wrote, left unchanged and deleted.
+
+Avrotize writes the data classes itself, and decides what to write by what
+is already in the output directory. :class:`OutputSnapshot` leaves it alone
+and afterwards gives the files it rewrote with the same content their old
+modification times back. It skips the dependency and build directories of
+the generated projects, which Avrotize does not write.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+
+
+#: Directories below a generated project that hold dependencies or build
+#: results, not generated sources; hidden directories are skipped as well
+SKIPPED_DIRECTORIES = frozenset({"node_modules", "target", "bin", "obj", "__pycache__"})
+
+
+@dataclass
+class OutputStats:
+    """The output files of a run, by what happened to them: written, unchanged or deleted.
+
+    A file counts once, by what the run last did to it, except that a file
+    written with new content stays written when it is written again with
+    the same content.
+    """
+    files: Dict[str, str] = field(default_factory=dict)
+
+    def record(self, path: str, state: str) -> None:
+        """Record that the file was ``"written"``, left ``"unchanged"`` or ``"deleted"``."""
+        path = os.path.abspath(path)
+        if state != "unchanged" or self.files.get(path) != "written":
+            self.files[path] = state
+
+    def add(self, other: 'OutputStats') -> None:
+        """Add the files of a later part of the run, such as a worker's."""
+        for path, state in other.files.items():
+            self.record(path, state)
+
+    def count(self, state: str) -> int:
+        """Return the number of files in the state."""
+        return sum(1 for s in self.files.values() if s == state)
+
+    def __str__(self) -> str:
+        return f"{self.count('written')} written, {self.count('unchanged')} unchanged, {self.count('deleted')} deleted"
+
+
+def encode_text(content: str) -> bytes:
+    """Return the bytes a file opened with ``open(path, "w", encoding="utf-8")`` receives for content."""
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    return content.encode("utf-8")
+
+
+def write_if_changed(path: str, content: str, stats: Optional[OutputStats] = None) -> bool:
+    """Write text to a file unless the file already has exactly this content.
+
+    Returns:
+        True if the file was written, False if it was left as it was.
+    """
+    data = encode_text(content)
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    if stats is not None:
+                        stats.record(path, "unchanged")
+                    return False
+    except OSError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+    if stats is not None:
+        stats.record(path, "written")
+    return True
+
+
+def remove_output(path: str, stats: Optional[OutputStats] = None) -> bool:
+    """Delete an output file if it exists; return whether it did."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    if stats is not None:
+        stats.record(path, "deleted")
+    return True
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _source_files(directory: str) -> Iterator[str]:
+    """Yield the paths of the files below a directory, outside of :data:`SKIPPED_DIRECTORIES`."""
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRECTORIES and not d.startswith(".")]
+        for name in names:
+            yield os.path.join(root, name)
+
+
+class OutputSnapshot:
+    """Sizes, content hashes and times of the files below a directory.
+
+    Taken before a generator that rewrites files unconditionally runs;
+    :meth:`restore_unchanged` then undoes the rewrites that did not change
+    a file's content. Files in :data:`SKIPPED_DIRECTORIES` and hidden
+    directories are neither read nor recorded.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        # path -> (size, modification time, access time, content hash)
+        self.files: Dict[str, Tuple[int, int, int, str]] = {}
+        for path in _source_files(directory):
+            st = os.stat(path)
+            self.files[path] = (st.st_size, st.st_mtime_ns, st.st_atime_ns, file_digest(path))
+
+    def restore_unchanged(self, stats: Optional[OutputStats] = None) -> None:
+        """Restore the times of rewritten files with unchanged content and record the files written since."""
+        for path in _source_files(self.directory):
+            st = os.stat(path)
+            before = self.files.get(path)
+            if before is not None and before[1] == st.st_mtime_ns and before[0] == st.st_size:
+                continue
+            if before is not None and before[0] == st.st_size and before[3] == file_digest(path):
+                os.utime(path, ns=(before[2], before[1]))
+                state = "unchanged"
+            else:
+                state = "written"
+            if stats is not None:
+                stats.record(path, state)
@@ -0,0 +1,210 @@
+"""
+parallel_render.py – render templates in worker processes.
+
+With ``generate --jobs N``, :class:`TemplateRenderer` renders the code
+templates of a document with a :class:`RenderPool` of N worker processes.
+A render unit is one template rendered for one scope: the whole document,
+or one message group for ``{class...}`` templates. Every unit writes its own
+output file.
+
+Units are handed to the workers in ordered chunks. Each worker renders with
+a context of its own and returns, for every unit, the values its templates
+passed to ``push``, ``pushfile`` and ``save`` and the resources it passed
+to ``mark_handled``; the parent applies them to its context and renderer in
+unit order, which leaves the stacks exactly as rendering the units one after
+the other does. Templates rendered in parallel therefore cannot ``pop``
+values that other templates pushed in the same pass; the built-in templates
+only write to the stacks.
+"""
+from __future__ import annotations
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.output_writer import OutputStats
+from xrcg.generator.schema_utils import SchemaUtils
+from xrcg.generator.template_cache import (TemplateBytecodeCache, get_template_bytecode_cache,
+                                           set_template_bytecode_cache)
+from xrcg.generator.xregistry_index import XRegistryIndex
+
+if TYPE_CHECKING:
+    from xrcg.generator.template_renderer import TemplateRenderer
+
+#: Chunks per worker; more chunks balance uneven templates, fewer save round trips
+CHUNKS_PER_JOB = 4
+
+
+class RenderUnit(NamedTuple):
+    """One template rendered for one scope."""
+    template_name: str
+    class_name: str
+    #: Message group rendered by a ``{class...}`` template, None for the whole document
+    group_id: Optional[str]
+    file_dir: str
+    file_name: str
+
+
+@dataclass(frozen=True)
+class RenderBatch:
+    """Settings shared by the units of one render_code_templates call."""
+    template_dirs: Tuple[str, ...]
+    #: Directory the ``pushfile`` paths are relative to
+    stacks_dir: str
+    project_name: str
+    main_project_name: str
+    data_project_name: str
+    template_args: Dict[str, Any]
+    suppress_output: bool
+    uses_avro: bool
+    uses_protobuf: bool
+
+
+@dataclass
+class RenderEffects:
+    """Context changes made by the templates of a unit."""
+    stacks: Dict[str, List[Any]]
+    values: Dict[str, Any]
+    schema_references: Set[str]
+    current_dir: Optional[str]
+    output_stats: OutputStats
+    #: Resources the templates passed to ``mark_handled``
+    handled_resources: Set[str] = field(default_factory=set)
+
+    def apply(self, ctx: GeneratorContext, handled_resources: Optional[Set[str]] = None) -> None:
+        """Apply the changes to ``ctx`` as if the chunk had been rendered with it.
+
+        ``handled_resources`` is the set of resources marked as handled of the
+        renderer the changes belong to.
+        """
+        if handled_resources is not None:
+            handled_resources.update(self.handled_resources)
+        for stack_name, pushed in self.stacks.items():
+            ctx.stacks.context_stacks.setdefault(stack_name, []).extend(pushed)
+        ctx.stacks.context_dict.update(self.values)
+        SchemaUtils.schema_references_collected.update(self.schema_references)
+        if self.current_dir is not None:
+            ctx.current_dir = self.current_dir
+        ctx.output_stats.add(self.output_stats)
+
+
+def collect_effects(ctx: GeneratorContext, render: Callable[[], None],
+                    handled_resources: Optional[Set[str]] = None) -> RenderEffects:
+    """Call render with empty stacks and return the context changes it made.
+
+    The context, and the handled resources of the renderer if given, are left
+    as they were; apply the returned changes to them.
+    """
+    stacks = ctx.stacks
+    saved = (stacks.context_stacks, stacks.context_dict, ctx.current_dir, ctx.output_stats,
+             SchemaUtils.schema_references_collected)
+    saved_handled = set(handled_resources) if handled_resources is not None else None
+    stacks.context_stacks = {}
+    stacks.context_dict = {}
+    ctx.current_dir = None
+    ctx.output_stats = OutputStats()
+    SchemaUtils.schema_references_collected = set()
+    if handled_resources is not None:
+        handled_resources.clear()
+    try:
+        render()
+        return RenderEffects(stacks.context_stacks, stacks.context_dict,
+                             SchemaUtils.schema_references_collected, ctx.current_dir, ctx.output_stats,
+                             set(handled_resources) if handled_resources is not None else set())
+    finally:
+        (stacks.context_stacks, stacks.context_dict, ctx.current_dir, ctx.output_stats,
+         SchemaUtils.schema_references_collected) = saved
+        if handled_resources is not None:
+            handled_resources.clear()
+            handled_resources.update(saved_handled)
+
+
+@dataclass(frozen=True)
+class _WorkerState:
+    """What a worker needs to render units of a document; sent once per worker."""
+    document: Any
+    messagegroup_filter: str
+    endpoint_filter: str
+    model_path: Optional[str]
+    base_uri: str
+    bytecode_cache: Optional[TemplateBytecodeCache]
+
+
+_worker_renderer: Optional['TemplateRenderer'] = None
+_worker_document: Any = None
+
+
+def _init_worker(state: _WorkerState) -> None:
+    """Set up the renderer of a worker process."""
+    # Imported here because template_renderer imports this module
+    from xrcg.generator.template_renderer import TemplateRenderer  # pylint: disable=import-outside-toplevel
+    global _worker_renderer, _worker_document  # pylint: disable=global-statement
+    if state.bytecode_cache is not None:
+        set_template_bytecode_cache(state.bytecode_cache)
+    ctx = GeneratorContext("", state.messagegroup_filter, state.endpoint_filter, state.model_path)
+    ctx.base_uri = state.base_uri
+    _worker_renderer = TemplateRenderer(ctx, "", "", "", "", "", {}, [], {}, True, True)
+    _worker_document = state.document
+    XRegistryIndex.for_document(state.document)
+
+
+def _render_chunk(batch: RenderBatch, units: Sequence[RenderUnit]) -> List[RenderEffects]:
+    """Render units in a worker process and return the context changes of each unit's template."""
+    from xrcg.generator.template_renderer import TemplateRenderer  # pylint: disable=import-outside-toplevel
+    renderer = _worker_renderer
+    assert renderer is not None, "worker not initialized"
+    ctx = renderer.ctx
+    ctx.stacks.current_dir = batch.stacks_dir
+    ctx.uses_avro = batch.uses_avro
+    ctx.uses_protobuf = batch.uses_protobuf
+    env = renderer.setup_jinja_env(list(batch.template_dirs))
+    effects = []
+    for unit in units:
+        scope = (_worker_document if unit.group_id is None
+                 else TemplateRenderer.class_scope(_worker_document, unit.group_id))
+        effects.append(collect_effects(ctx, partial(
+            renderer.render_template, batch.project_name, batch.main_project_name, batch.data_project_name,
+            unit.class_name, scope, unit.file_dir, unit.file_name,
+            env.get_template(unit.template_name), batch.template_args, batch.suppress_output),
+            renderer.handled_resources))
+    return effects
+
+
+class RenderPool:
+    """Worker processes rendering template units of one document.
+
+    The workers are started on the first :meth:`render` call and stopped by
+    :meth:`close`.
+    """
+
+    def __init__(self, jobs: int, ctx: GeneratorContext, document: Any) -> None:
+        self.jobs = jobs
+        self.ctx = ctx
+        self.document = document
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def render(self, batch: RenderBatch, units: Sequence[RenderUnit]) -> List[RenderEffects]:
+        """Render the units in the workers and return their context changes in unit order.
+
+        Raises whatever rendering a unit raised, including the SystemExit
+        of a failed template.
+        """
+        if self._executor is None:
+            state = _WorkerState(self.document, self.ctx.messagegroup_filter,
+                                 self.ctx.endpoint_filter, self.ctx.model_path, self.ctx.base_uri,
+                                 get_template_bytecode_cache())
+            self._executor = ProcessPoolExecutor(self.jobs, initializer=_init_worker, initargs=(state,))
+        size = max(1, math.ceil(len(units) / (self.jobs * CHUNKS_PER_JOB)))
+        chunks = [units[i:i + size] for i in range(0, len(units), size)]
+        return [effects for chunk_effects in self._executor.map(_render_chunk, repeat(batch), chunks)
+                for effects in chunk_effects]
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,255 @@
+"""
+render_manifest.py – dependency manifest for incremental regeneration.
+
+With ``generate --incremental``, every render unit (one template rendered
+for the whole document or for one message group, see
+:mod:`xrcg.generator.parallel_render`) and every Avrotize conversion of the
+data classes is recorded in ``.xrcg-manifest.json`` in the output directory,
+together with what it depended on:
+
+* ``templates``: the template and every template it includes, imports or
+  extends, by name, with a digest of their sources;
+* ``args``: the template arguments, project names, class name and the other
+  settings the template was rendered with;
+* ``document``: digests of the document subtrees in the unit's scope, by
+  XID: ``/`` for templates rendered with the whole document, the message
+  group, ``/endpoints/...`` and ``/schemagroups/...`` for ``{class...}``
+  templates.
+
+It also records the digests of the files the unit wrote, the values its
+templates passed to ``push``, ``pushfile`` and ``save`` and the resources
+they passed to ``mark_handled``. The next incremental run reuses a unit
+whose inputs are unchanged and whose output files are still as written: it
+is not rendered, and its recorded values are pushed, saved and marked again
+so that later templates, the ``files`` stack and the data class generation
+see the same context.
+
+The manifest belongs to the xrcg, Python and Jinja version that wrote it;
+another version renders everything again. Schemas loaded from outside the
+document while rendering are not tracked, and templates reused this way
+must not ``pop`` values pushed by other templates.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import jinja2
+from jinja2 import meta
+
+from xrcg.common import json_codec
+from xrcg.generator.output_writer import OutputStats, file_digest, write_if_changed
+from xrcg.generator.parallel_render import RenderEffects
+from xrcg.generator.template_cache import cache_tag
+
+
+logger = logging.getLogger(__name__)
+
+#: Name of the manifest file in the output directory
+MANIFEST_FILE = ".xrcg-manifest.json"
+
+#: Bump to ignore existing manifests when the entry layout changes
+MANIFEST_FORMAT = 2
+
+JsonNode = Any
+
+
+def normalize(value: Any) -> Any:
+    """Return the value as it reads back from the manifest; values JSON cannot hold become strings."""
+    return json.loads(json.dumps(value, sort_keys=True, default=str))
+
+
+class RenderManifest:
+    """Inputs, outputs and context changes of the render units of an output directory.
+
+    :meth:`reuse` looks a unit up in the manifest of the previous run,
+    :meth:`record` enters a rendered unit for the next one, and :meth:`save`
+    writes the units of this run, reused or rendered, to the output directory.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = os.path.abspath(output_dir)
+        self.path = os.path.join(self.output_dir, MANIFEST_FILE)
+        self.previous: Dict[str, Dict[str, Any]] = {}
+        self.units: Dict[str, Dict[str, Any]] = {}
+        self.reused = 0
+        self.rendered = 0
+        # (environment, template name) -> (source digest, referenced template names)
+        self._templates: Dict[Tuple[int, str], Tuple[Optional[str], List[str]]] = {}
+        # id(document) -> (document, subtree digests by XID)
+        self._documents: Dict[int, Tuple[JsonNode, Dict[str, str]]] = {}
+
+    @classmethod
+    def load(cls, output_dir: str) -> 'RenderManifest':
+        """Return the manifest for the output directory with the units of the previous run, if usable."""
+        manifest = cls(output_dir)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return manifest
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {manifest.path}: {e}")
+            return manifest
+        if data.get("format") == MANIFEST_FORMAT and data.get("xrcg") == cache_tag():
+            manifest.previous = data.get("units", {})
+        return manifest
+
+    def save(self) -> None:
+        """Write the units of this run to the manifest file."""
+        data = {"format": MANIFEST_FORMAT, "xrcg": cache_tag(), "units": self.units}
+        os.makedirs(self.output_dir, exist_ok=True)
+        write_if_changed(self.path, json.dumps(data, indent=1, sort_keys=True) + "\n")
+
+    def key(self, name: str, output_path: str) -> str:
+        """Return the key of the unit rendering the named template, or running the named step, to the output path."""
+        return f"{name} -> {os.path.relpath(os.path.abspath(output_path), self.output_dir)}"
+
+    def template_inputs(self, env: jinja2.Environment, name: str) -> Dict[str, Optional[str]]:
+        """Return the source digests of a template and of all templates it references, by name.
+
+        A template referenced by an expression Jinja cannot resolve before
+        rendering could be any template of the environment, so all of them
+        are included then.
+        """
+        digests: Dict[str, Optional[str]] = {}
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in digests:
+                continue
+            digests[current], references = self._template(env, current)
+            pending.extend(references)
+        return dict(sorted(digests.items()))
+
+    def _template(self, env: jinja2.Environment, name: str) -> Tuple[Optional[str], List[str]]:
+        key = (id(env), name)
+        entry = self._templates.get(key)
+        if entry is None:
+            try:
+                source, _, _ = env.loader.get_source(env, name)
+            except jinja2.TemplateNotFound:
+                entry = (None, [])
+            else:
+                references: List[str] = []
+                for reference in meta.find_referenced_templates(env.parse(source)):
+                    if reference is None:
+                        references.extend(env.list_templates())
+                    else:
+                        references.append(reference)
+                entry = (hashlib.sha256(source.encode("utf-8")).hexdigest(), references)
+            self._templates[key] = entry
+        return entry
+
+    def document_inputs(self, document: JsonNode, group_id: Optional[str] = None) -> Dict[str, str]:
+        """Return the digests of the document subtrees a unit is rendered with, by XID.
+
+        That is the whole document, or for a message group the group and the
+        endpoints and schema groups that ``{class...}`` templates see with it.
+        """
+        cached = self._documents.get(id(document))
+        if cached is None or cached[0] is not document:
+            cached = self._documents[id(document)] = (document, {})
+        digests = cached[1]
+        if group_id is None:
+            xids = ["/"]
+        else:
+            xids = [f"/messagegroups/{group_id}"]
+            for collection in ("endpoints", "schemagroups"):
+                entries = document.get(collection)
+                if isinstance(entries, dict) and entries:
+                    xids.extend(f"/{collection}/{id_}" for id_ in entries)
+                else:
+                    xids.append(f"/{collection}")
+        inputs = {}
+        for xid in xids:
+            if xid not in digests:
+                parts = xid.strip("/").split("/", 1)
+                if not parts[0]:
+                    subtree = document
+                elif len(parts) == 1:
+                    subtree = document.get(parts[0])
+                else:
+                    subtree = document[parts[0]][parts[1]]
+                digests[xid] = json_codec.canonical_hash(subtree)
+            inputs[xid] = digests[xid]
+        return inputs
+
+    def reuse(self, key: str, inputs: Dict[str, Any]) -> Optional[RenderEffects]:
+        """Return the recorded context changes of an unchanged unit, or None if it has to be rendered.
+
+        A unit is unchanged if it has the inputs recorded in the previous run,
+        compared as returned by :func:`normalize`, and its output files still
+        have the content it wrote.
+        """
+        entry = self.previous.get(key)
+        if entry is None or entry["inputs"] != inputs:
+            return None
+        stats = OutputStats()
+        for relpath, digest in entry["outputs"].items():
+            path = os.path.join(self.output_dir, relpath)
+            if digest is None:
+                if os.path.exists(path):
+                    return None
+                continue
+            try:
+                if file_digest(path) != digest:
+                    return None
+            except OSError:
+                return None
+            stats.record(path, "unchanged")
+        self.units[key] = entry
+        self.reused += 1
+        stacks = {name: [tuple(value) for value in values] if name == "files" else values
+                  for name, values in entry["stacks"].items()}
+        return RenderEffects(stacks, entry["values"], set(entry["schema_references"]),
+                             entry["current_dir"], stats, set(entry["handled_resources"]))
+
+    def outputs(self, key: str) -> List[str]:
+        """Return the paths of the files a unit wrote in the previous run."""
+        entry = self.previous.get(key)
+        if entry is None:
+            return []
+        return [os.path.join(self.output_dir, relpath) for relpath, digest in entry["outputs"].items()
+                if digest is not None]
+
+    def record(self, key: str, inputs: Dict[str, Any], effects: RenderEffects) -> None:
+        """Enter a rendered unit with its inputs and the context changes and output files of its rendering.
+
+        Units whose pushed or saved values JSON cannot hold exactly are not
+        entered and are rendered again in the next run.
+        """
+        self.rendered += 1
+        self.units.pop(key, None)
+        stacks = {name: [list(value) for value in values] if name == "files" else values
+                  for name, values in effects.stacks.items()}
+        try:
+            if normalize(stacks) != stacks or normalize(effects.values) != effects.values:
+                return
+        except (TypeError, ValueError, RecursionError):
+            return
+        outputs: Dict[str, Optional[str]] = {}
+        for path, state in effects.output_stats.files.items():
+            relpath = os.path.relpath(path, self.output_dir)
+            if state == "deleted":
+                outputs[relpath] = None
+            else:
+                try:
+                    outputs[relpath] = file_digest(path)
+                except OSError:
+                    return
+        self.units[key] = {
+            "inputs": inputs,
+            "outputs": outputs,
+            "stacks": stacks,
+            "values": effects.values,
+            "schema_references": sorted(effects.schema_references),
+            "handled_resources": sorted(effects.handled_resources),
+            "current_dir": effects.current_dir,
+        }
+
+    def __str__(self) -> str:
+        return f"{self.rendered} rendered, {self.reused} reused"
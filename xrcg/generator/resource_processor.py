@@ -8,6 +8,7 @@ import jsonpointer
 
 from xrcg.cli import logger
 from xrcg.generator.generator_context import GeneratorContext
+from xrcg.generator.xregistry_index import XRegistryIndex
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
 
@@ -146,7 +147,7 @@ class ResourceProcessor:
                 pointer = reference[1:]  # Remove #
                 if not pointer.startswith('/'):
                     pointer = '/' + pointer  # Add leading / for JSON Pointer
-                result = jsonpointer.resolve_pointer(root_document, pointer)
+                result = XRegistryIndex.resolve_pointer_in(root_document, pointer)
                 return result  # type: ignore
             else:
                 # External URL - use the loader
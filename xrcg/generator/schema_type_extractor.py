@@ -1,10 +1,11 @@
 """Refactored schema utilities focused on type and name extraction."""
 
 import re
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Union
 
 from xrcg.cli import logger
 from xrcg.generator.jinja_filters import JinjaFilters
+from xrcg.generator.xregistry_index import XRegistryIndex
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
 
@@ -17,32 +18,10 @@ class SchemaTypeExtractor:
         """Get the JSON Pointer to a node in a JSON document."""
         logger.debug("Getting JSON pointer to node in JSON document")
 
-        def find_path(current: JsonNode, target: JsonNode, path: List[str]) -> Optional[List[str]]:
-            if current is target:
-                return path
-            elif isinstance(current, dict):
-                for k, v in current.items():
-                    new_path = find_path(v, target, path + [k])
-                    if new_path is not None:
-                        return new_path
-            elif isinstance(current, list):
-                for i, item in enumerate(current):
-                    new_path = find_path(item, target, path + [str(i)])
-                    if new_path is not None:
-                        return new_path
-            return None
-
-        def path_to_pointer(path: List[str]) -> str:
-            pointer = ""
-            for p in path:
-                escaped = p.replace("~", "~0").replace("/", "~1")
-                pointer += f"/{escaped}"
-            return pointer
-
-        path = find_path(root, node, [])
-        if path is None:
+        pointer = XRegistryIndex.pointer_in(root, node)
+        if pointer is None:
             raise RuntimeError("Node not found in document")
-        return path_to_pointer(path)
+        return pointer
 
     @staticmethod
     def extract_schema_type_name(schema_obj: JsonNode, class_name: str = '', 
@@ -7,6 +7,7 @@ import jsonpointer
 from xrcg.cli import logger
 from xrcg.generator.generator_context import GeneratorContext
 from xrcg.generator.jinja_filters import JinjaFilters
+from xrcg.generator.xregistry_index import XRegistryIndex
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
 
@@ -21,32 +22,10 @@ class SchemaUtils:
         """Get the JSON Pointer to a node in a JSON document."""
         logger.debug("Getting JSON pointer to node in JSON document")
 
-        def find_path(current: JsonNode, target: JsonNode, path: List[str]) -> Optional[List[str]]:
-            if current is target:
-                return path
-            elif isinstance(current, dict):
-                for k, v in current.items():
-                    new_path = find_path(v, target, path + [k])
-                    if new_path is not None:
-                        return new_path
-            elif isinstance(current, list):
-                for i, item in enumerate(current):
-                    new_path = find_path(item, target, path + [str(i)])
-                    if new_path is not None:
-                        return new_path
-            return None
-
-        def path_to_pointer(path: List[str]) -> str:
-            pointer = ""
-            for p in path:
-                escaped = p.replace("~", "~0").replace("/", "~1")
-                pointer += f"/{escaped}"
-            return pointer
-
-        path = find_path(root, node, [])
-        if path is None:
+        pointer = XRegistryIndex.pointer_in(root, node)
+        if pointer is None:
             raise RuntimeError("Node not found in document")
-        return path_to_pointer(path)
+        return pointer
 
     @staticmethod
     def schema_type(ctx: GeneratorContext, schema_ref: JsonNode, project_name: str, root: JsonNode, schema_format: str = "jsonschema/draft-07") -> str:
@@ -59,7 +38,7 @@ class SchemaUtils:
         def resolve_pointer(root: JsonNode, schema_ref: str) -> JsonNode:
             if schema_ref.startswith("#"):
                 try:
-                    obj = jsonpointer.resolve_pointer(root, schema_ref[1:])
+                    obj = XRegistryIndex.resolve_pointer_in(root, schema_ref[1:])
                     if isinstance(obj, (dict, list, str)):
                         return obj
                     else:
@@ -114,7 +93,7 @@ class SchemaUtils:
                         class_name = path_elements[-1]
                 parent_reference = schema_ref.rsplit("/", 2)[0]
                 try:
-                    parent = jsonpointer.resolve_pointer(root, parent_reference[1:])
+                    parent = XRegistryIndex.resolve_pointer_in(root, parent_reference[1:])
                     if parent and isinstance(parent, dict):
                         # Try to get schema group ID from the parent object
                         prefix = parent.get("schemagroupid", '')
@@ -135,7 +114,7 @@ class SchemaUtils:
                 schema_version = schema_obj
                 parent_reference = schema_ref.rsplit("/", 1)[0]
                 if "schemaid" not in schema_obj:
-                    parent = jsonpointer.resolve_pointer(root, parent_reference[1:])
+                    parent = XRegistryIndex.resolve_pointer_in(root, parent_reference[1:])
                     if parent and isinstance(parent, dict) and not class_name:
                         class_name = parent.get("schemaid", class_name)
                 else:
@@ -144,7 +123,7 @@ class SchemaUtils:
                 if "defaultversionurl" not in schema_obj and "self" not in schema_obj:
                     parent_reference = parent_reference.rsplit("/", 2)[0]
                     try:
-                        parent = jsonpointer.resolve_pointer(root, parent_reference[1:])
+                        parent = XRegistryIndex.resolve_pointer_in(root, parent_reference[1:])
                         if parent and isinstance(parent, dict):
                             prefix = parent.get("schemagroupid", '')
                             if not class_name.startswith(prefix):
@@ -251,7 +230,7 @@ class SchemaUtils:
         if schema_url is None:
             return None
         try:
-            obj = jsonpointer.resolve_pointer(root, schema_url[1:].split(":")[0])
+            obj = XRegistryIndex.resolve_pointer_in(root, schema_url[1:].split(":")[0])
         except jsonpointer.JsonPointerException:
             return None
         return obj
@@ -0,0 +1,137 @@
+"""
+stacked_document.py – merging of stacked definition documents.
+
+``xrcg generate`` and ``xrcg validate`` accept several definition files that
+are stacked: later documents shadow earlier ones. Model group collections
+(``messagegroups``, ``schemagroups``, ...) are merged by group ID, groups
+present in both documents are merged attribute by attribute, and their
+resource collections are merged by resource ID. Everything else is replaced.
+
+:class:`StackedDocument` merges all layers in one pass. Containers are copied
+when a later layer first changes them and are updated in place after that, so
+a deep stack copies each merged collection, group and resource collection
+once instead of once per layer. Subtrees that no other layer touches are
+shared with the layer they come from.
+
+:meth:`StackedDocument.origins` reports the layer each resource was taken
+from, for debugging stacks (``--trace-stack``).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple, Union
+
+from xrcg.common.model import ModelLookups
+
+
+class StackedDocument:
+    """Layers of a document stack, each a (URI, document) pair, in stacking order.
+
+    ``model_groups`` is the ``groups`` of the model or their precomputed lookups.
+    """
+
+    def __init__(self, model_groups: Union[Dict[str, Any], ModelLookups],
+                 layers: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        self.layers = list(layers)
+        lookups = model_groups if isinstance(model_groups, ModelLookups) else ModelLookups.from_groups(model_groups)
+        # group collection -> names of its resource collections
+        self._resource_collections: Mapping[str, FrozenSet[str]] = lookups.resource_collection_sets
+        self._merged: Optional[Dict[str, Any]] = None
+
+    def merge(self) -> Optional[Dict[str, Any]]:
+        """Return the merged document; the layers are not modified.
+
+        A single layer is returned as is.
+        """
+        if self._merged is None and self.layers:
+            merged = self.layers[0][1]
+            # Containers created by this merge, by id; they are kept alive so
+            # that ids are not reused by documents of later layers
+            owned: Dict[int, Dict[str, Any]] = {}
+            for _, overlay in self.layers[1:]:
+                merged = self._merge_layer(merged, overlay, owned)
+            self._merged = merged
+        return self._merged
+
+    def _merge_layer(self, merged: Dict[str, Any], overlay: Dict[str, Any],
+                     owned: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        merged = self._own(merged, owned)
+        for key, value in overlay.items():
+            collection = merged.get(key)
+            if key in self._resource_collections and isinstance(value, dict) and isinstance(collection, dict):
+                # Merge the group instances of an xRegistry collection by ID
+                collection = merged[key] = self._own(collection, owned)
+                resource_collection_names = self._resource_collections[key]
+                for group_id, group_data in value.items():
+                    group = collection.get(group_id)
+                    if group_id in collection and isinstance(group_data, dict) and isinstance(group, dict):
+                        # The group exists in both - merge the group contents
+                        group = collection[group_id] = self._own(group, owned)
+                        for group_key, group_value in group_data.items():
+                            resources = group.get(group_key)
+                            if (group_key in resource_collection_names and isinstance(group_value, dict)
+                                    and isinstance(resources, dict)):
+                                # Merge resources by ID within the collection
+                                resources = group[group_key] = self._own(resources, owned)
+                                resources.update(group_value)
+                            else:
+                                # Not a resource collection - replace completely
+                                group[group_key] = group_value
+                    else:
+                        # Group doesn't exist in the stack below or types don't match - replace completely
+                        collection[group_id] = group_data
+            else:
+                # Not a collection or types don't match - replace completely
+                merged[key] = value
+        return merged
+
+    @staticmethod
+    def _own(container: Dict[str, Any], owned: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a container this merge may modify: the container itself if the merge created it, else a copy."""
+        if owned.get(id(container)) is container:
+            return container
+        copy = dict(container)
+        owned[id(copy)] = copy
+        return copy
+
+    def origins(self) -> Dict[str, str]:
+        """Return the URI of the layer each resource of the merged document comes from, by XID.
+
+        Resources are matched to layers by identity, so the report describes
+        the merged document as returned by :meth:`merge`, before resolution
+        replaced any resources.
+        """
+        merged = self.merge()
+        result: Dict[str, str] = {}
+        if not isinstance(merged, dict):
+            return result
+        for group_type, resource_collection_names in self._resource_collections.items():
+            groups = merged.get(group_type)
+            if not isinstance(groups, dict):
+                continue
+            for group_id, group in groups.items():
+                if not isinstance(group, dict):
+                    continue
+                for collection_name in resource_collection_names:
+                    resources = group.get(collection_name)
+                    if not isinstance(resources, dict):
+                        continue
+                    path = (group_type, group_id, collection_name)
+                    for resource_id, resource in resources.items():
+                        uri = self._layer_of(path + (resource_id,), resource)
+                        if uri is not None:
+                            result[f"/{'/'.join(path)}/{resource_id}"] = uri
+        return result
+
+    def _layer_of(self, path: Tuple[str, ...], node: Any) -> Optional[str]:
+        """Return the URI of the topmost layer holding the node at the path."""
+        for uri, layer in reversed(self.layers):
+            current: Any = layer
+            for segment in path:
+                current = current.get(segment) if isinstance(current, dict) else None
+            if current is node:
+                return uri
+        return None
+
+    def describe_origins(self) -> List[str]:
+        """Return one ``<xid> <- <layer URI>`` line per resource."""
+        return [f"{xid} <- {uri}" for xid, uri in self.origins().items()]
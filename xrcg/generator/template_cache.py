@@ -0,0 +1,198 @@
+"""
+template_cache.py – persistent bytecode cache for the Jinja templates.
+
+Every ``xrcg generate`` run lexes, parses and compiles each template it
+touches, including the large ``_common/*.jinja.include`` macro libraries.
+:class:`TemplateBytecodeCache` keeps the compiled templates between runs.
+
+Entries live below ``<config dir>/cache/templates/<tag>``, where the tag
+names the xrcg, Python and Jinja versions, so an upgrade starts with a new
+cache. Built-in templates are keyed by their path below ``xrcg/templates``,
+templates from ``--templates`` directories by their absolute path. Each entry
+also carries a checksum of the template source, and Jinja recompiles a
+template whose source no longer matches.
+
+Package builds can ship compiled built-in templates: ``python
+tools/precompile_templates.py`` compiles them with :func:`precompile` into
+``xrcg/_template_bytecode/<Python and Jinja version>``, which the cache reads
+when the user cache has no entry yet. They are only used with the Python and
+Jinja versions they were compiled with.
+
+The command line enables the cache unless ``--no-cache`` is given; without a
+cache set with :func:`set_template_bytecode_cache`, templates are compiled
+in every run.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import jinja2
+from jinja2.bccache import Bucket, BytecodeCache
+
+from xrcg.common.config import config_manager
+from xrcg.generator.jinja_extensions import JinjaExtensions
+
+
+logger = logging.getLogger(__name__)
+
+#: Root of the built-in template tree
+TEMPLATES_ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), "..", "templates"))
+
+#: Root of the compiled built-in templates shipped with the package
+PRECOMPILED_ROOT = Path(__file__).resolve().parent.parent / "_template_bytecode"
+
+
+def _xrcg_version() -> str:
+    try:
+        from .._version import __version__
+        return __version__
+    except ImportError:
+        return "unknown"
+
+
+def runtime_tag() -> str:
+    """Return the name of the precompiled template directory for this Python and Jinja version."""
+    return f"py{sys.version_info[0]}{sys.version_info[1]}-jinja-{jinja2.__version__}"
+
+
+def cache_tag() -> str:
+    """Return the name of the cache directory for this xrcg, Python and Jinja version."""
+    return f"xrcg-{_xrcg_version()}-{runtime_tag()}"
+
+
+def template_environment(template_dirs: Sequence[str],
+                         bytecode_cache: Optional[BytecodeCache] = None) -> jinja2.Environment:
+    """Return an environment loading templates from the directories, with the xrcg extensions.
+
+    Compiled templates depend on the environment's settings and extensions,
+    so everything that renders or precompiles templates creates its
+    environment here. Filters and globals are added by the caller.
+    """
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(list(template_dirs), followlinks=True),
+        extensions=[JinjaExtensions.ExitExtension, JinjaExtensions.TimeExtension, JinjaExtensions.ErrorExtension],
+        bytecode_cache=bytecode_cache)
+
+
+class TemplateBytecodeCache(BytecodeCache):
+    """Compiled templates on disk, with a read-only fallback to the precompiled templates."""
+
+    def __init__(self, directory: Optional[Path] = None, precompiled_directory: Optional[Path] = None) -> None:
+        """
+        Args:
+            directory: Directory the compiled templates are read from and written to.
+                Defaults to ``<config dir>/cache/templates/<tag>``.
+            precompiled_directory: Directory read when ``directory`` has no entry.
+                Defaults to ``xrcg/_template_bytecode/<Python and Jinja version>``.
+        """
+        self.directory = Path(directory) if directory else config_manager.cache_dir / "templates" / cache_tag()
+        self.precompiled_directory = (Path(precompiled_directory) if precompiled_directory
+                                      else PRECOMPILED_ROOT / runtime_tag())
+
+    def get_cache_key(self, name: str, filename: Optional[str] = None) -> str:
+        """Key built-in templates by their path in the template tree, others by their absolute path."""
+        if filename is not None:
+            path = os.path.realpath(filename)
+            if path.startswith(TEMPLATES_ROOT + os.sep):
+                return super().get_cache_key("xrcg:" + os.path.relpath(path, TEMPLATES_ROOT).replace(os.sep, "/"))
+            return super().get_cache_key(name, path)
+        return super().get_cache_key(name)
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        for directory in (self.directory, self.precompiled_directory):
+            try:
+                with open(directory / f"{bucket.key}.cache", "rb") as f:
+                    bucket.load_bytecode(f)
+            except OSError:
+                continue
+            if bucket.code is not None:
+                return
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        # A cache that cannot be written must not fail the run
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self.directory / f".{bucket.key}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    bucket.write_bytecode(f)
+                os.replace(tmp, self.directory / f"{bucket.key}.cache")
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        except OSError as e:
+            logger.warning(f"Failed to write template cache entry {bucket.key}: {e}")
+
+    def clear(self) -> None:
+        """Remove all compiled templates of this cache directory."""
+        if self.directory.exists():
+            for file in self.directory.iterdir():
+                file.unlink()
+
+
+def template_roots(templates_root: str = TEMPLATES_ROOT) -> List[List[str]]:
+    """Return the template directory lists the renderer uses for the built-in templates.
+
+    Code templates of a style are loaded together with the ``_common`` includes
+    of their language; schema templates from ``_schemas``.
+    """
+    roots: List[List[str]] = []
+    for language in sorted(os.listdir(templates_root)):
+        language_dir = os.path.join(templates_root, language)
+        if not os.path.isdir(language_dir):
+            continue
+        common_dir = os.path.join(language_dir, "_common")
+        for style in sorted(os.listdir(language_dir)):
+            style_dir = os.path.join(language_dir, style)
+            if os.path.isdir(style_dir) and not style.startswith("_"):
+                roots.append([style_dir, common_dir])
+        schemas_dir = os.path.join(language_dir, "_schemas")
+        if os.path.isdir(schemas_dir):
+            roots.append([schemas_dir])
+    return roots
+
+
+def precompile(environment_factory: Callable[[List[str]], jinja2.Environment],
+               templates_root: str = TEMPLATES_ROOT) -> int:
+    """Compile every built-in template and return the number of template files compiled.
+
+    ``environment_factory`` returns the environment for a list of template
+    directories; the compiled templates go to its bytecode cache. It must
+    register the same filters as the renderer, which the compiler checks.
+    """
+    compiled = set()
+    for template_dirs in template_roots(templates_root):
+        env = environment_factory([d for d in template_dirs if os.path.isdir(d)])
+        for name in env.list_templates(filter_func=lambda name: name.endswith((".jinja", ".jinja.include"))):
+            try:
+                template = env.get_template(name)
+            except jinja2.TemplateError as err:
+                logger.warning(f"Not precompiling {name}: {err}")
+                continue
+            compiled.add(template.filename)
+    return len(compiled)
+
+
+_default_cache: Optional[TemplateBytecodeCache] = None
+_default_lock = threading.Lock()
+
+
+def get_template_bytecode_cache() -> Optional[TemplateBytecodeCache]:
+    """Return the process-wide template bytecode cache, or None if templates are not cached."""
+    with _default_lock:
+        return _default_cache
+
+
+def set_template_bytecode_cache(cache: Optional[TemplateBytecodeCache]) -> Optional[TemplateBytecodeCache]:
+    """Replace the process-wide template bytecode cache and return the previous one."""
+    global _default_cache
+    with _default_lock:
+        previous = _default_cache
+        _default_cache = cache
+        return previous
@@ -4,14 +4,17 @@
 
 from ast import main
 import glob
+import importlib.metadata
 import json
 import os
 import re
 import sys
 import tempfile
+import threading
 import uuid
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, List, Optional, Union
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union
 import toml
 
 import avrotize
@@ -22,11 +25,17 @@ import urllib
 import urllib.parse
 
 from xrcg.cli import logger
+from xrcg.common import json_codec
 from xrcg.generator.generator_context import GeneratorContext
-from xrcg.generator.jinja_extensions import JinjaExtensions, TemplateError
+from xrcg.generator.jinja_extensions import TemplateError
 from xrcg.generator.jinja_filters import JinjaFilters
+from xrcg.generator.output_writer import OutputSnapshot, OutputStats, remove_output, write_if_changed
+from xrcg.generator.parallel_render import RenderBatch, RenderEffects, RenderPool, RenderUnit, collect_effects
+from xrcg.generator.render_manifest import normalize
 from xrcg.generator.schema_utils import SchemaUtils
+from xrcg.generator.template_cache import get_template_bytecode_cache, template_environment
 from xrcg.generator.url_utils import URLUtils
+from xrcg.generator.xregistry_index import XRegistryIndex
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
 
@@ -45,10 +54,18 @@ string_resolver_filters = {
 class TemplateRenderer:
     """Renderer for templates."""
 
+    #: Jinja environments of this process, by template directories and bytecode cache
+    _environments: Dict[Tuple[Any, ...], jinja2.Environment] = {}
+    _environments_lock = threading.Lock()
+
     def __init__(self, ctx: GeneratorContext, project_name: str, language: str, style: str, output_dir: str,
                  xreg_file_arg: str, headers: Dict[str, str], template_dirs: List[str], template_args: Dict[str, Any],
-                 suppress_code_output: bool, suppress_schema_output: bool) -> None:
+                 suppress_code_output: bool, suppress_schema_output: bool,
+                 loaded_document: Optional[Tuple[str, JsonNode]] = None) -> None:
         self.ctx = ctx
+        # Optional (definitions_file, document) pair already loaded and filtered for
+        # xreg_file_arg; generate() renders it instead of loading the definitions again
+        self.loaded_document = loaded_document
         self.project_name = project_name
         self.language = language
         self.style = style
@@ -69,63 +86,79 @@ class TemplateRenderer:
 
         # Add resource handling for the refactoring
         self.handled_resources: set[str] = set()
+        # Worker processes rendering the code templates of the current document with --jobs
+        self._render_pool: Optional[RenderPool] = None
 
         self.ctx.uses_avro = False
         self.ctx.uses_protobuf = False
         logger.debug("Initialized TemplateRenderer")
 
+    def _base_uri(self) -> str:
+        """Return the base URI for the definitions argument.
+        
+        For HTTP URLs this is the registry path in front of the first ``...groups``
+        segment; for stacked files the first file is used.
+        """
+        # Check if this is a stacked file list (marked with | separator)
+        if "|" in self.xreg_file_arg and not self.xreg_file_arg.startswith("http"):
+            # Use the first file for base_uri
+            definitions_file = self.xreg_file_arg.split("|")[0]
+        else:
+            definitions_file = self.xreg_file_arg
+        
+        if definitions_file.startswith("http"):
+            parsed_uri = urllib.parse.urlparse(definitions_file)
+            path_segments = parsed_uri.path.split('/')
+            groups_index = next((i for i, segment in enumerate(path_segments) if segment.endswith("groups")), None)
+            if groups_index is not None:
+                return urllib.parse.urlunparse(parsed_uri._replace(path='/'.join(path_segments[:groups_index])))
+        return definitions_file
+
     def generate(self) -> None:
         """Generate code and schemas from templates."""
 
-        self.ctx.base_uri = self.xreg_file_arg
+        self.ctx.base_uri = self._base_uri()
         
-        # Check if this is a stacked file list (marked with | separator)
-        if "|" in self.xreg_file_arg and not self.xreg_file_arg.startswith("http"):
+        if self.loaded_document is not None:
+            # The caller already loaded, resolved and validated the definitions
+            xreg_file, xregistry_document = self.loaded_document
+        elif "|" in self.xreg_file_arg and not self.xreg_file_arg.startswith("http"):
             # Multiple files to stack
-            definitions_files = self.xreg_file_arg.split("|")
-            # Use the first file for base_uri
-            if definitions_files[0].startswith("http"):
-                parsed_uri = urllib.parse.urlparse(definitions_files[0])
-                path_segments = parsed_uri.path.split('/')
-                groups_index = next((i for i, segment in enumerate(path_segments) if segment.endswith("groups")), None)
-                if groups_index is not None:
-                    self.ctx.base_uri = urllib.parse.urlunparse(parsed_uri._replace(path='/'.join(path_segments[:groups_index])))
-                else:
-                    self.ctx.base_uri = definitions_files[0]
-            else:
-                self.ctx.base_uri = definitions_files[0]
-            
             xreg_file, xregistry_document = self.ctx.loader.load_stacked(
-                definitions_files, self.headers, self.style == "schema",
+                self.xreg_file_arg.split("|"), self.headers, self.style == "schema",
                 messagegroup_filter=self.ctx.messagegroup_filter,
                 endpoint_filter=self.ctx.endpoint_filter)
-        else:
-            # Single file
-            if self.xreg_file_arg.startswith("http"):
-                parsed_uri = urllib.parse.urlparse(self.xreg_file_arg)
-                path_segments = parsed_uri.path.split('/')
-                groups_index = next((i for i, segment in enumerate(path_segments) if segment.endswith("groups")), None)
-                if groups_index is not None:
-                    self.ctx.base_uri = urllib.parse.urlunparse(parsed_uri._replace(path='/'.join(path_segments[:groups_index])))
-                else:
-                    self.ctx.base_uri = self.xreg_file_arg
-
+        elif self.xreg_file_arg.startswith("http"):
             # Use load_with_dependencies for HTTP URLs to automatically fetch related resources
-            if self.xreg_file_arg.startswith("http"):
-                xreg_file, xregistry_document = self.ctx.loader.load_with_dependencies(
-                    self.xreg_file_arg, self.headers, 
-                    messagegroup_filter=self.ctx.messagegroup_filter, 
-                    endpoint_filter=self.ctx.endpoint_filter)
-            else:
-                xreg_file, xregistry_document = self.ctx.loader.load(
-                    self.xreg_file_arg, self.headers, self.style == "schema", 
-                    messagegroup_filter=self.ctx.messagegroup_filter, 
-                    endpoint_filter=self.ctx.endpoint_filter)
+            xreg_file, xregistry_document = self.ctx.loader.load_with_dependencies(
+                self.xreg_file_arg, self.headers, 
+                messagegroup_filter=self.ctx.messagegroup_filter, 
+                endpoint_filter=self.ctx.endpoint_filter)
+        else:
+            xreg_file, xregistry_document = self.ctx.loader.load(
+                self.xreg_file_arg, self.headers, self.style == "schema", 
+                messagegroup_filter=self.ctx.messagegroup_filter, 
+                endpoint_filter=self.ctx.endpoint_filter)
         
         if not xreg_file or not xregistry_document:
             raise RuntimeError(
                 f"Definitions file not found or invalid {self.xreg_file_arg}")
 
+        # Reference lookups by the processors and template helpers share one
+        # index of the document while it is rendered
+        XRegistryIndex.for_document(xregistry_document)
+        if self.ctx.jobs > 1:
+            self._render_pool = RenderPool(self.ctx.jobs, self.ctx, xregistry_document)
+        try:
+            self._render_document(xregistry_document)
+        finally:
+            if self._render_pool is not None:
+                self._render_pool.close()
+                self._render_pool = None
+            XRegistryIndex.release(xregistry_document)
+
+    def _render_document(self, xregistry_document: JsonNode) -> None:
+        """Render the code and schema templates for a loaded document."""
         pt = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
         code_template_dir = os.path.join(
             pt, "templates", self.language, self.style)
@@ -188,10 +221,6 @@ class TemplateRenderer:
         self.render_code_templates(self.project_name, self.main_project_name, self.data_project_name, self.style, project_data_dir, xregistry_document,
                                    schema_template_dirs, schema_env, False, self.template_args, self.suppress_schema_output)
         
-        # Add filter to jinja environments for marking resources as handled
-        code_env.filters['mark_handled'] = self.mark_resource_handled
-        schema_env.filters['mark_handled'] = self.mark_resource_handled
-        
         # Process unhandled schemas using the composed document
         avrotize_queue = []
         unhandled_schemas = self.get_unhandled_schema_references(xregistry_document)
@@ -226,99 +255,7 @@ class TemplateRenderer:
                 )        
         # Process avrotize queue using the refactored approach
         if len(avrotize_queue) > 0:
-            # Separate JSON Structure schemas from Avro/other schemas
-            jstruct_schemas = [s for s in avrotize_queue if s.get("format_short") == "jstruct"]
-            avro_schemas = [s for s in avrotize_queue if s.get("format_short") != "jstruct"]
-            
-            avro_enabled = self.template_args.get("avro-encoding", "false") == "true" or any("avro" in a["format_short"] for a in avro_schemas)
-            json_enabled = self.template_args.get("json-encoding", "true") == "true"
-            
-            # Helper to get unique key for a schema
-            def get_schema_key(schema_content: JsonNode) -> str:
-                if isinstance(schema_content, dict):
-                    # Use $id, name, or hash of content
-                    return schema_content.get("$id") or schema_content.get("name") or str(hash(json.dumps(schema_content, sort_keys=True)))
-                return str(hash(str(schema_content)))
-            
-            # Process JSON Structure schemas with dedicated converters
-            if jstruct_schemas:
-                jstruct_merged = []
-                seen_keys: set[str] = set()
-                for schema_info in jstruct_schemas:
-                    content = schema_info["content"]
-                    contents = content if isinstance(content, list) else [content]
-                    for c in contents:
-                        key = get_schema_key(c)
-                        if key not in seen_keys:
-                            seen_keys.add(key)
-                            jstruct_merged.append(c)
-                
-                if len(jstruct_merged) == 1:
-                    jstruct_merged = jstruct_merged[0]
-                
-                self._process_jstruct_schemas(jstruct_merged, project_data_dir, json_enabled, avro_enabled)
-            
-            # Process Avro/converted schemas
-            if avro_schemas:
-                merged_schema = []
-                seen_keys: set[str] = set()
-                for schema_info in avro_schemas:
-                    content = schema_info["content"]
-                    contents = content if isinstance(content, list) else [content]
-                    for c in contents:
-                        if not isinstance(c, dict):
-                            logger.debug("Skipping non-object top-level Avro schema entry from %s", schema_info.get("reference"))
-                            continue
-                        key = get_schema_key(c)
-                        if key not in seen_keys:
-                            seen_keys.add(key)
-                            merged_schema.append(c)
-                
-                if len(merged_schema) == 1:
-                    merged_schema = merged_schema[0]
-
-                if self.language == "py":
-                    avrotize.convert_avro_schema_to_python(
-                        merged_schema, project_data_dir, package_name=self.data_project_name,
-                        dataclasses_json_annotation=json_enabled, avro_annotation=avro_enabled
-                    )
-                elif self.language == "cs":
-                    avrotize.convert_avro_schema_to_csharp(
-                        merged_schema, project_data_dir, base_namespace=JinjaFilters.pascal(self.data_project_name),
-                        pascal_properties=True, system_text_json_annotation=json_enabled, avro_annotation=avro_enabled,
-                        target_framework=self._get_target_framework()
-                    )
-                elif self.language == "java":
-                    # Java: use lowercase package name to match Maven artifact conventions
-                    java_package_name = self.data_project_name.lower().replace('-', '_')
-                    avrotize.convert_avro_schema_to_java(
-                        merged_schema, project_data_dir, package_name=java_package_name,
-                        jackson_annotation=json_enabled, avro_annotation=avro_enabled
-                    )
-                elif self.language == "js":
-                    avrotize.convert_avro_schema_to_javascript(
-                        merged_schema, project_data_dir, package_name=self.data_project_name, avro_annotation=avro_enabled
-                    )
-                elif self.language == "ts":
-                    avrotize.convert_avro_schema_to_typescript(
-                        merged_schema, project_data_dir, package_name=self.data_project_name,
-                        avro_annotation=avro_enabled, typedjson_annotation=json_enabled
-                    )
-                elif self.language == "go":
-                    avrotize.convert_avro_schema_to_go(
-                        merged_schema, project_data_dir, package_name=self.data_project_name,
-                        avro_annotation=avro_enabled, json_annotation=json_enabled
-                    )
-                elif self.language == "rust":
-                    # avrotize's Rust Avro-annotation emitter currently produces
-                    # non-compiling code (lazy_static SCHEMA in impl blocks), so
-                    # Rust data crates are generated serde-only. Tracked upstream
-                    # at clemensv/avrotize#406.
-                    avrotize.convert_avro_schema_to_rust(
-                        merged_schema, project_data_dir,
-                        package_name=JinjaFilters.rust_package(self.data_project_name),
-                        avro_annotation=False, serde_annotation=json_enabled
-                    )
+            self._generate_data_classes(avrotize_queue, project_data_dir)
         self.render_code_templates(
             self.project_name, self.main_project_name, self.data_project_name, self.style, project_dir, xregistry_document,
             code_template_dirs, code_env, True, self.template_args, self.suppress_code_output
@@ -334,6 +271,129 @@ class TemplateRenderer:
                 self.template_args, self.suppress_schema_output
             )
 
+    def _generate_data_classes(self, avrotize_queue: List[Dict[str, Any]], project_data_dir: str) -> None:
+        """Generate the data classes of the queued schemas with Avrotize, unless the manifest has them unchanged."""
+        manifest = self.ctx.manifest
+        stats = OutputStats()
+        if manifest is not None:
+            unit_key = manifest.key("avrotize", project_data_dir)
+            inputs = normalize({
+                "schemas": [[schema_info["format_short"], schema_info["content"]] for schema_info in avrotize_queue],
+                "args": {
+                    "template_args": self.template_args,
+                    "language": self.language,
+                    "data_project_name": self.data_project_name,
+                    "avrotize": importlib.metadata.version("avrotize"),
+                },
+            })
+            effects = manifest.reuse(unit_key, inputs)
+            if effects is not None:
+                effects.apply(self.ctx)
+                return
+            # Avrotize only writes some files, such as project files, if they are missing
+            for path in manifest.outputs(unit_key):
+                if os.path.exists(path):
+                    stats.record(path, "unchanged")
+        # Avrotize rewrites every file; keep the times of those it did not change
+        snapshot = OutputSnapshot(project_data_dir)
+        # Separate JSON Structure schemas from Avro/other schemas
+        jstruct_schemas = [s for s in avrotize_queue if s.get("format_short") == "jstruct"]
+        avro_schemas = [s for s in avrotize_queue if s.get("format_short") != "jstruct"]
+        
+        avro_enabled = self.template_args.get("avro-encoding", "false") == "true" or any("avro" in a["format_short"] for a in avro_schemas)
+        json_enabled = self.template_args.get("json-encoding", "true") == "true"
+        
+        # Helper to get unique key for a schema
+        def get_schema_key(schema_content: JsonNode) -> str:
+            if isinstance(schema_content, dict):
+                # Use $id, name, or hash of content
+                return schema_content.get("$id") or schema_content.get("name") or json_codec.canonical_hash(schema_content)
+            return json_codec.canonical_hash(schema_content)
+        
+        # Process JSON Structure schemas with dedicated converters
+        if jstruct_schemas:
+            jstruct_merged = []
+            seen_keys: set[str] = set()
+            for schema_info in jstruct_schemas:
+                content = schema_info["content"]
+                contents = content if isinstance(content, list) else [content]
+                for c in contents:
+                    key = get_schema_key(c)
+                    if key not in seen_keys:
+                        seen_keys.add(key)
+                        jstruct_merged.append(c)
+            
+            if len(jstruct_merged) == 1:
+                jstruct_merged = jstruct_merged[0]
+            
+            self._process_jstruct_schemas(jstruct_merged, project_data_dir, json_enabled, avro_enabled)
+        
+        # Process Avro/converted schemas
+        if avro_schemas:
+            merged_schema = []
+            seen_keys: set[str] = set()
+            for schema_info in avro_schemas:
+                content = schema_info["content"]
+                contents = content if isinstance(content, list) else [content]
+                for c in contents:
+                    if not isinstance(c, dict):
+                        logger.debug("Skipping non-object top-level Avro schema entry from %s", schema_info.get("reference"))
+                        continue
+                    key = get_schema_key(c)
+                    if key not in seen_keys:
+                        seen_keys.add(key)
+                        merged_schema.append(c)
+            
+            if len(merged_schema) == 1:
+                merged_schema = merged_schema[0]
+
+            if self.language == "py":
+                avrotize.convert_avro_schema_to_python(
+                    merged_schema, project_data_dir, package_name=self.data_project_name,
+                    dataclasses_json_annotation=json_enabled, avro_annotation=avro_enabled
+                )
+            elif self.language == "cs":
+                avrotize.convert_avro_schema_to_csharp(
+                    merged_schema, project_data_dir, base_namespace=JinjaFilters.pascal(self.data_project_name),
+                    pascal_properties=True, system_text_json_annotation=json_enabled, avro_annotation=avro_enabled,
+                    target_framework=self._get_target_framework()
+                )
+            elif self.language == "java":
+                # Java: use lowercase package name to match Maven artifact conventions
+                java_package_name = self.data_project_name.lower().replace('-', '_')
+                avrotize.convert_avro_schema_to_java(
+                    merged_schema, project_data_dir, package_name=java_package_name,
+                    jackson_annotation=json_enabled, avro_annotation=avro_enabled
+                )
+            elif self.language == "js":
+                avrotize.convert_avro_schema_to_javascript(
+                    merged_schema, project_data_dir, package_name=self.data_project_name, avro_annotation=avro_enabled
+                )
+            elif self.language == "ts":
+                avrotize.convert_avro_schema_to_typescript(
+                    merged_schema, project_data_dir, package_name=self.data_project_name,
+                    avro_annotation=avro_enabled, typedjson_annotation=json_enabled
+                )
+            elif self.language == "go":
+                avrotize.convert_avro_schema_to_go(
+                    merged_schema, project_data_dir, package_name=self.data_project_name,
+                    avro_annotation=avro_enabled, json_annotation=json_enabled
+                )
+            elif self.language == "rust":
+                # avrotize's Rust Avro-annotation emitter currently produces
+                # non-compiling code (lazy_static SCHEMA in impl blocks), so
+                # Rust data crates are generated serde-only. Tracked upstream
+                # at clemensv/avrotize#406.
+                avrotize.convert_avro_schema_to_rust(
+                    merged_schema, project_data_dir,
+                    package_name=JinjaFilters.rust_package(self.data_project_name),
+                    avro_annotation=False, serde_annotation=json_enabled
+                )
+        snapshot.restore_unchanged(stats)
+        self.ctx.output_stats.add(stats)
+        if manifest is not None:
+            manifest.record(unit_key, inputs, RenderEffects({}, {}, set(), None, stats))
+
     def _process_jstruct_schemas(self, jstruct_schema: JsonNode, project_data_dir: str, json_enabled: bool, avro_enabled: bool = False) -> None:
         """Process JSON Structure schemas using dedicated Avrotize converters.
         
@@ -409,7 +469,7 @@ class TemplateRenderer:
                     proto_file.close()
                     avrotize.convert_proto_to_avro(
                         proto_file.name, avro_file.name)
-                    schema_root = json.loads(avro_file.read())
+                    schema_root = json_codec.loads(avro_file.read())
                 finally:
                     avro_file.close()
                     os.unlink(avro_file.name)
@@ -421,7 +481,7 @@ class TemplateRenderer:
             try:
                 avrotize.convert_proto_to_avro(
                     schema_reference, avro_file.name)
-                schema_root = json.loads(avro_file.read())
+                schema_root = json_codec.loads(avro_file.read())
             finally:
                 avro_file.close()
                 os.unlink(avro_file.name)
@@ -437,12 +497,12 @@ class TemplateRenderer:
                 avro_file = tempfile.NamedTemporaryFile(
                     delete=False, suffix=".avsc")
                 try:
-                    jsons_file.write(json.dumps(schema_root).encode('utf-8'))
+                    jsons_file.write(json_codec.dumps(schema_root).encode('utf-8'))
                     jsons_file.close()
                     avrotize.convert_jsons_to_avro(
                         jsons_file.name, avro_file.name, namespace=namespace_name, root_class_name=class_name
                     )
-                    schema_root = json.loads(avro_file.read())
+                    schema_root = json_codec.loads(avro_file.read())
                 finally:
                     avro_file.close()
                     os.unlink(avro_file.name)
@@ -455,7 +515,7 @@ class TemplateRenderer:
                 avrotize.convert_jsons_to_avro(
                     schema_reference, avro_file.name, namespace=namespace_name
                 )
-                schema_root = json.loads(avro_file.read())
+                schema_root = json_codec.loads(avro_file.read())
             finally:
                 avro_file.close()
                 os.unlink(avro_file.name)
@@ -492,6 +552,8 @@ class TemplateRenderer:
         if not isinstance(xregistry_document, dict):
             raise RuntimeError("Document root is not a dictionary")
         class_name = None
+        # (template, class name, message group or None, scope, file dir, file name) in rendering order
+        units: List[Tuple[Template, str, Optional[str], JsonNode, str, str]] = []
         for template_dir in code_template_dirs:
             for root, _, files in os.walk(template_dir):
                 relpath = os.path.relpath(
@@ -530,27 +592,12 @@ class TemplateRenderer:
                     file_name = file_name_base
                     if file_name.startswith("{class"):
                         if isinstance(scope, dict) and "messagegroups" in scope:
-                            if "endpoints" in xregistry_document:
-                                endpoints = xregistry_document["endpoints"]
-                            else:
-                                endpoints = None
-                            if "schemagroups" in xregistry_document:
-                                schemagroups = xregistry_document["schemagroups"]
-                            else:
-                                schemagroups = None
-
                             group_dict = scope["messagegroups"]
                             if not isinstance(group_dict, dict):
                                 raise RuntimeError(
                                     "Messagegroups is not a dictionary")
-                            for id_, definitiongroup in group_dict.items():
-                                subscope: JsonNode = {
-                                    "endpoints": endpoints,
-                                    "schemagroups": schemagroups,
-                                    "messagegroups": {
-                                        f"{id_}": definitiongroup
-                                    }
-                                }
+                            for id_ in group_dict:
+                                subscope = self.class_scope(xregistry_document, id_)
                                 class_name = id_
                                 scope_parts = id_.split(".")
                                 package_class_name = scope_parts[-1]
@@ -576,9 +623,7 @@ class TemplateRenderer:
                                         class_name = f'{package_name}.{file_name}'
                                 if not class_name:
                                     raise RuntimeError("Class name not found")
-                                self.render_template(
-                                    code_project_name, main_project_name, data_project_name,
-                                    class_name, subscope, file_dir, file_name, template, template_args, suppress_output)
+                                units.append((template, class_name, id_, subscope, file_dir, file_name))
                         continue
 
                     has_rootdir = file_name_base.startswith("{rootdir")
@@ -598,9 +643,73 @@ class TemplateRenderer:
                     else:
                         file_dir = file_dir_base if not has_rootdir else self.output_dir
 
-                    self.render_template(code_project_name, main_project_name, data_project_name,
-                                         class_name, scope, file_dir,
-                                         file_name, template, template_args, suppress_output)
+                    units.append((template, class_name, None, scope, file_dir, file_name))
+
+        manifest = self.ctx.manifest
+        # Context changes of the units, from the manifest for unchanged units
+        effects: List[Optional[RenderEffects]] = [None] * len(units)
+        keys: List[str] = []
+        inputs: List[Dict[str, Any]] = []
+        if manifest is not None:
+            for i, (template, class_name, group_id, _, file_dir, file_name) in enumerate(units):
+                keys.append(manifest.key(template.name, os.path.join(os.getcwd(), file_dir, file_name)))
+                inputs.append(normalize({
+                    "templates": manifest.template_inputs(env, template.name),
+                    "args": {
+                        "template_args": template_args,
+                        "template_dirs": env.loader.searchpath,
+                        "project_name": code_project_name,
+                        "main_project_name": main_project_name,
+                        "data_project_name": data_project_name,
+                        "class_name": class_name,
+                        "suppress_output": suppress_output,
+                        "uses_avro": self.ctx.uses_avro,
+                        "uses_protobuf": self.ctx.uses_protobuf,
+                        "base_uri": self.ctx.base_uri,
+                        "stacks_dir": self.ctx.stacks.current_dir,
+                    },
+                    "document": manifest.document_inputs(xregistry_document, group_id),
+                }))
+                effects[i] = manifest.reuse(keys[i], inputs[i])
+        pending = [i for i, unit_effects in enumerate(effects) if unit_effects is None]
+
+        if self._render_pool is not None and self._render_pool.document is xregistry_document and len(pending) > 1:
+            batch = RenderBatch(tuple(env.loader.searchpath), self.ctx.stacks.current_dir,
+                                code_project_name, main_project_name, data_project_name,
+                                template_args, suppress_output, self.ctx.uses_avro, self.ctx.uses_protobuf)
+            rendered = self._render_pool.render(batch, [RenderUnit(template.name, class_name, group_id, file_dir, file_name)
+                                                        for template, class_name, group_id, _, file_dir, file_name
+                                                        in (units[i] for i in pending)])
+        elif manifest is not None:
+            rendered = []
+            for template, class_name, _, scope, file_dir, file_name in (units[i] for i in pending):
+                rendered.append(collect_effects(self.ctx, partial(
+                    self.render_template, code_project_name, main_project_name, data_project_name,
+                    class_name, scope, file_dir, file_name, template, template_args, suppress_output),
+                    self.handled_resources))
+        else:
+            for template, class_name, _, scope, file_dir, file_name in units:
+                self.render_template(code_project_name, main_project_name, data_project_name,
+                                     class_name, scope, file_dir,
+                                     file_name, template, template_args, suppress_output)
+            return
+        for i, unit_effects in zip(pending, rendered):
+            effects[i] = unit_effects
+            if manifest is not None:
+                manifest.record(keys[i], inputs[i], unit_effects)
+        for unit_effects in effects:
+            unit_effects.apply(self.ctx, self.handled_resources)
+
+    @staticmethod
+    def class_scope(xregistry_document: Dict[str, JsonNode], group_id: str) -> Dict[str, JsonNode]:
+        """Return the scope a ``{class...}`` template is rendered with for one message group."""
+        return {
+            "endpoints": xregistry_document.get("endpoints"),
+            "schemagroups": xregistry_document.get("schemagroups"),
+            "messagegroups": {
+                f"{group_id}": xregistry_document["messagegroups"][group_id]
+            }
+        }
 
     def render_schema_templates(
             self, schema_type: Optional[str], schema_project_name: str, class_name: Optional[str], language: str,
@@ -719,8 +828,9 @@ class TemplateRenderer:
         try:
             output_path = os.path.join(os.getcwd(), file_dir, file_name)
 
-            if not suppress_output and not os.path.exists(os.path.dirname(output_path)):
-                os.makedirs(os.path.dirname(output_path))
+            if not suppress_output:
+                # exist_ok: with --jobs, other workers create the same directories
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
             try:
                 self.ctx.current_dir = os.path.dirname(output_path)
                 args = template_args.copy() if template_args is not None else {}
@@ -748,12 +858,11 @@ class TemplateRenderer:
                     traceback.print_exc()
                     raise
                 if not suppress_output:
-                    with open(output_path, "w", encoding='utf-8') as f:
-                        f.write(rendered)
+                    write_if_changed(output_path, rendered, self.ctx.output_stats)
             except TypeError as err:
                 if "Undefined found" in str(err):
-                    if not suppress_output and os.path.exists(output_path):
-                        os.remove(output_path)
+                    if not suppress_output:
+                        remove_output(output_path, self.ctx.output_stats)
                 else:
                     logger.error("%s: %s", template.name, err)
                     exit(1)
@@ -946,12 +1055,27 @@ class TemplateRenderer:
                 f"Dependency '{dependency_name}' not found in runtime version '{runtime_version}' for language '{language}'.")
 
     def setup_jinja_env(self, template_dirs: List[str]) -> jinja2.Environment:
-        """Create the Jinja environment and load extensions."""
-        logger.debug(
-            "Setting up Jinja environment with template dirs: %s", template_dirs)
-        loader = jinja2.FileSystemLoader(template_dirs, followlinks=True)
-        env = jinja2.Environment(loader=loader, extensions=[
-                                 JinjaExtensions.ExitExtension, JinjaExtensions.TimeExtension, JinjaExtensions.ErrorExtension])
+        """Return the Jinja environment for the template directories, bound to this renderer.
+
+        Environments are shared by all renderers of the process, so that each
+        template is loaded and compiled once per run; the filters and globals
+        that act on the renderer or its context are rebound on every call.
+        """
+        bytecode_cache = get_template_bytecode_cache()
+        key = (tuple(os.path.abspath(d) for d in template_dirs), bytecode_cache)
+        with TemplateRenderer._environments_lock:
+            env = TemplateRenderer._environments.get(key)
+            if env is None:
+                logger.debug(
+                    "Setting up Jinja environment with template dirs: %s", template_dirs)
+                env = TemplateRenderer._environments[key] = self._create_jinja_env(template_dirs, bytecode_cache)
+            self._bind_jinja_env(env)
+        return env
+
+    @staticmethod
+    def _create_jinja_env(template_dirs: List[str], bytecode_cache: Optional[jinja2.BytecodeCache]) -> jinja2.Environment:
+        """Create the Jinja environment and register the renderer-independent filters and globals."""
+        env = template_environment(template_dirs, bytecode_cache)
         env.filters['regex_search'] = JinjaFilters.regex_search
         env.filters['regex_replace'] = JinjaFilters.regex_replace
         env.filters['pascal'] = JinjaFilters.pascal
@@ -967,8 +1091,6 @@ class TemplateRenderer:
         env.filters['concat_namespace'] = JinjaFilters.concat_namespace
         env.filters['strip_dots'] = JinjaFilters.strip_dots
         env.filters['lstrip'] = JinjaFilters.lstrip
-        env.filters['schema_type'] = lambda schema_ref, project_name, root, schema_format: SchemaUtils.schema_type(
-            self.ctx, schema_ref, project_name, root, schema_format)
         env.filters['strip_invalid_identifier_characters'] = JinjaFilters.strip_invalid_identifier_characters
         env.filters['pad'] = JinjaFilters.pad
         env.filters['toyaml'] = JinjaFilters.to_yaml
@@ -979,19 +1101,25 @@ class TemplateRenderer:
         env.filters['rust_package'] = JinjaFilters.rust_package
         env.filters['exists'] = JinjaFilters.exists
         env.filters['existswithout'] = JinjaFilters.exists_without
-        env.filters['push'] = self.ctx.stacks.push
-        env.filters['pushfile'] = self.ctx.stacks.push_file
-        env.filters['save'] = self.ctx.stacks.save
-        env.globals['pop'] = self.ctx.stacks.pop
         env.globals['schema_object'] = SchemaUtils.schema_object
         env.globals['latest_dict_entry'] = SchemaUtils.latest_dict_entry
         env.globals['geturlhost'] = URLUtils.get_url_host
         env.globals['geturlpath'] = URLUtils.get_url_path
         env.globals['geturlport'] = URLUtils.get_url_port
         env.globals['geturlscheme'] = URLUtils.get_url_scheme
-        env.globals['dependency'] = self.dependency
+        env.globals['dependency'] = TemplateRenderer.dependency
         return env
 
+    def _bind_jinja_env(self, env: jinja2.Environment) -> None:
+        """Point the filters and globals that act on the renderer or its context at this renderer."""
+        env.filters['schema_type'] = lambda schema_ref, project_name, root, schema_format: SchemaUtils.schema_type(
+            self.ctx, schema_ref, project_name, root, schema_format)
+        env.filters['push'] = self.ctx.stacks.push
+        env.filters['pushfile'] = self.ctx.stacks.push_file
+        env.filters['save'] = self.ctx.stacks.save
+        env.globals['pop'] = self.ctx.stacks.pop
+        env.filters['mark_handled'] = self.mark_resource_handled
+
     def is_proto_doc(self, xregistry_document: JsonNode) -> bool:
         """Check if the document is a proto document."""
         return isinstance(xregistry_document, str) and re.search(r"syntax[\s]*=[\s]*\"proto3\"", xregistry_document) is not None
@@ -1011,9 +1139,10 @@ class TemplateRenderer:
             return f"{namespace}.{class_name}"
         return class_name
 
-    def collect_schema_references_from_document(self, document: JsonNode) -> set[str]:
-        """Collect all schema references from the composed document."""
-        schema_refs = set()
+    def collect_schema_references_from_document(self, document: JsonNode) -> List[str]:
+        """Collect all schema references from the composed document, in document order."""
+        # A dict keeps the order, so the data classes come out the same in every run
+        schema_refs: Dict[str, None] = {}
 
         def should_collect_inline_schema(current_path: str) -> bool:
             """Only collect direct inline schema bodies outside schemagroups.
@@ -1034,13 +1163,13 @@ class TemplateRenderer:
                     
                     # Look for schema reference properties
                     if key in ["dataschema", "schema", "schemaurl", "dataschemaurl", "dataschemauri"] and isinstance(value, str):
-                        schema_refs.add(value)
+                        schema_refs[value] = None
                     
                     # Look for inline schemas
                     elif key == "schema" and isinstance(value, (dict, str)):
                         if should_collect_inline_schema(current_path):
                             schema_pointer = f"#{path}/schema"
-                            schema_refs.add(schema_pointer)
+                            schema_refs[schema_pointer] = None
                         continue
                     
                     # Recursively scan nested objects
@@ -1050,12 +1179,12 @@ class TemplateRenderer:
                     scan_for_schemas(item, f"{path}[{i}]")
         
         scan_for_schemas(document)
-        return schema_refs
+        return list(schema_refs)
 
-    def get_unhandled_schema_references(self, document: JsonNode) -> set[str]:
-        """Get schema references that haven't been marked as handled."""
+    def get_unhandled_schema_references(self, document: JsonNode) -> List[str]:
+        """Get schema references that haven't been marked as handled, in document order."""
         all_schemas = self.collect_schema_references_from_document(document)
-        return all_schemas - self.handled_resources
+        return [ref for ref in all_schemas if ref not in self.handled_resources]
 
     def resolve_schema_reference_in_document(self, schema_ref: str, document: JsonNode) -> Optional[JsonNode]:
         """Resolve a schema reference in the composed document."""
@@ -1067,7 +1196,7 @@ class TemplateRenderer:
                 pointer = schema_ref[1:]  # Remove #
                 if not pointer.startswith('/'):
                     pointer = '/' + pointer  # Add leading / for JSON Pointer
-                result = jsonpointer.resolve_pointer(document, pointer)
+                result = XRegistryIndex.resolve_pointer_in(document, pointer)
                 return result  # type: ignore
             else:
                 # For external references, they should already be resolved in the composed document
@@ -0,0 +1,349 @@
+"""
+xregistry_index.py – lookup index over a loaded xRegistry document.
+
+References into a document come in three forms: XIDs
+(``/messagegroups/g/messages/m``), fragment pointers (``#/schemagroups/...``
+or the xRegistry short form ``#schemagroups/...``) and ``self`` URLs of
+resources that were fetched from a registry. :class:`XRegistryIndex` maps all
+of them to nodes with dictionary lookups instead of walking the document on
+every call.
+
+The index records every container down to version level together with its
+parent and key. Deeper pointers (into inline schemas, for example) are
+resolved from the deepest indexed ancestor. Lookups check the recorded parent
+chain against the live document, so an index stays correct while the
+document is mutated: a node that was replaced is found again by walking from
+its closest unchanged ancestor, and the ``self`` URL map is rebuilt the next
+time a URL cannot be found after the document changed.
+
+In the other direction, :meth:`XRegistryIndex.pointer_of` returns the JSON
+pointer of a node from a map of node ids to pointers that is built on first
+use.
+
+The template renderer registers the index of the document it renders with
+:meth:`XRegistryIndex.for_document`; the resource and schema processors and
+the schema helpers exposed to templates look it up through
+:meth:`XRegistryIndex.resolve_pointer_in`, and fall back to
+:func:`jsonpointer.resolve_pointer` for documents that have no index.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import jsonpointer
+
+JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
+Path = Tuple[str, ...]
+
+_ARRAY_INDEX = re.compile(r"0|[1-9][0-9]*")
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ("node", "parent", "key")
+
+    def __init__(self, node: JsonNode, parent: Optional[Path], key: Union[str, int, None]) -> None:
+        self.node = node
+        self.parent = parent
+        self.key = key
+
+
+class XRegistryIndex:
+    """XID, pointer and ``self`` URL lookups over one document."""
+
+    #: Containers are indexed down to group collection/group/resource collection/resource/"versions"/version
+    MAX_DEPTH = 6
+    #: Number of indexes kept for documents that are not registered (e.g. per-template scopes)
+    TRANSIENT_INDEXES = 8
+
+    _registry: Dict[int, 'XRegistryIndex'] = {}
+    _transient: 'OrderedDict[int, XRegistryIndex]' = OrderedDict()
+    _registry_lock = threading.Lock()
+
+    def __init__(self, document: JsonNode) -> None:
+        self.document = document
+        self._entries: Dict[Path, _Entry] = {}
+        self._urls: Dict[str, Path] = {}
+        self._pointers: Optional[Dict[int, str]] = None
+        self._stale = False
+        self._shape = 0
+        self._built = False
+
+    # Shared indexes
+
+    @classmethod
+    def for_document(cls, document: JsonNode) -> 'XRegistryIndex':
+        """Return the registered index of a document, building and registering it on first use."""
+        with cls._registry_lock:
+            index = cls._registry.get(id(document))
+            if index is None or index.document is not document:
+                index = cls(document)
+                cls._registry[id(document)] = index
+            return index
+
+    @classmethod
+    def registered(cls, document: JsonNode) -> Optional['XRegistryIndex']:
+        """Return the registered index of a document, or None."""
+        index = cls._registry.get(id(document))
+        return index if index is not None and index.document is document else None
+
+    @classmethod
+    def release(cls, document: JsonNode) -> None:
+        """Unregister the index of a document and drop the indexes of unregistered documents."""
+        with cls._registry_lock:
+            index = cls._registry.get(id(document))
+            if index is not None and index.document is document:
+                del cls._registry[id(document)]
+            cls._transient.clear()
+
+    @classmethod
+    def resolve_pointer_in(cls, document: JsonNode, pointer: str) -> JsonNode:
+        """Resolve a JSON pointer with the document's index if it has one.
+
+        Raises:
+            jsonpointer.JsonPointerException: if the pointer does not resolve.
+        """
+        index = cls.registered(document)
+        if index is None:
+            return jsonpointer.resolve_pointer(document, pointer)
+        return index.resolve_pointer(pointer)
+
+    @classmethod
+    def pointer_in(cls, document: JsonNode, node: JsonNode) -> Optional[str]:
+        """Return the JSON pointer of a node in a document, or None if it is not part of it.
+
+        Documents without a registered index get a transient one, so repeated
+        calls for the same scope (as made while rendering one template) share
+        the node map.
+        """
+        index = cls.registered(document)
+        if index is None:
+            with cls._registry_lock:
+                index = cls._transient.get(id(document))
+                if index is None or index.document is not document:
+                    index = cls(document)
+                    cls._transient[id(document)] = index
+                    while len(cls._transient) > cls.TRANSIENT_INDEXES:
+                        cls._transient.popitem(last=False)
+                else:
+                    cls._transient.move_to_end(id(document))
+        return index.pointer_of(node)
+
+    # Lookups
+
+    def resolve(self, ref: str) -> Optional[JsonNode]:
+        """Return the node an XID, ``#`` pointer or ``self`` URL refers to, or None."""
+        ref = ref.strip()
+        if ref.startswith("#"):
+            pointer = ref[1:]
+            if pointer and not pointer.startswith("/"):
+                pointer = "/" + pointer
+            try:
+                return self.resolve_pointer(pointer)
+            except jsonpointer.JsonPointerException:
+                return None
+        if ref.startswith("/"):
+            path = tuple(segment for segment in ref.split("/") if segment)
+            node = self._find(path)
+            return None if node is _MISSING else node
+        return self._resolve_url(ref)
+
+    def resolve_pointer(self, pointer: str) -> JsonNode:
+        """Resolve a JSON pointer like :func:`jsonpointer.resolve_pointer`.
+
+        Raises:
+            jsonpointer.JsonPointerException: if the pointer does not resolve.
+        """
+        if "~" not in pointer and (pointer == "" or pointer.startswith("/")):
+            node = self._find(tuple(pointer.split("/")[1:]))
+            if node is not _MISSING:
+                return node
+        # Escapes, invalid pointers and misses get the exact semantics and
+        # error messages of jsonpointer
+        return jsonpointer.resolve_pointer(self.document, pointer)
+
+    def parents(self, ref: str) -> Optional[List[JsonNode]]:
+        """Return the ancestors of the node an XID or ``#`` pointer refers to, root first, or None."""
+        ref = ref.strip()
+        if ref.startswith("#"):
+            pointer = ref[1:]
+            if pointer and not pointer.startswith("/"):
+                pointer = "/" + pointer
+            if "~" in pointer:
+                return None
+            path = tuple(pointer.split("/")[1:]) if pointer else ()
+        elif ref.startswith("/"):
+            path = tuple(segment for segment in ref.split("/") if segment)
+        else:
+            return None
+        chain = [self._find(path[:depth]) for depth in range(len(path) + 1)]
+        if any(node is _MISSING for node in chain):
+            return None
+        return chain[:-1]
+
+    def pointer_of(self, node: JsonNode) -> Optional[str]:
+        """Return the JSON pointer of a node, or None if it is not part of the document.
+
+        Nodes are matched by identity. A node that occurs more than once
+        (shared subtrees, interned strings) gets the pointer of its first
+        occurrence in document order. The map from nodes to pointers is built
+        on first use.
+        """
+        if self._pointers is not None:
+            pointer = self._verified_pointer(node)
+            if pointer is not None:
+                return pointer
+        # Unknown or moved node: the document changed since the map was built
+        self._pointers = self._build_pointers()
+        return self._verified_pointer(node)
+
+    def invalidate(self) -> None:
+        """Rebuild the index from the current state of the document."""
+        self._build()
+        self._pointers = None
+
+    # Internals
+
+    def _ensure_built(self) -> None:
+        if not self._built:
+            self._build()
+
+    def _build(self) -> None:
+        entries: Dict[Path, _Entry] = {(): _Entry(self.document, None, None)}
+        urls: Dict[str, Path] = {}
+        stack: List[Tuple[Path, JsonNode]] = [((), self.document)]
+        while stack:
+            path, node = stack.pop()
+            if isinstance(node, dict):
+                for attribute in ("self", "xid"):
+                    value = node.get(attribute)
+                    if isinstance(value, str) and value:
+                        urls.setdefault(value.rstrip("/"), path)
+                if len(path) >= self.MAX_DEPTH:
+                    continue
+                items: Any = node.items()
+            elif isinstance(node, list):
+                if len(path) >= self.MAX_DEPTH:
+                    continue
+                items = enumerate(node)
+            else:
+                continue
+            for key, child in items:
+                if isinstance(child, (dict, list)):
+                    child_path = path + (str(key),)
+                    entries[child_path] = _Entry(child, path, key)
+                    stack.append((child_path, child))
+        self._entries = entries
+        self._urls = urls
+        self._stale = False
+        self._shape = self._current_shape()
+        self._built = True
+
+    def _build_pointers(self) -> Dict[int, str]:
+        """Map the id of every node to the pointer of its first occurrence in document order."""
+        pointers: Dict[int, str] = {}
+        stack: List[Tuple[str, JsonNode]] = [("", self.document)]
+        while stack:
+            pointer, node = stack.pop()
+            if id(node) in pointers:
+                # Everything below a repeated container was reached through its first occurrence
+                continue
+            pointers[id(node)] = pointer
+            if isinstance(node, dict):
+                children = [(f"{pointer}/{str(key).replace('~', '~0').replace('/', '~1')}", value)
+                            for key, value in node.items()]
+            elif isinstance(node, list):
+                children = [(f"{pointer}/{position}", item) for position, item in enumerate(node)]
+            else:
+                continue
+            stack.extend(reversed(children))
+        return pointers
+
+    def _verified_pointer(self, node: JsonNode) -> Optional[str]:
+        pointer = self._pointers.get(id(node)) if self._pointers is not None else None
+        if pointer is None:
+            return None
+        try:
+            if self.resolve_pointer(pointer) is node:
+                return pointer
+        except jsonpointer.JsonPointerException:
+            pass
+        return None
+
+    def _current_shape(self) -> int:
+        """Return the number of groups and resources in the live document."""
+        count = 0
+        if isinstance(self.document, dict):
+            for groups in self.document.values():
+                if isinstance(groups, dict):
+                    for group in groups.values():
+                        if isinstance(group, dict):
+                            count += 1
+                            for resources in group.values():
+                                if isinstance(resources, dict):
+                                    count += len(resources)
+        return count
+
+    def _is_current(self, entry: _Entry) -> bool:
+        """Check that an entry and its ancestors are still in place."""
+        while entry.parent is not None:
+            parent = self._entries.get(entry.parent)
+            if parent is None:
+                return False
+            try:
+                if parent.node[entry.key] is not entry.node:  # type: ignore[index]
+                    return False
+            except (KeyError, IndexError, TypeError):
+                return False
+            entry = parent
+        return True
+
+    def _find(self, path: Path) -> Any:
+        """Return the node at a path, or _MISSING."""
+        self._ensure_built()
+        depth = min(len(path), self.MAX_DEPTH)
+        while True:
+            entry = self._entries.get(path[:depth])
+            if entry is not None:
+                if self._is_current(entry):
+                    break
+                self._stale = True
+            depth -= 1
+        node = entry.node
+        for position in range(depth, len(path)):
+            segment = path[position]
+            if isinstance(node, dict):
+                if segment not in node:
+                    return _MISSING
+                key: Union[str, int] = segment
+            elif isinstance(node, list):
+                if not _ARRAY_INDEX.fullmatch(segment) or int(segment) >= len(node):
+                    return _MISSING
+                key = int(segment)
+            else:
+                return _MISSING
+            child = node[key]
+            if position < self.MAX_DEPTH and isinstance(child, (dict, list)):
+                # Re-index nodes that replaced indexed ones (or were added)
+                self._entries[path[:position + 1]] = _Entry(child, path[:position], key)
+            node = child
+        return node
+
+    def _resolve_url(self, url: str) -> Optional[JsonNode]:
+        self._ensure_built()
+        url = url.rstrip("/")
+        for attempt in range(2):
+            path = self._urls.get(url)
+            if path is not None:
+                node = self._find(path)
+                if isinstance(node, dict) and url in (str(node.get("self", "")).rstrip("/"),
+                                                      str(node.get("xid", "")).rstrip("/")):
+                    return node
+                self._stale = True
+            if attempt or not (self._stale or self._shape != self._current_shape()):
+                return None
+            self._build()
+        return None
@@ -1,22 +1,43 @@
 """ Core functions for the xregistry commands with dependency resolution """
 
+import codecs
 import copy
 import json
+import mmap
 import os
-from typing import Any, Dict, List, Tuple, Union, Set, Optional
-import urllib.request
+from typing import Any, Dict, Iterator, List, Tuple, Union, Set, Optional
 import urllib.parse
-import urllib.error
 import logging
 import yaml
 import base64
-from ..common.model import Model
+from concurrent.futures import ThreadPoolExecutor
+from ..common import json_codec
+from ..common.document_cache import DocumentCache
+from ..common.model import Model, ModelLookups
+from ..common.registry_roots import RegistryRootCache, get_registry_root_cache
+from ..common.transport import HttpTransport, TransportError, get_transport
+from .compact_document import compact_document
+from .document_passes import DocumentPass, DocumentWalker, PassTimings, ResourceLocation
+from .stacked_document import StackedDocument
+from .xregistry_index import XRegistryIndex
 
 JsonNode = Union[Dict[str, 'JsonNode'], List['JsonNode'], str, bool, int, float, None]
 
+# Default number of parallel fetches per dependency wave
+DEFAULT_FETCH_CONCURRENCY = 8
+
 logger = logging.getLogger(__name__)
 
 
+def _copy_containers(node: JsonNode) -> JsonNode:
+    """Return a copy of a JSON tree with new dicts and lists; scalars are shared."""
+    if isinstance(node, dict):
+        return {key: _copy_containers(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_copy_containers(value) for value in node]
+    return node
+
+
 class XRegistryUrlParser:
     """Parse xRegistry URLs to determine entry point and resource paths."""
     
@@ -84,6 +105,57 @@ class XRegistryUrlParser:
         return self.path_parts[5] if len(self.path_parts) > 5 else None
 
 
+class DependencyGraph:
+    """References between the parts of a composed xRegistry document.
+    
+    Sources are XIDs: ``/<group>/<groupid>/<resources>/<resourceid>`` for
+    references found in a resource (including its versions) and
+    ``/<group>/<groupid>`` for references in the attributes of a group.
+    Targets are the references as written in the document.
+    """
+    
+    def __init__(self) -> None:
+        self._references: Dict[str, List[str]] = {}
+        self._dependents: Optional[Dict[str, List[str]]] = None
+    
+    def add(self, source: str, targets: List[str]) -> None:
+        """Record references of a source."""
+        if not targets:
+            return
+        known = self._references.setdefault(source, [])
+        for target in targets:
+            if target not in known:
+                known.append(target)
+        self._dependents = None
+    
+    def references(self, source: str) -> List[str]:
+        """Return the distinct references of a source in document order."""
+        return list(self._references.get(source, []))
+    
+    def dependents(self, target: str) -> List[str]:
+        """Return the sources that reference a target."""
+        if self._dependents is None:
+            dependents: Dict[str, List[str]] = {}
+            for source, targets in self._references.items():
+                for target_ref in targets:
+                    dependents.setdefault(target_ref, []).append(source)
+            self._dependents = dependents
+        return list(self._dependents.get(target, []))
+    
+    def sources(self) -> List[str]:
+        """Return all sources that reference something."""
+        return list(self._references)
+    
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        """Iterate over (source, target) pairs."""
+        for source, targets in self._references.items():
+            for target in targets:
+                yield source, target
+    
+    def __len__(self) -> int:
+        return len(self._references)
+
+
 class DependencyResolver:
     """Resolves xRegistry dependencies by following xid references."""
     
@@ -93,14 +165,18 @@ class DependencyResolver:
         self.resolved_resources: Dict[str, JsonNode] = {}
         self.pending_resolution: Set[str] = set()
         self.logger = logging.getLogger(__name__ + ".DependencyResolver")
+        self.timings = getattr(loader, "pass_timings", None) or PassTimings()
+        # References of the composed document, as of the last collect_references() call
+        self.graph = DependencyGraph()
+        # Scanned parts of the composed document: path -> (node, shape, references)
+        self._scanned: Dict[Tuple[str, ...], Tuple[Any, List[Any], List[str]]] = {}
     
     def find_xid_references(self, data: JsonNode, group_type: str) -> List[str]:
         """Find all external xid references in the given data structure."""
         references = []
         
         # Get group types dynamically from model
-        model_groups = self.model.groups
-        group_patterns = [f"/{group_key}/" for group_key in model_groups.keys()]
+        group_patterns = ModelLookups.of(self.model).group_patterns
         
         if isinstance(data, dict):
             for key, value in data.items():
@@ -128,6 +204,79 @@ class DependencyResolver:
         
         return references
     
+    def collect_references(self, doc: Dict[str, Any]) -> List[str]:
+        """Return the xid references in a composed document in document order.
+        
+        The result is the same as calling find_xid_references() for each model
+        group type in the document, but the document is scanned per resource
+        (and per group attribute), and parts that did not change since the
+        previous call are not scanned again. The references are recorded in
+        ``self.graph``.
+        """
+        references: List[str] = []
+        scanned: Dict[Tuple[str, ...], Tuple[Any, List[Any], List[str]]] = {}
+        graph = DependencyGraph()
+        
+        def scan(path: Tuple[str, ...], key: str, node: Any, source: str) -> None:
+            shape = self._shape(node)
+            previous = self._scanned.get(path)
+            if (previous is not None and previous[0] is node and len(previous[1]) == len(shape)
+                    and all(a is b for a, b in zip(previous[1], shape))):
+                refs = previous[2]
+            else:
+                refs = self.find_xid_references({key: node}, path[0])
+            scanned[path] = (node, shape, refs)
+            references.extend(refs)
+            graph.add(source, refs)
+        
+        for group_type in ModelLookups.of(self.model).group_types:
+            if group_type not in doc:
+                continue
+            groups = doc[group_type]
+            if not isinstance(groups, dict):
+                scan((group_type,), group_type, groups, f"/{group_type}")
+                continue
+            for group_id, group in groups.items():
+                group_xid = f"/{group_type}/{group_id}"
+                if not isinstance(group, dict):
+                    scan((group_type, group_id), group_id, group, group_xid)
+                    continue
+                for key, value in group.items():
+                    if isinstance(value, dict):
+                        for entry_id, entry in value.items():
+                            scan((group_type, group_id, key, entry_id), entry_id, entry,
+                                 f"{group_xid}/{key}/{entry_id}")
+                    else:
+                        scan((group_type, group_id, key), key, value, group_xid)
+        
+        self._scanned = scanned
+        self.graph = graph
+        return references
+    
+    @staticmethod
+    def _shape(node: Any) -> List[Any]:
+        """Return the keys and values of a node and of its child containers, for change detection.
+        
+        The loader adds resources, versions and collections at most two levels
+        below the parts collect_references() scans.
+        """
+        if isinstance(node, dict):
+            pairs: Any = node.items()
+        elif isinstance(node, list):
+            pairs = enumerate(node)
+        else:
+            return [node]
+        shape: List[Any] = []
+        for key, value in pairs:
+            shape.append(key)
+            shape.append(value)
+            if isinstance(value, dict):
+                for item in value.items():
+                    shape.extend(item)
+            elif isinstance(value, list):
+                shape.extend(value)
+        return shape
+    
     def _mark_inline_resources_as_resolved(self, doc: Dict[str, Any], base_url: str) -> None:
         """Mark all inline resources in the document as already resolved to prevent re-fetching.
         
@@ -145,13 +294,11 @@ class DependencyResolver:
             registry_root = f"{parsed.scheme}://{parsed.netloc}"
         
         # Process each group type in the document
-        model_groups = self.model.groups
-        for group_type, group_def in model_groups.items():
+        for group_type, group_resources in ModelLookups.of(self.model).resource_collections.items():
             if group_type not in doc or not isinstance(doc[group_type], dict):
                 continue
                 
             group_collection = doc[group_type]
-            group_resources = group_def.get("resources", {})
             
             for group_id, group in group_collection.items():
                 if not isinstance(group, dict):
@@ -165,7 +312,7 @@ class DependencyResolver:
                     self.resolved_resources[full_url] = group
                 
                 # Process each resource collection type (messages, schemas, etc.)
-                for resource_collection in group_resources.keys():
+                for resource_collection, _ in group_resources:
                     if resource_collection not in group or not isinstance(group[resource_collection], dict):
                         continue
                     
@@ -206,7 +353,7 @@ class DependencyResolver:
         """
         # Resolve relative references against base URL
         if base_url and ref_url.startswith("/"):
-            ref_url = urllib.parse.urljoin(base_url, ref_url)
+            ref_url = self._absolute_reference(ref_url, base_url)
             self.logger.debug(f"Resolved relative reference to: {ref_url}")
         
         if ref_url in self.resolved_resources:
@@ -248,6 +395,24 @@ class DependencyResolver:
             self.pending_resolution.discard(ref_url)        
         return None
     
+    def nested_reference_urls(self, ref_url: str, resource_data: JsonNode) -> List[str]:
+        """Return the absolute URLs that resolve_reference follows from a fetched resource."""
+        parser = XRegistryUrlParser(ref_url)
+        group_type = parser.get_group_type() or "unknown"
+        nested_base_url = None
+        if ref_url.startswith("http"):
+            parsed = urllib.parse.urlparse(ref_url)
+            nested_base_url = f"{parsed.scheme}://{parsed.netloc}"
+        return [self._absolute_reference(nested_ref, nested_base_url)
+                for nested_ref in self.find_xid_references(resource_data, group_type)]
+    
+    @staticmethod
+    def _absolute_reference(ref_url: str, base_url: Optional[str]) -> str:
+        """Resolve a registry-relative reference against the base URL."""
+        if base_url and ref_url.startswith("/"):
+            return urllib.parse.urljoin(base_url, ref_url)
+        return ref_url
+    
     def _normalize_schema_references(self, doc: Dict[str, Any]) -> None:
         """Convert relative URI schema references to JSON pointers.
         
@@ -256,47 +421,11 @@ class DependencyResolver:
         to JSON pointers like '#/schemagroups/Contoso.ERP/schemas/SchemaName' so they can
         be resolved within the composed document.
         """
-        if not isinstance(doc, dict):
-            return
-        
-        # Process all message groups
-        if "messagegroups" in doc and isinstance(doc["messagegroups"], dict):
-            for mg_id, mg in doc["messagegroups"].items():
-                if not isinstance(mg, dict) or "messages" not in mg:
-                    continue
-                    
-                if not isinstance(mg["messages"], dict):
-                    continue
-                    
-                for msg_id, msg in mg["messages"].items():
-                    if not isinstance(msg, dict):
-                        continue
-                    
-                    # Normalize dataschemauri if present
-                    if "dataschemauri" in msg:
-                        schema_uri = msg["dataschemauri"]
-                        if isinstance(schema_uri, str) and schema_uri.startswith("/"):
-                            # Convert relative URI to JSON pointer
-                            msg["dataschemauri"] = "#" + schema_uri
-        
-        # Process all endpoints (they may also reference schemas or messages)
-        if "endpoints" in doc and isinstance(doc["endpoints"], dict):
-            for ep_id, ep in doc["endpoints"].items():
-                if not isinstance(ep, dict):
-                    continue
-                
-                # Normalize dataschemauri in endpoint messages
-                if "messages" in ep and isinstance(ep["messages"], dict):
-                    for msg_id, msg in ep["messages"].items():
-                        if not isinstance(msg, dict):
-                            continue
-                        
-                        # Normalize dataschemauri if present
-                        if "dataschemauri" in msg:
-                            schema_uri = msg["dataschemauri"]
-                            if isinstance(schema_uri, str) and schema_uri.startswith("/"):
-                                # Convert relative URI to JSON pointer
-                                msg["dataschemauri"] = "#" + schema_uri
+        DocumentWalker(ModelLookups.of(self.model), self.timings).walk(doc, [self.schema_reference_pass()])
+    
+    def schema_reference_pass(self) -> DocumentPass:
+        """Return the pass that normalizes the schema references of the messages it visits."""
+        return _SchemaReferencePass()
     
     def _restructure_single_resource(self, version_obj: Dict[str, Any], group_type: str, resource_id: str) -> Dict[str, Any]:
         """Restructure a single message/schema version object into proper group structure.
@@ -387,8 +516,7 @@ class DependencyResolver:
           # Override entry_type detection based on document content
         if isinstance(entry_data, dict):
             # If the document contains top-level xRegistry collections, treat it as a full registry
-            model_groups = self.model.groups
-            xreg_collections = set(model_groups.keys())
+            xreg_collections = ModelLookups.of(self.model).group_type_set
             if any(key in entry_data for key in xreg_collections):
                 entry_type = "registry"
         
@@ -437,6 +565,9 @@ class DependencyResolver:
             parsed = urllib.parse.urlparse(entry_url)
             base_url = f"{parsed.scheme}://{parsed.netloc}"
         
+        # Fetch the whole wave concurrently; the loop below consumes the results in order
+        self.loader.prefetch([self._absolute_reference(ref_url, base_url) for ref_url in all_refs], headers)
+        
         for ref_url in all_refs:
             resolved_resource = self.resolve_reference(ref_url, headers, base_url)
             if resolved_resource is not None:
@@ -520,12 +651,32 @@ class DependencyResolver:
                 doc[group_type].update(resource_data)
 
 
+
+class _SchemaReferencePass(DocumentPass):
+    """Converts relative ``dataschemauri`` references of messages to JSON pointers."""
+    
+    name = "schema-references"
+    
+    def visit_resource(self, location: ResourceLocation, resources: Dict[str, Any],
+                       resource: Dict[str, Any]) -> None:
+        if location.collection != "messages" or location.group_type not in ("messagegroups", "endpoints"):
+            return
+        schema_uri = resource.get("dataschemauri")
+        if isinstance(schema_uri, str) and schema_uri.startswith("/"):
+            # Convert relative URI to JSON pointer
+            resource["dataschemauri"] = "#" + schema_uri
+
+
 class ResourceResolver:
     """Resolves resource data from various sources (inline, URL, base64)."""
     
     def __init__(self, loader: 'XRegistryLoader'):
         self.loader = loader
         self.logger = logging.getLogger(__name__ + ".ResourceResolver")
+        self.timings = getattr(loader, "pass_timings", None) or PassTimings()
+        # Payloads fetched concurrently by resolve_all_resources, by URL
+        self._fetched: Dict[str, Tuple[str, Optional[JsonNode]]] = {}
+        self._handed_out: Set[str] = set()
     
     def resolve_resource(self, entity: Dict[str, Any], headers: Dict[str, str], 
                         resource_field_name: str = "resource") -> None:
@@ -563,7 +714,7 @@ class ResourceResolver:
             if isinstance(resource_url, str):
                 try:
                     self.logger.debug(f"Fetching resource from URL: {resource_url}")
-                    _, resource_data = self.loader._load_core(resource_url, headers, ignore_handled=True)
+                    _, resource_data = self._load_resource(resource_url, headers)
                     if resource_data is not None:
                         entity[resource_field_name] = resource_data
                         self.logger.debug(f"Successfully resolved resource from URL: {resource_url}")
@@ -578,7 +729,7 @@ class ResourceResolver:
             if isinstance(resource_url, str):
                 try:
                     self.logger.debug(f"Fetching resource from legacy resourceurl: {resource_url}")
-                    _, resource_data = self.loader._load_core(resource_url, headers, ignore_handled=True)
+                    _, resource_data = self._load_resource(resource_url, headers)
                     if resource_data is not None:
                         entity[resource_field_name] = resource_data
                         self.logger.debug(f"Successfully resolved resource from legacy resourceurl: {resource_url}")
@@ -595,7 +746,7 @@ class ResourceResolver:
                     decoded_data = base64.b64decode(resource_b64).decode('utf-8')
                     # Try to parse as JSON/YAML
                     try:
-                        entity[resource_field_name] = json.loads(decoded_data)
+                        entity[resource_field_name] = json_codec.loads(decoded_data)
                     except json.JSONDecodeError:
                         try:
                             entity[resource_field_name] = yaml.safe_load(decoded_data)
@@ -614,7 +765,7 @@ class ResourceResolver:
                     decoded_data = base64.b64decode(resource_b64).decode('utf-8')
                     # Try to parse as JSON/YAML
                     try:
-                        entity[resource_field_name] = json.loads(decoded_data)
+                        entity[resource_field_name] = json_codec.loads(decoded_data)
                     except json.JSONDecodeError:
                         try:
                             entity[resource_field_name] = yaml.safe_load(decoded_data)
@@ -627,93 +778,124 @@ class ResourceResolver:
     
     def resolve_collection_urls(self, xreg_doc: JsonNode, headers: Dict[str, str]) -> None:
         """Resolve collection URL references (like messagesurl, schemasurl) in group instances."""
-        if not isinstance(xreg_doc, dict):
-            return
-        
-        # Get model groups to process dynamically
-        model_groups = self.loader.model.groups
-        
-        for group_type, group_def in model_groups.items():
-            if group_type in xreg_doc and isinstance(xreg_doc[group_type], dict):
-                group_collection = xreg_doc[group_type]
-                if not isinstance(group_collection, dict):
-                    continue
-                    
-                # Get resource collections for this group type
-                group_resources = group_def.get("resources", {})
-                if not isinstance(group_resources, dict):
-                    continue
-                
-                for group_id, group in group_collection.items():
-                    if not isinstance(group, dict):
-                        continue
-                    
-                    # Check for collection URL references (e.g., messagesurl, schemasurl)
-                    for resource_collection, resource_def in group_resources.items():
-                        collection_url_field = f"{resource_collection}url"
-                        
-                        # If the collection is not present but a URL reference exists, fetch it
-                        if collection_url_field in group and resource_collection not in group:
-                            collection_url = group[collection_url_field]
-                            if isinstance(collection_url, str):
-                                try:
-                                    self.logger.debug(f"Fetching collection from {collection_url_field}: {collection_url}")
-                                    _, collection_data = self.loader._load_core(collection_url, headers, ignore_handled=True)
-                                    if collection_data is not None and isinstance(collection_data, dict):
-                                        group[resource_collection] = collection_data
-                                        self.logger.debug(f"Successfully resolved collection from {collection_url_field}: {collection_url}")
-                                    else:
-                                        self.logger.warning(f"Failed to fetch collection from {collection_url_field}: {collection_url}")
-                                except Exception as e:
-                                    self.logger.error(f"Error fetching collection from {collection_url_field} {collection_url}: {e}")
+        self._walk(xreg_doc, [_CollectionUrlPass(self, headers)])
     
     def resolve_all_resources(self, xreg_doc: JsonNode, headers: Dict[str, str]) -> None:
-        """Recursively resolve all resource references in an xRegistry document."""
-        if not isinstance(xreg_doc, dict):
-            return
+        """Recursively resolve all resource references in an xRegistry document.
         
-        # First resolve collection URLs (like messagesurl, schemasurl)
-        self.resolve_collection_urls(xreg_doc, headers)
-        
-        # Get model groups to process dynamically
-        model_groups = self.loader.model.groups
+        Collection URLs are resolved and the resources to resolve are collected
+        on one traversal. Resolution then runs in two more phases: the distinct
+        HTTP URLs among the URL-backed resources are fetched concurrently, and
+        the payloads are assigned back in document order.
+        """
+        self._walk(xreg_doc, [_CollectionUrlPass(self, headers), _ResourcePass(self, headers)])
+    
+    def _walk(self, xreg_doc: JsonNode, passes: List[DocumentPass]) -> None:
+        DocumentWalker(ModelLookups.of(self.loader.model), self.timings).walk(xreg_doc, passes)
+    
+    def _resolve_group_collection_urls(self, group_type: str, group: Dict[str, Any], headers: Dict[str, str]) -> None:
+        """Fetch the resource collections a group only references by URL (e.g. messagesurl)."""
+        for resource_collection, collection_url_field in ModelLookups.of(self.loader.model).collection_url_fields.get(group_type, ()):
+            # If the collection is not present but a URL reference exists, fetch it
+            if collection_url_field in group and resource_collection not in group:
+                collection_url = group[collection_url_field]
+                if isinstance(collection_url, str):
+                    try:
+                        self.logger.debug(f"Fetching collection from {collection_url_field}: {collection_url}")
+                        _, collection_data = self.loader._load_core(collection_url, headers, ignore_handled=True)
+                        if collection_data is not None and isinstance(collection_data, dict):
+                            group[resource_collection] = collection_data
+                            self.logger.debug(f"Successfully resolved collection from {collection_url_field}: {collection_url}")
+                        else:
+                            self.logger.warning(f"Failed to fetch collection from {collection_url_field}: {collection_url}")
+                    except Exception as e:
+                        self.logger.error(f"Error fetching collection from {collection_url_field} {collection_url}: {e}")
+    
+    def _resolve_entities(self, entities: List[Tuple[Dict[str, Any], str]], headers: Dict[str, str]) -> None:
+        """Resolve the resources of (entity, resource field name) pairs, fetching their HTTP URLs concurrently."""
+        self._fetch_resource_urls(
+            [url for url in (self._resource_url(entity, field_name) for entity, field_name in entities)
+             if url is not None],
+            headers)
+        try:
+            for entity, resource_field_name in entities:
+                self.resolve_resource(entity, headers, resource_field_name)
+        finally:
+            self._fetched = {}
+            self._handed_out = set()
+    
+    @staticmethod
+    def _resource_url(entity: Dict[str, Any], resource_field_name: str) -> Optional[str]:
+        """Return the URL resolve_resource() would fetch for an entity, or None."""
+        if resource_field_name in entity or ("resource" in entity and resource_field_name != "resource"):
+            return None
+        url = entity.get(f"{resource_field_name}url", entity.get("resourceurl"))
+        return url if isinstance(url, str) else None
+    
+    def _fetch_resource_urls(self, urls: List[str], headers: Dict[str, str]) -> None:
+        """Fetch the distinct HTTP URLs concurrently for the following resolve_resource() calls."""
+        pending = list(dict.fromkeys(url for url in urls if url.startswith(('http://', 'https://'))))
+        if len(pending) < 2 or self.loader.fetch_concurrency <= 1:
+            return
         
-        for group_type, group_def in model_groups.items():
-            if group_type in xreg_doc and isinstance(xreg_doc[group_type], dict):
-                group_collection = xreg_doc[group_type]
-                if not isinstance(group_collection, dict):
-                    continue
-                    
-                # Get resource collections for this group type
-                group_resources = group_def.get("resources", {})
-                if not isinstance(group_resources, dict):
-                    continue
-                
-                for group_id, group in group_collection.items():
-                    if isinstance(group, dict):                        # Process each resource collection type in this group
-                        for resource_collection, resource_def in group_resources.items():
-                            if resource_collection in group and isinstance(group[resource_collection], dict):
-                                resource_collection_data = group[resource_collection]
-                                if not isinstance(resource_collection_data, dict):
-                                    continue
-                                    
-                                # Get the singular name for this resource type from the model
-                                resource_field_name = "resource"  # default fallback
-                                if isinstance(resource_def, dict) and "singular" in resource_def:
-                                    resource_field_name = resource_def["singular"]
-                                
-                                for resource_id, resource in resource_collection_data.items():
-                                    if isinstance(resource, dict):
-                                        # Handle resource versions
-                                        if "versions" in resource and isinstance(resource["versions"], dict):
-                                            versions = resource["versions"]
-                                            if isinstance(versions, dict):
-                                                for version_id, version in versions.items():
-                                                    if isinstance(version, dict):
-                                                        self.resolve_resource(version, headers, resource_field_name)
-                                        else:
-                                            # Handle direct resource (no versions)
-                                            self.resolve_resource(resource, headers, resource_field_name)
+        self.logger.debug(f"Fetching {len(pending)} resources concurrently")
+        with ThreadPoolExecutor(max_workers=min(len(pending), self.loader.fetch_concurrency),
+                                thread_name_prefix="xrcg-resource") as pool:
+            results = pool.map(lambda url: self.loader._load_core(url, headers, ignore_handled=True), pending)
+            self._fetched = dict(zip(pending, results))
+    
+    def _load_resource(self, url: str, headers: Dict[str, str]) -> Tuple[str, Optional[JsonNode]]:
+        """Return a fetched payload, or load it now if it was not fetched ahead."""
+        if url not in self._fetched:
+            return self.loader._load_core(url, headers, ignore_handled=True)
+        resolved_uri, resource_data = self._fetched[url]
+        if url in self._handed_out:
+            # Every entity gets its own copy, as with one fetch per entity
+            resource_data = copy.deepcopy(resource_data)
+        self._handed_out.add(url)
+        return resolved_uri, resource_data
+
+
+
+class _CollectionUrlPass(DocumentPass):
+    """Fetches the resource collections groups only reference by URL."""
+    
+    name = "collection-urls"
+    
+    def __init__(self, resolver: ResourceResolver, headers: Dict[str, str]):
+        self.resolver = resolver
+        self.headers = headers
+    
+    def visit_group(self, group_type: str, group_id: str, group: Dict[str, Any]) -> None:
+        self.resolver._resolve_group_collection_urls(group_type, group, self.headers)
+
+
+class _ResourcePass(DocumentPass):
+    """Collects every resource and version and resolves their payloads at the end."""
+    
+    name = "resources"
+    
+    def __init__(self, resolver: ResourceResolver, headers: Dict[str, str]):
+        self.resolver = resolver
+        self.headers = headers
+        self.entities: List[Tuple[Dict[str, Any], str]] = []
+    
+    def visit_resource(self, location: ResourceLocation, resources: Dict[str, Any],
+                       resource: Dict[str, Any]) -> None:
+        resource_field_name = location.singular or "resource"
+        versions = resource.get("versions")
+        if isinstance(versions, dict):
+            self.entities.extend((version, resource_field_name) for version in versions.values()
+                                 if isinstance(version, dict))
+        else:
+            # Direct resource (no versions)
+            self.entities.append((resource, resource_field_name))
+    
+    def end(self, document: Dict[str, Any]) -> None:
+        self.resolver._resolve_entities(self.entities, self.headers)
+    
+    def close(self) -> None:
+        self.entities = []
 
 
 class MessageResolver:
@@ -740,6 +922,10 @@ class MessageResolver:
     def __init__(self, loader: 'XRegistryLoader'):
         self.loader = loader
         self.logger = logging.getLogger(__name__ + ".MessageResolver")
+        self.timings = getattr(loader, "pass_timings", None) or PassTimings()
+        # Document index and resolved messages, while resolve_all_basemessages() runs
+        self._index: Optional[XRegistryIndex] = None
+        self._resolved: Dict[str, Optional[Dict[str, Any]]] = {}
 
     def _get_basemessage_ref(self, message: Dict[str, Any]) -> Optional[str]:
         """Return the base-message reference from a message, honoring all spec
@@ -784,10 +970,14 @@ class MessageResolver:
                                    visited: Set[str]) -> Optional[Dict[str, Any]]:
         """Resolve the basemessage chain for a message definition.
         
+        Resolved base messages are memoized for the duration of
+        resolve_all_basemessages(), so a base shared by many messages is merged
+        only once.
+        
         Args:
             message: The message definition to resolve
             xreg_doc: The full xRegistry document for resolving references
-            visited: Set of visited message XID/URLs to detect circular references
+            visited: Set of visited message XIDs to detect circular references
             
         Returns:
             The fully resolved message with all base messages merged, or None if circular reference detected
@@ -799,43 +989,72 @@ class MessageResolver:
             # No base message - return as-is
             return dict(message)
         
+        base_key = self._message_key(base_ref) or base_ref
+        
         # Check for circular reference
-        if base_ref in visited:
+        if base_key in visited:
             self.logger.error(f"Circular basemessage reference detected: {base_ref}")
             return None
         
-        visited.add(base_ref)
+        visited.add(base_key)
         
-        # Find the base message in the document
-        base_message = self._find_message_by_ref(base_ref, xreg_doc)
-        if not base_message:
-            self.logger.warning(f"Base message not found: {base_ref}")
-            # Per spec: "If the referenced message can not be found then an error MUST NOT be generated"
-            # Return current message without the base-message marker(s).
-            result = dict(message)
-            self._strip_basemessage_keys(result)
-            return result
+        if base_key in self._resolved:
+            resolved_base = self._resolved[base_key]
+        else:
+            # Find the base message in the document
+            base_message = self._find_message_by_ref(base_ref, xreg_doc)
+            if not base_message:
+                self.logger.warning(f"Base message not found: {base_ref}")
+                # Per spec: "If the referenced message can not be found then an error MUST NOT be generated"
+                # Return current message without the base-message marker(s).
+                result = dict(message)
+                self._strip_basemessage_keys(result)
+                return result
+            
+            # Recursively resolve the base message's chain. A chain that runs into
+            # a cycle does so from every entry point, so failures are memoized too.
+            resolved_base = self._resolve_basemessage_chain(base_message, xreg_doc, visited)
+            if resolved_base is not None:
+                self._strip_basemessage_keys(resolved_base)
+            self._resolved[base_key] = resolved_base
         
-        # Recursively resolve the base message's chain
-        resolved_base = self._resolve_basemessage_chain(base_message, xreg_doc, visited)
         if resolved_base is None:
             # Circular reference in base chain
             return None
         
-        # Remove base-message marker(s) from both sides before merging so the
-        # merged result is a clean, fully-resolved message.
+        # Remove base-message marker(s) before merging so the merged result
+        # is a clean, fully-resolved message. The memoized base is already clean.
         current = dict(message)
         self._strip_basemessage_keys(current)
-        self._strip_basemessage_keys(resolved_base)
         
         # Merge: base first, then overlay with current message
         merged = self._deep_merge(resolved_base, current)
         
         return merged
     
+    @staticmethod
+    def _message_key(ref: str) -> Optional[str]:
+        """Return the normalized XID a message reference points to, or None if it is malformed.
+        
+        ``#``-prefixed and plain XIDs map to the same key; path segments after
+        the resource id are ignored unless they name a version. Absolute URLs
+        are their own key.
+        """
+        if "://" in ref:
+            return ref.strip().rstrip('/')
+        parts = [p for p in ref.lstrip('#').split('/') if p]
+        if len(parts) < 4:
+            return None
+        if len(parts) >= 6 and parts[4] == "versions":
+            return "/" + "/".join(parts[:6])
+        return "/" + "/".join(parts[:4])
+    
     def _find_message_by_ref(self, ref: str, xreg_doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Find a message definition by XID or URL reference.
         
+        While resolve_all_basemessages() runs, references are looked up in the
+        document index, which also knows the ``self`` URLs of the messages.
+        
         Args:
             ref: The XID or URL reference (e.g., "/messagegroups/group1/messages/msg1")
             xreg_doc: The xRegistry document to search in
@@ -843,108 +1062,106 @@ class MessageResolver:
         Returns:
             The message definition, or None if not found
         """
-        # Parse the reference - handle both absolute and fragment identifiers
-        ref = ref.lstrip('#')  # Remove fragment prefix if present
-        
-        # Handle XID format: /messagegroups/{groupid}/messages/{messageid}[/versions/{versionid}]
-        parts = [p for p in ref.split('/') if p]
-        
-        if len(parts) < 4:
-            self.logger.warning(f"Invalid message reference format: {ref}")
+        key = self._message_key(ref)
+        if key is None:
+            self.logger.warning(f"Invalid message reference format: {ref.lstrip('#')}")
             return None
         
-        # Extract path components
-        group_collection = parts[0]  # e.g., "messagegroups"
-        group_id = parts[1]
-        resource_collection = parts[2]  # e.g., "messages"
-        message_id = parts[3]
-        
-        # Navigate to the message
-        if group_collection not in xreg_doc:
+        if self._index is not None:
+            message = self._index.resolve(key)
+            return message if isinstance(message, dict) else None
+        if "://" in key:
             return None
         
-        groups = xreg_doc[group_collection]
-        if not isinstance(groups, dict) or group_id not in groups:
-            return None
-        
-        group = groups[group_id]
-        if not isinstance(group, dict) or resource_collection not in group:
-            return None
-        
-        messages = group[resource_collection]
-        if not isinstance(messages, dict) or message_id not in messages:
-            return None
+        parts = key.split('/')[1:]
         
-        message = messages[message_id]
+        # Navigate to the message
+        groups = xreg_doc.get(parts[0])
+        group = groups.get(parts[1]) if isinstance(groups, dict) else None
+        messages = group.get(parts[2]) if isinstance(group, dict) else None
+        message = messages.get(parts[3]) if isinstance(messages, dict) else None
         if not isinstance(message, dict):
             return None
         
         # Check if specific version is requested
-        if len(parts) >= 6 and parts[4] == "versions":
-            version_id = parts[5]
-            if "versions" in message and isinstance(message["versions"], dict):
-                if version_id in message["versions"]:
-                    return message["versions"][version_id]
-            return None
+        if len(parts) == 6:
+            versions = message.get("versions")
+            version = versions.get(parts[5]) if isinstance(versions, dict) else None
+            return version if isinstance(version, dict) else None
         
         return message
     
-    def resolve_all_basemessages(self, xreg_doc: Dict[str, Any]) -> None:
+    def resolve_all_basemessages(self, xreg_doc: Dict[str, Any],
+                                 index: Optional[XRegistryIndex] = None) -> None:
         """Resolve all basemessage references in an xRegistry document.
         
         This processes both messagegroups and endpoints (which can contain embedded messages).
         
         Args:
             xreg_doc: The xRegistry document to process
+            index: Index of the document, shared with the other resolvers; built if omitted
         """
-        if not isinstance(xreg_doc, dict):
+        DocumentWalker(ModelLookups.of(self.loader.model), self.timings).walk(xreg_doc, [self.basemessage_pass(index)])
+    
+    def basemessage_pass(self, index: Optional[XRegistryIndex] = None) -> DocumentPass:
+        """Return the pass that resolves the basemessages of all messages it visits."""
+        return _BasemessagePass(self, index)
+    
+    def _resolve_message(self, messages: Dict[str, Any], message_id: str, message: Dict[str, Any],
+                         xreg_doc: Dict[str, Any], collection_xid: str = "") -> None:
+        """Resolve the basemessage reference of one message and replace it in its collection."""
+        # Skip messages that have no base-message reference (under either
+        # the current spec name ``basemessage`` or the legacy alias
+        # ``basemessageurl``).
+        if not self._get_basemessage_ref(message):
             return
         
-        # Process messagegroups
-        if "messagegroups" in xreg_doc and isinstance(xreg_doc["messagegroups"], dict):
-            for group_id, group in xreg_doc["messagegroups"].items():
-                if isinstance(group, dict) and "messages" in group:
-                    messages = group["messages"]
-                    if isinstance(messages, dict):
-                        self._resolve_messages_in_collection(messages, xreg_doc)
-        
-        # Process endpoints (which can have embedded messages)
-        if "endpoints" in xreg_doc and isinstance(xreg_doc["endpoints"], dict):
-            for endpoint_id, endpoint in xreg_doc["endpoints"].items():
-                if isinstance(endpoint, dict) and "messages" in endpoint:
-                    messages = endpoint["messages"]
-                    if isinstance(messages, dict):
-                        self._resolve_messages_in_collection(messages, xreg_doc)
-    
-    def _resolve_messages_in_collection(self, messages: Dict[str, Any], xreg_doc: Dict[str, Any]) -> None:
-        """Resolve basemessage references for all messages in a collection.
+        self.logger.debug(f"Resolving basemessage for message: {message_id}")
         
-        Args:
-            messages: Dictionary of message definitions
-            xreg_doc: The full xRegistry document for resolving references
-        """
-        for message_id, message in list(messages.items()):
-            if not isinstance(message, dict):
-                continue
-            
-            # Skip messages that have no base-message reference (under either
-            # the current spec name ``basemessage`` or the legacy alias
-            # ``basemessageurl``).
-            if not self._get_basemessage_ref(message):
-                continue
-            
-            self.logger.debug(f"Resolving basemessage for message: {message_id}")
-            
-            # Resolve the basemessage chain
-            visited: Set[str] = set()
+        # Resolve the basemessage chain, unless the message was already
+        # resolved as the base of another one
+        message_xid = f"{collection_xid}/{message_id}"
+        if collection_xid and message_xid in self._resolved:
+            resolved_message = self._resolved[message_xid]
+        else:
+            visited: Set[str] = {message_xid} if collection_xid else set()
             resolved_message = self._resolve_basemessage_chain(message, xreg_doc, visited)
-            
-            if resolved_message is not None:
-                # Replace the message with the resolved version
-                messages[message_id] = resolved_message
-                self.logger.debug(f"Successfully resolved basemessage for: {message_id}")
-            else:
-                self.logger.error(f"Failed to resolve basemessage for: {message_id} (circular reference)")
+            if collection_xid:
+                self._resolved[message_xid] = resolved_message
+        
+        if resolved_message is not None:
+            # Replace the message with the resolved version
+            messages[message_id] = resolved_message
+            self.logger.debug(f"Successfully resolved basemessage for: {message_id}")
+        else:
+            self.logger.error(f"Failed to resolve basemessage for: {message_id} (circular reference)")
+
+
+class _BasemessagePass(DocumentPass):
+    """Resolves the basemessages of messages in message groups and endpoints."""
+    
+    name = "basemessages"
+    
+    def __init__(self, resolver: MessageResolver, index: Optional[XRegistryIndex]):
+        self.resolver = resolver
+        self.index = index
+        self.document: Dict[str, Any] = {}
+    
+    def begin(self, document: Dict[str, Any]) -> None:
+        self.document = document
+        self.resolver._index = self.index if self.index is not None else XRegistryIndex(document)
+        self.resolver._resolved = {}
+    
+    def visit_resource(self, location: ResourceLocation, resources: Dict[str, Any],
+                       resource: Dict[str, Any]) -> None:
+        if location.collection == "messages" and location.group_type in ("messagegroups", "endpoints"):
+            self.resolver._resolve_message(resources, location.resource_id, resource, self.document,
+                                           location.collection_xid)
+    
+    def close(self) -> None:
+        self.document = {}
+        self.resolver._index = None
+        self.resolver._resolved = {}
 
 
 class AliasResolver:
@@ -960,12 +1177,18 @@ class AliasResolver:
 
     This resolver runs during document loading, before validation, schema
     processing, and template rendering. Each alias resource is replaced in
-    place by a deep copy of its target's content while retaining the alias
-    resource's own identity (its collection key and ``<singular>id``). As a
-    result, downstream consumers never observe ``xref`` and a document whose
-    only "invalid" content was an alias validates cleanly against the document
+    place by a copy of its target that carries the alias resource's own
+    identity (its collection key and ``<singular>id``). As a result,
+    downstream consumers never observe ``xref`` and a document whose only
+    "invalid" content was an alias validates cleanly against the document
     schema.
 
+    The copy has its own dicts and lists, because templates find the
+    location of a node, such as the inline ``dataschema`` of a message, by
+    object identity; shared subtrees would give an alias the location and
+    class names of its target. Strings and other scalars are shared with the
+    target instead of copied.
+
     Per the Core specification, aliases are **not** resolved transitively: an
     alias that targets another alias is reported as an error, as are malformed
     targets, missing targets, type mismatches, and self-references.
@@ -975,6 +1198,9 @@ class AliasResolver:
         self.loader = loader
         self.model = loader.model
         self.logger = logging.getLogger(__name__ + ".AliasResolver")
+        self.timings = getattr(loader, "pass_timings", None) or PassTimings()
+        # Document index, while resolve_all_aliases() runs
+        self._index: Optional[XRegistryIndex] = None
 
     @staticmethod
     def _get_xref(resource: Any) -> Optional[str]:
@@ -993,55 +1219,26 @@ class AliasResolver:
                 return meta_xref
         return None
 
-    def _resource_plurals_by_group(self) -> Dict[str, Dict[str, Optional[str]]]:
-        """Build a lookup of ``group_plural -> {resource_plural: resource_singular}``
-        from the model so alias resolution works for every resource type
-        (messages, schemas, and any custom resources) without hard-coding."""
-        result: Dict[str, Dict[str, Optional[str]]] = {}
-        for group_plural, gdef in self.model.groups.items():
-            if not isinstance(gdef, dict):
-                continue
-            resources = gdef.get("resources", [])
-            plurals: Dict[str, Optional[str]] = {}
-            if isinstance(resources, list):
-                for r in resources:
-                    if isinstance(r, dict) and r.get("plural"):
-                        plurals[r["plural"]] = r.get("singular")
-            elif isinstance(resources, dict):
-                for rid, r in resources.items():
-                    if isinstance(r, dict):
-                        plurals[r.get("plural", rid)] = r.get("singular")
-            result[group_plural] = plurals
-        return result
-
-    def resolve_all_aliases(self, xreg_doc: Dict[str, Any]) -> None:
-        """Resolve every resource alias in the document in place."""
-        if not isinstance(xreg_doc, dict):
-            return
+    def resolve_all_aliases(self, xreg_doc: Dict[str, Any],
+                            index: Optional[XRegistryIndex] = None) -> None:
+        """Resolve every resource alias in the document in place.
 
-        group_resource_plurals = self._resource_plurals_by_group()
+        ``index`` is the document index shared with the other resolvers; it is
+        built if omitted.
+        """
+        DocumentWalker(ModelLookups.of(self.model), self.timings).walk(xreg_doc, [_AliasPass(self, index)])
 
-        for group_plural, groups in xreg_doc.items():
-            resource_plurals = group_resource_plurals.get(group_plural)
-            if not resource_plurals or not isinstance(groups, dict):
-                continue
-            for group_id, group in groups.items():
-                if not isinstance(group, dict):
-                    continue
-                for res_plural, res_singular in resource_plurals.items():
-                    collection = group.get(res_plural)
-                    if not isinstance(collection, dict):
-                        continue
-                    for res_id, resource in list(collection.items()):
-                        xref = self._get_xref(resource)
-                        if not xref:
-                            continue
-                        alias_path = f"/{group_plural}/{group_id}/{res_plural}/{res_id}"
-                        resolved = self._resolve_alias(
-                            xref, alias_path, res_plural, res_singular,
-                            res_id, xreg_doc)
-                        if resolved is not None:
-                            collection[res_id] = resolved
+    def _resolve_resource_alias(self, location: ResourceLocation, resources: Dict[str, Any],
+                               resource: Dict[str, Any], xreg_doc: Dict[str, Any]) -> None:
+        """Replace a resource by its target if it is an alias."""
+        xref = self._get_xref(resource)
+        if not xref:
+            return
+        resolved = self._resolve_alias(
+            xref, location.xid, location.collection, location.singular,
+            location.resource_id, xreg_doc)
+        if resolved is not None:
+            resources[location.resource_id] = resolved
 
     def _resolve_alias(self, xref: str, alias_path: str, res_plural: str,
                        res_singular: Optional[str], alias_id: str,
@@ -1074,13 +1271,16 @@ class AliasResolver:
                 f"Alias {alias_path}: xref target refers to itself.")
             return None
 
-        # Navigate to the target resource in the same document.
-        groups = xreg_doc.get(t_group_plural)
-        target_group = groups.get(t_group_id) if isinstance(groups, dict) else None
-        target_collection = (
-            target_group.get(t_res_plural) if isinstance(target_group, dict) else None)
-        target_resource = (
-            target_collection.get(t_res_id) if isinstance(target_collection, dict) else None)
+        # Look up the target resource in the same document.
+        if self._index is not None:
+            target_resource = self._index.resolve(target_path)
+        else:
+            groups = xreg_doc.get(t_group_plural)
+            target_group = groups.get(t_group_id) if isinstance(groups, dict) else None
+            target_collection = (
+                target_group.get(t_res_plural) if isinstance(target_group, dict) else None)
+            target_resource = (
+                target_collection.get(t_res_id) if isinstance(target_collection, dict) else None)
         if not isinstance(target_resource, dict):
             self.logger.error(
                 f"Alias {alias_path}: xref target '{target_path}' was not found in "
@@ -1095,12 +1295,12 @@ class AliasResolver:
                 f"the alias at a canonical resource.")
             return None
 
-        # Project the target through the alias identity.
-        resolved = copy.deepcopy(target_resource)
+        # Project the target through the alias identity; nested subtrees are
+        # copied so that they are found at the alias's own location.
+        resolved = {key: _copy_containers(value) for key, value in target_resource.items()
+                    if key not in ("xref", "self", "xid")}
         if res_singular:
             resolved[f"{res_singular}id"] = alias_id
-        for key in ("xref", "self", "xid"):
-            resolved.pop(key, None)
         meta = resolved.get("meta")
         if isinstance(meta, dict):
             meta.pop("xref", None)
@@ -1111,11 +1311,44 @@ class AliasResolver:
         return resolved
 
 
+
+class _AliasPass(DocumentPass):
+    """Replaces alias resources by projections of their targets."""
+
+    name = "aliases"
+
+    def __init__(self, resolver: AliasResolver, index: Optional[XRegistryIndex]):
+        self.resolver = resolver
+        self.index = index
+        self.document: Dict[str, Any] = {}
+
+    def begin(self, document: Dict[str, Any]) -> None:
+        self.document = document
+        self.resolver._index = self.index if self.index is not None else XRegistryIndex(document)
+
+    def visit_resource(self, location: ResourceLocation, resources: Dict[str, Any],
+                       resource: Dict[str, Any]) -> None:
+        self.resolver._resolve_resource_alias(location, resources, resource, self.document)
+
+    def close(self) -> None:
+        self.document = {}
+        self.resolver._index = None
+
+
 class XRegistryLoader:
     """Main loader class for xRegistry documents with dependency resolution."""
     
-    def __init__(self, model_path: Optional[str] = None):
-        self.model = Model(model_path)
+    def __init__(self, model_path: Optional[str] = None,
+                 transport: Optional[HttpTransport] = None,
+                 fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                 registry_roots: Optional[RegistryRootCache] = None,
+                 document_cache: Optional[DocumentCache] = None):
+        # One pooled transport serves the model, document, resource,
+        # collection and /capabilities fetches of this loader
+        self.transport = transport or get_transport()
+        self.model = Model(model_path, transport=self.transport)
+        # Time spent in each normalization pass of the last load
+        self.pass_timings = PassTimings()
         self.dependency_resolver = DependencyResolver(self.model, self)
         self.resource_resolver = ResourceResolver(self)
         self.message_resolver = MessageResolver(self)
@@ -1126,8 +1359,26 @@ class XRegistryLoader:
         self.schemas_handled: Set[str] = set()
         self.current_url: Optional[str] = None
         
-        # Cache for discovered registry roots
-        self._registry_roots: Dict[str, str] = {}
+        # Discovered registry roots, shared by all loaders in the process
+        self.registry_roots = registry_roots or get_registry_root_cache()
+        
+        # Maximum number of parallel fetches per dependency wave (1 = sequential)
+        self.fetch_concurrency = fetch_concurrency
+        # Documents fetched ahead of time by prefetch(), consumed once by _load_core
+        self._prefetched: Dict[str, Tuple[str, Optional[JsonNode]]] = {}
+        
+        # Opt-in cache of resolved local documents used by load() and load_stacked()
+        self.document_cache = document_cache
+        # URIs read by _load_core while a cacheable document is being resolved
+        self._loaded_sources: Optional[List[str]] = None
+        
+        # Record the layer each resource of a stacked document comes from (--trace-stack)
+        self.trace_stack = False
+        # Resource XID -> URI of the layer it came from, for the last load_stacked() with trace_stack
+        self.stack_origins: Dict[str, str] = {}
+        
+        # Intern attribute names and XIDs of resolved documents (--compact-definitions)
+        self.compact_documents = False
     
     def discover_registry_root(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Discover the xRegistry root by finding the /capabilities endpoint.
@@ -1145,9 +1396,10 @@ class XRegistryLoader:
         if headers is None:
             headers = {}
         
-        # Check cache first
-        if url in self._registry_roots:
-            return self._registry_roots[url]
+        # Check the shared cache first
+        cached_root = self.registry_roots.get(url)
+        if cached_root is not None:
+            return cached_root
         
         parsed = urllib.parse.urlparse(url)
         if not parsed.scheme or not parsed.netloc:
@@ -1156,43 +1408,47 @@ class XRegistryLoader:
         
         base = f"{parsed.scheme}://{parsed.netloc}"
         
-        # Try the base URL first (most common case)
-        try:
-            caps_url = urllib.parse.urljoin(base, "/capabilities")
-            request = urllib.request.Request(caps_url)
-            for key, value in headers.items():
-                request.add_header(key, value)
-            response = urllib.request.urlopen(request)
-            response.read()  # Just check if it exists
-            self.logger.info(f"Discovered registry root: {base}")
-            self._registry_roots[url] = base
-            return base
-        except:
-            pass
-        
-        # Try progressively deeper paths
+        # Candidates from the base URL (most common case) to progressively deeper paths
         path_parts = [p for p in parsed.path.split('/') if p]
-        for i in range(len(path_parts)):
-            test_path = '/' + '/'.join(path_parts[:i+1])
-            registry_candidate = urllib.parse.urljoin(base, test_path)
-            caps_url = registry_candidate + "/capabilities"
-            try:
-                request = urllib.request.Request(caps_url)
-                for key, value in headers.items():
-                    request.add_header(key, value)
-                response = urllib.request.urlopen(request)
-                response.read()
-                self.logger.info(f"Discovered registry root: {registry_candidate}")
-                self._registry_roots[url] = registry_candidate
-                return registry_candidate
-            except:
-                continue
+        candidates = [base] + [urllib.parse.urljoin(base, '/' + '/'.join(path_parts[:i+1]))
+                               for i in range(len(path_parts))]
+        
+        registry_root = self._probe_capabilities(candidates, headers)
+        if registry_root is not None:
+            self.logger.info(f"Discovered registry root: {registry_root}")
+            self.registry_roots.put(url, registry_root)
+            return registry_root
         
-        # Fallback: assume base is the registry root
+        # Fallback: assume base is the registry root, for this run only
         self.logger.warning(f"Could not discover registry root for {url}, using base URL: {base}")
-        self._registry_roots[url] = base
+        self.registry_roots.put(url, base, discovered=False)
         return base
     
+    def _probe_capabilities(self, candidates: List[str], headers: Dict[str, str]) -> Optional[str]:
+        """Probe {candidate}/capabilities for all candidates concurrently.
+        
+        Returns the first candidate in ladder order whose probe succeeds, as soon
+        as all candidates before it have failed, or None if every probe fails.
+        """
+        def _probe(candidate: str) -> bool:
+            try:
+                self.transport.get(f"{candidate}/capabilities", headers)
+                return True
+            except TransportError:
+                return False
+        
+        pool = ThreadPoolExecutor(max_workers=max(1, min(len(candidates), self.fetch_concurrency)),
+                                  thread_name_prefix="xrcg-probe")
+        try:
+            futures = [pool.submit(_probe, candidate) for candidate in candidates]
+            for candidate, future in zip(candidates, futures):
+                if future.result():
+                    return candidate
+            return None
+        finally:
+            # Don't wait for probes of deeper paths once a root is found
+            pool.shutdown(wait=False, cancel_futures=True)
+    
     def load(self, uri: str, headers: Optional[Dict[str, str]] = None, 
              is_schema_style: bool = False, expand_refs: bool = False,
              messagegroup_filter: str = "", endpoint_filter: str = "") -> Tuple[str, Optional[JsonNode]]:
@@ -1212,6 +1468,14 @@ class XRegistryLoader:
         if headers is None:
             headers = {}
         
+        cache_key = self._document_cache_key([uri], messagegroup_filter, endpoint_filter)
+        if cache_key is not None:
+            cached = self.document_cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug(f"Loaded resolved document for {uri} from the document cache")
+                return cached[0], self._compact(cached[1])
+            self._loaded_sources = []
+        
         try:
             resolved_uri, document = self._load_core(uri, headers)
             if document is None:
@@ -1221,8 +1485,7 @@ class XRegistryLoader:
             # and wrap it into a proper document structure
             if isinstance(document, dict):
                 # Detect if this is a full xRegistry document or a single resource
-                model_groups = self.model.groups
-                xreg_collections = set(model_groups.keys())
+                xreg_collections = ModelLookups.of(self.model).group_type_set
                 is_full_document = any(key in document for key in xreg_collections)
                 
                 if not is_full_document:
@@ -1240,33 +1503,20 @@ class XRegistryLoader:
                             self.logger.debug(f"Wrapped single resource into document structure: {group_type}/{group_id}")
                             document = wrapped_doc
             
-            # Apply basic resource resolution
-            self.resource_resolver.resolve_all_resources(document, headers)
-            
-            # Resolve resource aliases (xref) so they are transparent to codegen
-            if isinstance(document, dict):
-                self.alias_resolver.resolve_all_aliases(document)
-            
-            # Resolve basemessage references
-            if isinstance(document, dict):
-                self.message_resolver.resolve_all_basemessages(document)
-            
-            # Normalize schema references from relative URIs to JSON pointers
-            self.dependency_resolver._normalize_schema_references(document)
-            
-            # Apply message group filtering if needed
-            if messagegroup_filter and isinstance(document, dict):
-                document = self._apply_messagegroup_filter(document, messagegroup_filter)
-            
-            # Apply endpoint filtering if needed
-            if endpoint_filter and isinstance(document, dict):
-                document = self._apply_endpoint_filter(document, endpoint_filter)
+            # Resolve resources and references and apply the filters
+            self.pass_timings.clear()
+            document = self._resolve_document(document, headers, messagegroup_filter, endpoint_filter)
+            self.logger.debug(f"Normalization passes: {self.pass_timings}")
             
+            if cache_key is not None:
+                self._store_document(cache_key, (resolved_uri, document))
             return resolved_uri, document
             
         except Exception as e:
             self.logger.error(f"Failed to load document from {uri}: {e}")
             return uri, None
+        finally:
+            self._loaded_sources = None
     
     def load_stacked(self, uris: List[str], headers: Optional[Dict[str, str]] = None,
                      is_schema_style: bool = False, expand_refs: bool = False,
@@ -1296,9 +1546,20 @@ class XRegistryLoader:
             self.logger.error("No URIs provided for stacking")
             return "", None
         
+        # Origins are only known when the layers are merged
+        cache_key = None if self.trace_stack else self._document_cache_key(uris, messagegroup_filter, endpoint_filter)
+        if cache_key is not None:
+            cached = self.document_cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug(f"Loaded stacked document for {' + '.join(uris)} from the document cache")
+                return cached[0], self._compact(cached[1])
+            self._loaded_sources = []
+        
         try:
-            stacked_document: Optional[Dict[str, Any]] = None
+            layers: List[Tuple[str, Dict[str, Any]]] = []
             last_resolved_uri = uris[0]
+            self.pass_timings.clear()
+            self.stack_origins = {}
             
             for uri in uris:
                 self.logger.debug(f"Loading document for stacking: {uri}")
@@ -1313,41 +1574,53 @@ class XRegistryLoader:
                     self.logger.error(f"Document from {uri} is not a dictionary")
                     return uri, None
                 
-                # Apply basic resource resolution to this document
-                self.resource_resolver.resolve_all_resources(document, headers)
+                # Fetch the collections this document references by URL; they are
+                # merged by ID like inline collections. Resources are resolved
+                # after stacking, so shadowed ones are never fetched.
+                self.resource_resolver.resolve_collection_urls(document, headers)
                 
-                # Stack/merge this document
-                if stacked_document is None:
-                    stacked_document = document
-                else:
-                    stacked_document = self._merge_documents(stacked_document, document)
+                layers.append((resolved_uri, document))
             
+            # Stack/merge the documents
+            stack = StackedDocument(ModelLookups.of(self.model), layers)
+            stacked_document = stack.merge()
             if stacked_document is None:
                 return uris[0], None
+            if self.trace_stack:
+                self.stack_origins = stack.origins()
+                for line in stack.describe_origins():
+                    self.logger.debug(f"Stacked resource {line}")
             
-            # Resolve resource aliases (xref) so they are transparent to codegen
-            if isinstance(stacked_document, dict):
-                self.alias_resolver.resolve_all_aliases(stacked_document)
-            
-            # Resolve basemessage references in the final stacked document
-            if isinstance(stacked_document, dict):
-                self.message_resolver.resolve_all_basemessages(stacked_document)
-            
-            # Normalize schema references from relative URIs to JSON pointers
-            self.dependency_resolver._normalize_schema_references(stacked_document)
-            
-            # Apply filters to the final stacked document
-            if messagegroup_filter and isinstance(stacked_document, dict):
-                stacked_document = self._apply_messagegroup_filter(stacked_document, messagegroup_filter)
-            
-            if endpoint_filter and isinstance(stacked_document, dict):
-                stacked_document = self._apply_endpoint_filter(stacked_document, endpoint_filter)
+            # Resolve resources and references in the final stacked document and apply the filters
+            stacked_document = self._resolve_document(stacked_document, headers,
+                                                      messagegroup_filter, endpoint_filter)
+            self.logger.debug(f"Normalization passes: {self.pass_timings}")
             
+            if cache_key is not None:
+                self._store_document(cache_key, (last_resolved_uri, stacked_document))
             return last_resolved_uri, stacked_document
             
         except Exception as e:
             self.logger.error(f"Failed to stack documents: {e}")
             return uris[0], None
+        finally:
+            self._loaded_sources = None
+    
+    def _document_cache_key(self, uris: List[str], messagegroup_filter: str,
+                            endpoint_filter: str) -> Optional[str]:
+        """Return the document cache key for loading local files, or None if not cacheable."""
+        if self.document_cache is None:
+            return None
+        return DocumentCache.key(uris, self.model.fingerprint, messagegroup_filter, endpoint_filter)
+    
+    def _store_document(self, cache_key: str, result: Tuple[str, JsonNode]) -> None:
+        """Cache a resolved document unless resolving it read anything over HTTP."""
+        sources = self._loaded_sources or []
+        if any(source.startswith(('http://', 'https://')) for source in sources):
+            self.logger.debug("Not caching document resolved from remote resources")
+            return
+        self.document_cache.put(cache_key, result,
+                                [source[7:] if source.startswith('file://') else source for source in sources])
     
     def _merge_documents(self, base: Dict[str, Any], overlay: Dict[str, Any]) -> Dict[str, Any]:
         """Merge two xRegistry documents with overlay shadowing base.
@@ -1364,55 +1637,7 @@ class XRegistryLoader:
         Returns:
             Merged document
         """
-        result = dict(base)
-        
-        # Get model groups to identify xRegistry collections
-        model_groups = self.model.groups
-        collection_keys = set(model_groups.keys())
-        
-        for key, value in overlay.items():
-            if key in collection_keys and isinstance(value, dict) and isinstance(result.get(key), dict):
-                # This is an xRegistry collection (e.g., messagegroups, schemagroups)
-                # Merge group instances within the collection
-                merged_collection = dict(result[key])
-                
-                for group_id, group_data in value.items():
-                    if group_id in merged_collection and isinstance(group_data, dict) and isinstance(merged_collection[group_id], dict):
-                        # This group exists in both - merge the group contents
-                        merged_group = dict(merged_collection[group_id])
-                        
-                        # Get resource collection names for this group type from the model
-                        group_def = model_groups.get(key, {})
-                        resource_collections = group_def.get("resources", {})
-                        
-                        if isinstance(resource_collections, dict):
-                            resource_collection_names = set(resource_collections.keys())
-                        else:
-                            resource_collection_names = set()
-                        
-                        for group_key, group_value in group_data.items():
-                            if group_key in resource_collection_names and isinstance(group_value, dict) and isinstance(merged_group.get(group_key), dict):
-                                # This is a resource collection (e.g., messages, schemas)
-                                # Merge resources by ID within the collection
-                                merged_resources = dict(merged_group[group_key])
-                                for resource_id, resource_data in group_value.items():
-                                    merged_resources[resource_id] = resource_data
-                                merged_group[group_key] = merged_resources
-                            else:
-                                # Not a resource collection - replace completely
-                                merged_group[group_key] = group_value
-                        
-                        merged_collection[group_id] = merged_group
-                    else:
-                        # Group doesn't exist in base or types don't match - replace completely
-                        merged_collection[group_id] = group_data
-                
-                result[key] = merged_collection
-            else:
-                # Not a collection or types don't match - replace completely
-                result[key] = value
-        
-        return result
+        return StackedDocument(ModelLookups.of(self.model), [("", base), ("", overlay)]).merge()
     
     def load_with_dependencies(self, uri: str, headers: Optional[Dict[str, str]] = None,
                               messagegroup_filter: str = "", endpoint_filter: str = "") -> Tuple[str, Optional[JsonNode]]:
@@ -1431,6 +1656,7 @@ class XRegistryLoader:
         if headers is None:
             headers = {}
         
+        self.pass_timings.clear()
         try:
             # Discover the registry root for resolving relative URIs
             registry_root = None
@@ -1451,20 +1677,20 @@ class XRegistryLoader:
             # This fetches collections that may contain additional references
             self.resource_resolver.resolve_collection_urls(composed_document, headers)
             
-            # Iteratively resolve dependencies until no new references are found
+            # Iteratively resolve dependencies until no new references are found.
+            # Each wave only scans the parts of the document that changed.
             max_iterations = 10  # Prevent infinite loops
+            attempted: Set[str] = set()
             for iteration in range(max_iterations):
                 # Find all references in the current document
-                all_refs = []
-                model_groups = self.model.groups
-                for group_type in model_groups.keys():
-                    if group_type in composed_document:
-                        refs = self.dependency_resolver.find_xid_references(
-                            {group_type: composed_document[group_type]}, group_type)
-                        all_refs.extend(refs)
+                all_refs = self.dependency_resolver.collect_references(composed_document)
                 
-                # Filter out already resolved references
-                new_refs = [ref for ref in all_refs if ref not in self.dependency_resolver.resolved_resources]
+                # Filter out references that are resolved or failed in an earlier wave
+                resolved = self.dependency_resolver.resolved_resources
+                new_refs = [ref for ref in all_refs
+                            if DependencyResolver._absolute_reference(ref, registry_root) not in resolved
+                            and ref not in attempted]
+                attempted.update(new_refs)
                 
                 if not new_refs:
                     self.logger.debug(f"Dependency resolution complete after {iteration} iterations")
@@ -1472,6 +1698,9 @@ class XRegistryLoader:
                 
                 self.logger.debug(f"Iteration {iteration}: Resolving {len(new_refs)} new references")
                 
+                # Fetch the wave concurrently; the loop below merges the results in order
+                self.prefetch(self._wave_urls(new_refs, composed_document, registry_root), headers)
+                
                 # Resolve new references
                 for ref_url in new_refs:
                     # Convert relative URIs to full URLs using the discovered registry root
@@ -1520,35 +1749,99 @@ class XRegistryLoader:
                 # Resolve collection URLs again in case new groups were added
                 self.resource_resolver.resolve_collection_urls(composed_document, headers)
             
-            # Resolve all individual resource references (like schemaurl, resourceurl)
-            self.resource_resolver.resolve_all_resources(composed_document, headers)
-            
-            # Resolve resource aliases (xref) so they are transparent to codegen
-            if isinstance(composed_document, dict):
-                self.alias_resolver.resolve_all_aliases(composed_document)
-            
-            # Resolve basemessage references
-            if isinstance(composed_document, dict):
-                self.message_resolver.resolve_all_basemessages(composed_document)
-            
-            # Normalize schema references from relative URIs to JSON pointers
-            # This must be done after all dependencies are resolved to ensure
-            # newly added resources have their references normalized
-            self.dependency_resolver._normalize_schema_references(composed_document)
-            
-            # Apply message group filtering if needed
-            if messagegroup_filter and isinstance(composed_document, dict):
-                composed_document = self._apply_messagegroup_filter(composed_document, messagegroup_filter)
-            
-            # Apply endpoint filtering if needed
-            if endpoint_filter and isinstance(composed_document, dict):
-                composed_document = self._apply_endpoint_filter(composed_document, endpoint_filter)
+            # Resolve all individual resource references (like schemaurl, resourceurl),
+            # aliases, basemessages and schema references and apply the filters.
+            # Schema references must be normalized after all dependencies are
+            # resolved to ensure newly added resources have their references normalized
+            composed_document = self._resolve_document(composed_document, headers,
+                                                       messagegroup_filter, endpoint_filter)
+            self.logger.debug(f"Normalization passes: {self.pass_timings}")
             
             return resolved_uri, composed_document
             
         except Exception as e:
             self.logger.error(f"Failed to load document with dependencies from {uri}: {e}")
             return uri, None
+        finally:
+            self._prefetched.clear()
+    
+    def _wave_urls(self, refs: List[str], composed_document: Dict[str, Any],
+                   registry_root: Optional[str]) -> List[str]:
+        """Return the URLs the dependency loop will fetch for a wave of references.
+        
+        Mirrors the loop in load_with_dependencies: the parent group of a resource
+        or version reference is fetched if it is not yet part of the document,
+        followed by the reference itself.
+        """
+        urls: List[str] = []
+        for ref_url in refs:
+            full_ref_url = ref_url
+            if ref_url.startswith('/') and registry_root:
+                full_ref_url = urllib.parse.urljoin(registry_root, ref_url)
+            parser = XRegistryUrlParser(full_ref_url)
+            if parser.get_entry_type() in ["resource", "version"]:
+                group_type = parser.get_group_type()
+                group_id = parser.get_group_id()
+                if group_type and group_id and group_id not in composed_document.get(group_type, {}):
+                    group_path = f"/{group_type}/{group_id}"
+                    urls.append(urllib.parse.urljoin(registry_root, group_path) if registry_root else group_path)
+            urls.append(full_ref_url)
+        return urls
+    
+    def prefetch(self, urls: List[str], headers: Dict[str, str]) -> None:
+        """Fetch a wave of HTTP references concurrently ahead of their sequential resolution.
+        
+        Fetched documents are scanned for nested references and collection URLs,
+        which are fetched in follow-up waves. Results are held until _load_core is
+        asked for the same URL, so the order in which documents are merged (and
+        therefore the composed document) is the same as with sequential fetching.
+        
+        Args:
+            urls: Absolute URLs to fetch; non-HTTP and already resolved URLs are skipped
+            headers: HTTP headers for authentication
+        """
+        if self.fetch_concurrency <= 1:
+            return
+        
+        resolved = self.dependency_resolver.resolved_resources
+        seen: Set[str] = set()
+        
+        def _pending(candidates: List[str]) -> List[str]:
+            wave = []
+            for url in candidates:
+                if (url.startswith(('http://', 'https://')) and url not in seen
+                        and url not in resolved and url not in self._prefetched):
+                    seen.add(url)
+                    wave.append(url)
+            return wave
+        
+        wave = _pending(urls)
+        if not wave:
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.fetch_concurrency,
+                                thread_name_prefix="xrcg-fetch") as pool:
+            while wave:
+                self.logger.debug(f"Prefetching {len(wave)} documents")
+                results = list(pool.map(
+                    lambda url: self._load_core(url, headers, ignore_handled=True), wave))
+                follow_up: List[str] = []
+                for url, result in zip(wave, results):
+                    self._prefetched[url] = result
+                    document = result[1]
+                    if document is not None:
+                        follow_up.extend(self.dependency_resolver.nested_reference_urls(url, document))
+                        follow_up.extend(self._collection_urls(url, document))
+                wave = _pending(follow_up)
+    
+    def _collection_urls(self, url: str, document: JsonNode) -> List[str]:
+        """Return the collection URLs (e.g. messagesurl) resolve_collection_urls will fetch for a group."""
+        parser = XRegistryUrlParser(url)
+        group_type = parser.get_group_type()
+        if parser.get_entry_type() != "group_instance" or not isinstance(document, dict):
+            return []
+        return [document[url_field] for collection, url_field in ModelLookups.of(self.model).collection_url_fields.get(group_type, ())
+                if isinstance(document.get(url_field), str) and collection not in document]
     
     def _load_core(self, uri: str, headers: Dict[str, str], 
                    ignore_handled: bool = False) -> Tuple[str, Optional[JsonNode]]:
@@ -1562,6 +1855,12 @@ class XRegistryLoader:
         Returns:
             Tuple of (resolved_uri, document) or (uri, None) on error
         """
+        if self._loaded_sources is not None:
+            self._loaded_sources.append(uri)
+        prefetched = self._prefetched.pop(uri, None)
+        if prefetched is not None:
+            return prefetched
+        
         try:
             self.logger.debug(f"Loading document from: {uri}")
             
@@ -1598,20 +1897,15 @@ class XRegistryLoader:
                 modified_url = f"{url}{separator}{inline_param}"
                 self.logger.debug(f"Adding inline parameter to URL: {modified_url}")
             
-            request = urllib.request.Request(modified_url)
-            for key, value in headers.items():
-                request.add_header(key, value)
-            
-            with urllib.request.urlopen(request) as response:
-                content = response.read().decode('utf-8')
-                document = self._parse_content(content)
-                return url, document  # Return original URL for consistency
+            response = self.transport.get(modified_url, headers)
+            document = self._parse_content(response.text)
+            return url, document  # Return original URL for consistency
                 
-        except urllib.error.HTTPError as e:
-            self.logger.error(f"HTTP error loading {url}: {e.code} {e.reason}")
-            return url, None
-        except urllib.error.URLError as e:
-            self.logger.error(f"URL error loading {url}: {e.reason}")
+        except TransportError as e:
+            if e.status is not None:
+                self.logger.error(f"HTTP error loading {url}: {e.status} {e.reason}")
+            else:
+                self.logger.error(f"URL error loading {url}: {e.reason}")
             return url, None
     
     def _load_from_file(self, file_path: str) -> Tuple[str, Optional[JsonNode]]:
@@ -1621,20 +1915,54 @@ class XRegistryLoader:
                 self.logger.error(f"File not found: {file_path}")
                 return file_path, None
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                document = self._parse_content(content)
-                return file_path, document
+            return file_path, self._parse_file(file_path)
                 
         except IOError as e:
             self.logger.error(f"IO error loading {file_path}: {e}")
             return file_path, None
     
+    def _parse_file(self, file_path: str) -> Optional[JsonNode]:
+        """Parse a local file as JSON or YAML, choosing the parser up front.
+        
+        JSON is decoded from a memory-mapped view of the file; with a fast JSON
+        backend (see ``json_codec``) the bytes are parsed in place without an
+        intermediate text copy. YAML is parsed from the file stream.
+        Only if a file that looks like JSON fails to parse is it retried as YAML.
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = len(codecs.BOM_UTF8) if mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+                if self._sniff_format(file_path, mm[offset:offset + 4096]) == "json":
+                    try:
+                        with memoryview(mm) as view, view[offset:] as body:
+                            return json_codec.loads(body)
+                    except json.JSONDecodeError as e:
+                        self.logger.debug(f"{file_path} is not valid JSON ({e.msg}), parsing as YAML")
+        
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                self.logger.error(f"Failed to parse content as JSON or YAML: {e}")
+                return None
+    
+    @staticmethod
+    def _sniff_format(file_path: str, head: bytes) -> str:
+        """Return "json" or "yaml" from the file extension or the first non-blank character."""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".json":
+            return "json"
+        if extension in (".yaml", ".yml"):
+            return "yaml"
+        return "json" if head.lstrip()[:1] in (b"{", b"[") else "yaml"
+    
     def _parse_content(self, content: str) -> Optional[JsonNode]:
         """Parse content as JSON or YAML."""
         try:
             # Try JSON first
-            return json.loads(content)
+            return json_codec.loads(content)
         except json.JSONDecodeError:
             try:
                 # Fall back to YAML
@@ -1643,6 +1971,162 @@ class XRegistryLoader:
                 self.logger.error(f"Failed to parse content as JSON or YAML: {e}")
                 return None
     
+    def _resolve_document(self, document: JsonNode, headers: Dict[str, str],
+                          messagegroup_filter: str = "", endpoint_filter: str = "") -> JsonNode:
+        """Resolve the resources and references of a loaded document and apply the filters.
+        
+        With a filter, only the selected groups and the groups they depend on
+        are resolved (see _resolve_filtered). The result is the same as
+        resolving the whole document and filtering it afterwards.
+        """
+        if (messagegroup_filter or endpoint_filter) and isinstance(document, dict):
+            filtered = self._resolve_filtered(document, headers, messagegroup_filter, endpoint_filter)
+            if filtered is not None:
+                return self._compact(filtered)
+        
+        self.resource_resolver.resolve_all_resources(document, headers)
+        self._resolve_references(document)
+        return self._compact(self.apply_filters(document, messagegroup_filter, endpoint_filter))
+    
+    def _compact(self, document: JsonNode) -> JsonNode:
+        """Intern the strings of a resolved document in place if compact_documents is set."""
+        if self.compact_documents and document is not None:
+            with self.pass_timings.measure("compaction"):
+                compact_document(document)
+        return document
+    
+    def _resolve_filtered(self, document: Dict[str, Any], headers: Dict[str, str],
+                          messagegroup_filter: str, endpoint_filter: str) -> Optional[Dict[str, Any]]:
+        """Resolve only what the filters select and return the filtered document.
+        
+        The filters pick endpoints and message groups by their IDs and the
+        message group references of endpoints, none of which depend on
+        resolution. Those groups are resolved together with the groups their
+        aliases and basemessages point to. The schema groups to keep depend on
+        the resolved ``dataschemauri`` of the selected messages, so they are
+        selected (by _collect_referenced_schemagroup_ids, through the filters)
+        and resolved afterwards, together with the targets of their aliases.
+        
+        Returns None if the selection depends on a reference given as an
+        absolute URL, which can only be matched against the whole resolved
+        document; the caller then resolves everything.
+        """
+        with self.pass_timings.measure("filter-selection"):
+            unfiltered = {key: value for key, value in document.items() if key != "schemagroups"}
+            selection: Dict[str, Any] = unfiltered
+            if messagegroup_filter:
+                selection = self._apply_messagegroup_filter(selection, messagegroup_filter)
+            if endpoint_filter:
+                selection = self._apply_endpoint_filter(selection, endpoint_filter)
+            
+            selected = [(group_type, group_id) for group_type in ("endpoints", "messagegroups")
+                        if isinstance(selection.get(group_type), dict) for group_id in selection[group_type]]
+            closure = self._dependency_closure(document, selected, headers)
+            if closure is None:
+                return None
+            messages_document = dict(unfiltered)
+            for group_type in ("endpoints", "messagegroups"):
+                if isinstance(document.get(group_type), dict):
+                    messages_document[group_type] = {group_id: group for group_id, group in document[group_type].items()
+                                                     if (group_type, group_id) in closure}
+        
+        self.resource_resolver.resolve_all_resources(messages_document, headers)
+        self._resolve_references(messages_document)
+        
+        # Filter with the unresolved schema groups; only their IDs are used
+        filtered = self.apply_filters({key: messages_document.get(key, value) for key, value in document.items()},
+                                      messagegroup_filter, endpoint_filter)
+        schemagroups = document.get("schemagroups")
+        if isinstance(schemagroups, dict) and isinstance(filtered.get("schemagroups"), dict):
+            with self.pass_timings.measure("filter-selection"):
+                closure = self._dependency_closure(
+                    document, [("schemagroups", group_id) for group_id in filtered["schemagroups"]], headers)
+            schema_document = {"schemagroups": {group_id: group for group_id, group in schemagroups.items()
+                                                if closure is None or ("schemagroups", group_id) in closure}}
+            # Groups are resolved in place, so the filtered document sees the results
+            self.resource_resolver.resolve_all_resources(schema_document, headers)
+            self._resolve_references(schema_document)
+        return filtered
+    
+    def _dependency_closure(self, document: Dict[str, Any], selected: List[Tuple[str, str]],
+                            headers: Dict[str, str]) -> Optional[Set[Tuple[str, str]]]:
+        """Return the selected (group type, group id) pairs and those of the groups they depend on.
+        
+        A group depends on the groups its resources' ``xref`` aliases and
+        messages' basemessages point to. Collection URLs of the visited groups
+        are resolved on the way. Returns None if a reference is an absolute URL.
+        """
+        closure: Set[Tuple[str, str]] = set()
+        pending = list(selected)
+        while pending:
+            key = pending.pop()
+            group_type, group_id = key
+            groups = document.get(group_type)
+            group = groups.get(group_id) if isinstance(groups, dict) else None
+            if key in closure or not isinstance(group, dict):
+                continue
+            closure.add(key)
+            self.resource_resolver._resolve_group_collection_urls(group_type, group, headers)
+            
+            for resource_collection, _ in ModelLookups.of(self.model).resource_collections.get(group_type, ()):
+                resources = group.get(resource_collection)
+                if not isinstance(resources, dict):
+                    continue
+                for resource in resources.values():
+                    if not isinstance(resource, dict):
+                        continue
+                    refs = [AliasResolver._get_xref(resource)]
+                    if resource_collection == "messages":
+                        refs.append(self.message_resolver._get_basemessage_ref(resource))
+                    for ref in refs:
+                        if not isinstance(ref, str):
+                            continue
+                        if "://" in ref:
+                            self.logger.debug(f"Resolving all groups, {group_type}/{group_id} references {ref}")
+                            return None
+                        segments = [segment for segment in ref.lstrip("#").split("/") if segment]
+                        if len(segments) >= 2:
+                            pending.append((segments[0], segments[1]))
+        return closure
+    
+    def _resolve_references(self, document: JsonNode) -> None:
+        """Resolve aliases, basemessages and schema references of a document with resolved resources.
+        
+        Aliases get a traversal of their own, since a basemessage may name an
+        alias. Basemessages and schema references only touch the message they
+        visit and share one traversal.
+        """
+        if not isinstance(document, dict):
+            return
+        
+        # Resolve resource aliases (xref) so they are transparent to codegen
+        index = XRegistryIndex(document)
+        self.alias_resolver.resolve_all_aliases(document, index)
+        
+        # Resolve basemessage references and normalize schema references from
+        # relative URIs to JSON pointers
+        DocumentWalker(ModelLookups.of(self.model), self.pass_timings).walk(
+            document, [self.message_resolver.basemessage_pass(index),
+                       self.dependency_resolver.schema_reference_pass()])
+    
+    def apply_filters(self, document: JsonNode, messagegroup_filter: str = "",
+                      endpoint_filter: str = "") -> JsonNode:
+        """Apply the message group and endpoint filters to a resolved document.
+        
+        The input document is not modified; filtered collections are copies.
+        """
+        # Apply message group filtering if needed
+        if messagegroup_filter and isinstance(document, dict):
+            with self.pass_timings.measure("messagegroup-filter"):
+                document = self._apply_messagegroup_filter(document, messagegroup_filter)
+        
+        # Apply endpoint filtering if needed
+        if endpoint_filter and isinstance(document, dict):
+            with self.pass_timings.measure("endpoint-filter"):
+                document = self._apply_endpoint_filter(document, endpoint_filter)
+        
+        return document
+    
     def _apply_messagegroup_filter(self, document: Dict[str, Any], 
                                   messagegroup_filter: str) -> Dict[str, Any]:
         """Apply message group filtering to the document."""